@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from django_otp import device_classes
+
+        from .services import mfa
+
+        # Keep the cached MFA device set in step with every device plugin
+        for model in device_classes():
+            post_save.connect(mfa.device_saved, sender=model, dispatch_uid=f"mfa-{model}")
+            post_delete.connect(
+                mfa.device_deleted, sender=model, dispatch_uid=f"mfa-del-{model}"
+            )
@@ -0,0 +1,67 @@
+"""Admission control for password verification.
+
+Argon2id is memory-hard (~100 MiB per verification) and CPU-bound, and a
+gthread worker runs several requests at once: a login burst would otherwise
+verify `threads` passwords in parallel per worker, pushing the container
+into swap and slowing every request on it. Each worker therefore admits at
+most PASSWORD_HASH_CONCURRENCY verifications (sized by gunicorn.conf.py
+from the allocated CPUs and memory); the rest queue briefly and are turned
+away with `HashingBusy` once PASSWORD_HASH_QUEUE_TIMEOUT_MS passes, so an
+overloaded login answers fast instead of timing out.
+
+Time spent queueing is reported as `hash_wait_ms` in the request's
+`http_request` event (docs/OBSERVABILITY.md).
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from core.monitoring import hash_wait_ms_var
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds a rejected client is told to wait before retrying
+RETRY_AFTER_SECONDS = 1
+
+_lock = threading.Lock()
+_slots = None  # (size, semaphore), rebuilt if the setting changes
+
+
+class HashingBusy(RuntimeError):
+    """No verification slot freed up within the queue deadline."""
+
+
+def _semaphore():
+    global _slots
+    size = max(1, settings.PASSWORD_HASH_CONCURRENCY)
+    with _lock:
+        if _slots is None or _slots[0] != size:
+            _slots = (size, threading.BoundedSemaphore(size))
+        return _slots[1]
+
+
+@contextmanager
+def verification_slot():
+    """Hold one of this worker's password-verification slots.
+
+    Wrap every call that may verify a password (`authenticate`,
+    `AuthenticationForm.is_valid`). Raises HashingBusy when the queue
+    deadline passes first.
+    """
+    semaphore = _semaphore()
+    started = time.monotonic()
+    acquired = semaphore.acquire(timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_MS / 1000)
+    waited_ms = round((time.monotonic() - started) * 1000, 1)
+    hash_wait_ms_var.set((hash_wait_ms_var.get() or 0.0) + waited_ms)
+    if not acquired:
+        logger.warning(
+            "Password verification rejected after %.0fms queued", waited_ms,
+            extra={"event": "password_hash_rejected", "wait_ms": waited_ms},
+        )
+        raise HashingBusy("password verification queue full")
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -12,6 +12,8 @@ docs/OBSERVABILITY.md.
 """
 import logging
 
+from core import outbox
+from core.cache import redis_client
 from django.contrib.auth.models import User
 from django.core.cache import cache
 
@@ -34,9 +36,19 @@ def is_locked(username: str) -> bool:
 
 
 def record_failure(username: str) -> int:
-    """Count a failed attempt; returns the new count (0 if uncountable)."""
+    """Count a failed attempt; returns the new count (0 if uncountable).
+
+    On Redis the create-or-increment is one MULTI/EXEC round trip rather
+    than Django's add + exists + incr."""
     key = lockout_key(username)
     try:
+        client = redis_client()
+        if client is not None:
+            full_key = cache.make_and_validate_key(key)
+            pipe = client.pipeline(transaction=True)
+            pipe.set(full_key, 0, ex=LOCKOUT_WINDOW_SECONDS, nx=True)
+            pipe.incr(full_key)
+            return pipe.execute()[1]
         if cache.add(key, 1, timeout=LOCKOUT_WINDOW_SECONDS):
             return 1
         return cache.incr(key)
@@ -62,7 +74,7 @@ def notify_lockout(username: str):
     from accounts.tasks import send_lockout_email
 
     try:
-        send_lockout_email.delay(user.pk)
+        outbox.publish(send_lockout_email, user.pk)
     except Exception:
         logger.exception("Could not queue lockout notification")
 
@@ -0,0 +1,149 @@
+"""Confirmed MFA devices per user, with the membership cached.
+
+`django_otp.devices_for_user` queries every installed device table (TOTP
+and static here) on each call, so every token issuance paid one query per
+plugin just to learn whether the account has a second factor at all. The
+set of confirmed devices changes rarely, so it is cached per user as
+(model label, pk) references: an account without MFA then costs no query,
+and the usual single TOTP device is loaded by primary key.
+
+Safety properties, because this decides whether a password alone suffices:
+- The cache only ever holds *references*; every referenced device is
+  re-loaded and re-checked (owner, confirmed) before use, and any mismatch
+  falls back to the full `devices_for_user` scan.
+- Device saves and deletes invalidate the entry (signals, wired in
+  AccountsConfig.ready) once their transaction commits, so confirming a
+  new device takes effect as soon as it is visible. Saves that leave
+  membership unchanged — `verify_token` saves on every successful code —
+  keep the entry.
+- Invalidating replaces the user's generation, a random token, and an
+  entry is only used under the generation it was scanned in. A scan that
+  started before an invalidation (or ran between a save and its commit)
+  can still write its entry, but nothing will read it.
+- An unreachable cache falls back to the full scan, never to "no MFA".
+- Queryset `.update()` bypasses signals; CACHE_SECONDS bounds that gap.
+"""
+import logging
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django_otp import device_classes, devices_for_user
+
+logger = logging.getLogger(__name__)
+
+CACHE_SECONDS = 60 * 60
+
+
+def _cache_key(user_id) -> str:
+    return f"mfa:devices:{user_id}"
+
+
+def _generation_key(user_id) -> str:
+    return f"mfa:devices:{user_id}:generation"
+
+
+def _cached(user_id):
+    """(generation, references): the references are None unless they were
+    cached under the current generation. Random rather than a counter, so
+    a generation that expires or is evicted never comes back."""
+    key, generation_key = _cache_key(user_id), _generation_key(user_id)
+    stored = cache.get_many([key, generation_key])
+    generation = stored.get(generation_key)
+    if generation is None:
+        generation = cache.get_or_set(
+            generation_key, uuid.uuid4().hex, timeout=CACHE_SECONDS
+        )
+    entry = stored.get(key)
+    if entry and entry.get("generation") == generation:
+        return generation, entry["devices"]
+    return generation, None
+
+
+def _reference(device) -> list:
+    return [device._meta.label_lower, device.pk]
+
+
+def _load(user, references):
+    """The referenced devices, or None when any no longer qualifies."""
+    models = {model._meta.label_lower: model for model in device_classes()}
+    wanted = defaultdict(set)
+    for label, pk in references:
+        if label not in models:
+            return None
+        wanted[label].add(pk)
+
+    devices = []
+    for label, pks in wanted.items():
+        found = list(
+            models[label].objects.filter(pk__in=pks, user=user, confirmed=True)
+        )
+        if len(found) != len(pks):
+            return None
+        devices.extend(found)
+    return devices
+
+
+def confirmed_devices(user) -> list:
+    """Every confirmed device of `user`, TOTP devices first.
+
+    TOTP is tried first so a routine code never reaches the static
+    (backup-code) device, whose verification consumes a code.
+    """
+    try:
+        generation, references = _cached(user.pk)
+    except Exception:
+        logger.exception("MFA device cache unavailable; scanning device tables")
+        generation, references = None, None
+
+    devices = _load(user, references) if references is not None else None
+    if devices is None:
+        devices = list(devices_for_user(user, confirmed=True))
+        if generation is not None:
+            entry = {"generation": generation, "devices": [_reference(d) for d in devices]}
+            try:
+                cache.set(_cache_key(user.pk), entry, timeout=CACHE_SECONDS)
+            except Exception:
+                logger.exception("MFA device cache unavailable; not cached")
+    return sorted(devices, key=lambda d: d._meta.label_lower != "otp_totp.totpdevice")
+
+
+def verify(devices, code: str) -> bool:
+    """True when any device accepts `code`. Sequential and short-circuiting:
+    verification has side effects (replay counters, consumed backup codes)."""
+    return any(device.verify_token(code) for device in devices)
+
+
+def invalidate(user_id):
+    """Start a new generation once the current transaction commits: until
+    then, other requests cannot see the change and would re-cache the old
+    set."""
+    def _new_generation():
+        try:
+            cache.set(_generation_key(user_id), uuid.uuid4().hex, timeout=CACHE_SECONDS)
+        except Exception:
+            logger.exception("MFA device cache unavailable; could not invalidate")
+
+    transaction.on_commit(_new_generation)
+
+
+def device_saved(sender, instance, created=False, **kwargs):
+    """post_save: drop the owner's entry unless membership is unchanged."""
+    if created:
+        invalidate(instance.user_id)
+        return
+    try:
+        _, references = _cached(instance.user_id)
+    except Exception:
+        invalidate(instance.user_id)
+        return
+    if references is None:
+        return  # nothing cached for this user
+    listed = _reference(instance) in references
+    if listed != bool(instance.confirmed):
+        invalidate(instance.user_id)
+
+
+def device_deleted(sender, instance, **kwargs):
+    invalidate(instance.user_id)
@@ -1,9 +1,10 @@
 import re
+from unittest.mock import MagicMock, patch
 
 from django.contrib.auth.models import User
 from django.core import mail
 from django.core.cache import cache
-from django.test import Client, TestCase, override_settings
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
 from .models import Profile
@@ -194,6 +195,241 @@ class AccountLockoutTests(TestCase):
             self.assertEqual(response.status_code, 200)
 
 
+class CredentialGuardTests(TestCase):
+    """The per-IP limit and the lockout are read in one pipelined round trip
+    on Redis, and decided identically on any other cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _check(self, username="alice"):
+        from .services import credential_guard
+
+        return credential_guard.check(
+            self.factory.post("/"), "guard-test", username, limit=5, window_seconds=300
+        )
+
+    def _fake_redis(self, *results):
+        client = MagicMock()
+        client.pipeline.return_value.execute.return_value = list(results)
+        return client
+
+    def test_ip_limit_and_lockout_are_decided_without_redis(self):
+        from .services import credential_guard, lockout
+
+        self.assertEqual(self._check(), credential_guard.ALLOWED)
+        for _ in range(lockout.LOCKOUT_THRESHOLD):
+            lockout.record_failure("alice")
+        self.assertEqual(self._check(), credential_guard.LOCKED)
+        for _ in range(4):
+            self._check("bob")
+        self.assertEqual(self._check("bob"), credential_guard.RATE_LIMITED)
+
+    def test_both_checks_share_one_redis_round_trip(self):
+        from .services import credential_guard
+
+        client = self._fake_redis(True, 1, b"3")
+        with patch("accounts.services.credential_guard.redis_client", return_value=client):
+            self.assertEqual(self._check(), credential_guard.ALLOWED)
+        client.pipeline.assert_called_once_with(transaction=True)
+        client.pipeline.return_value.execute.assert_called_once()
+
+    def test_redis_verdicts(self):
+        from .services import credential_guard
+
+        for results, expected in (
+            ((None, 6, b"0"), credential_guard.RATE_LIMITED),
+            ((None, 2, b"10"), credential_guard.LOCKED),
+            ((True, 1, None), credential_guard.ALLOWED),
+        ):
+            client = self._fake_redis(*results)
+            with patch("accounts.services.credential_guard.redis_client", return_value=client):
+                self.assertEqual(self._check(), expected)
+
+    def test_redis_outage_fails_open_and_is_logged(self):
+        from .services import credential_guard
+
+        client = MagicMock()
+        client.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        with patch("accounts.services.credential_guard.redis_client", return_value=client), \
+             self.assertLogs("accounts.services.credential_guard", level="ERROR"):
+            self.assertEqual(self._check(), credential_guard.ALLOWED)
+
+    def test_failure_is_recorded_in_one_redis_round_trip(self):
+        from .services import lockout
+
+        client = self._fake_redis(True, 4)
+        with patch("accounts.services.lockout.redis_client", return_value=client):
+            self.assertEqual(lockout.record_failure("alice"), 4)
+        client.pipeline.return_value.execute.assert_called_once()
+
+
+@override_settings(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_QUEUE_TIMEOUT_MS=0)
+class PasswordVerificationAdmissionTests(TestCase):
+    """Argon2 verifications are bounded per worker; a login that cannot get
+    a slot in time is refused fast instead of piling onto the CPU."""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user("alice", "alice@example.com", "S3curePass!x")
+
+    def _occupy_every_slot(self):
+        from .services import hashing
+
+        semaphore = hashing._semaphore()
+        semaphore.acquire()
+        self.addCleanup(semaphore.release)
+
+    def test_login_is_refused_with_503_when_every_slot_is_busy(self):
+        self._occupy_every_slot()
+        with self.assertLogs("accounts.services.hashing", level="WARNING") as captured:
+            response = self.client.post(
+                reverse("login"), {"username": "alice", "password": "S3curePass!x"}
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertNotIn("_auth_user_id", self.client.session)
+        self.assertEqual(captured.records[0].event, "password_hash_rejected")
+
+    def test_busy_login_does_not_count_as_a_failed_attempt(self):
+        from .services.lockout import lockout_key
+
+        self._occupy_every_slot()
+        with self.assertLogs("accounts.services.hashing", level="WARNING"):
+            self.client.post(reverse("login"), {"username": "alice", "password": "wrong"})
+        self.assertIsNone(cache.get(lockout_key("alice")))
+
+    def test_token_endpoint_returns_the_busy_envelope(self):
+        self._occupy_every_slot()
+        with self.assertLogs("accounts.services.hashing", level="WARNING"):
+            response = self.client.post(
+                "/api/v1/auth/token/",
+                {"username": "alice", "password": "S3curePass!x"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 503)
+        error = response.json()["error"]
+        self.assertEqual(error["code"], "authentication_busy")
+        self.assertEqual(error["details"], {"retry_after_seconds": 1})
+
+    def test_queue_time_is_reported_in_the_request_event(self):
+        with self.assertLogs("eve.requests", level="INFO") as captured:
+            response = self.client.post(
+                reverse("login"), {"username": "alice", "password": "S3curePass!x"}
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertIsInstance(captured.records[-1].hash_wait_ms, float)
+
+    def test_requests_without_password_checks_omit_the_field(self):
+        with self.assertLogs("eve.requests", level="INFO") as captured:
+            self.client.get(reverse("login"))
+        self.assertFalse(hasattr(captured.records[-1], "hash_wait_ms"))
+
+
+class MfaDeviceCacheTests(TestCase):
+    """Token issuance learns a user's confirmed devices from a cached set of
+    references, which device changes invalidate as they commit."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "S3curePass!x")
+
+    def _devices(self):
+        from .services import mfa
+
+        return mfa.confirmed_devices(self.user)
+
+    def _totp(self, **fields):
+        from django_otp.plugins.otp_totp.models import TOTPDevice
+
+        return TOTPDevice.objects.create(user=self.user, name="default", **fields)
+
+    def test_account_without_mfa_costs_no_query_once_cached(self):
+        self.assertEqual(self._devices(), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._devices(), [])
+
+    def test_single_totp_device_is_loaded_by_primary_key(self):
+        device = self._totp(confirmed=True)
+        self._devices()
+        with self.assertNumQueries(1):
+            self.assertEqual(self._devices(), [device])
+
+    def test_confirming_a_device_takes_effect_immediately(self):
+        device = self._totp(confirmed=False)
+        self.assertEqual(self._devices(), [])
+        device.confirmed = True
+        with self.captureOnCommitCallbacks(execute=True):
+            device.save()
+        self.assertEqual(self._devices(), [device])
+
+    def test_deleting_a_device_takes_effect_immediately(self):
+        device = self._totp(confirmed=True)
+        self.assertEqual(self._devices(), [device])
+        with self.captureOnCommitCallbacks(execute=True):
+            device.delete()
+        self.assertEqual(self._devices(), [])
+
+    def test_set_cached_before_the_save_commits_is_not_used_after(self):
+        # Admin saves inside a transaction; another request scanning before
+        # the commit does not see the device yet and caches no devices
+        with self.captureOnCommitCallbacks() as callbacks:
+            device = self._totp(confirmed=True)
+        with patch("accounts.services.mfa.devices_for_user", return_value=[]):
+            self.assertEqual(self._devices(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._devices(), [device])
+
+    def test_scan_overtaken_by_a_device_save_is_not_used(self):
+        from .services import mfa
+
+        scan = mfa.devices_for_user
+        created = []
+
+        def scan_then_save(user, confirmed):
+            devices = list(scan(user, confirmed=confirmed))
+            # The device is saved and committed before this scan is cached
+            with self.captureOnCommitCallbacks(execute=True):
+                created.append(self._totp(confirmed=True))
+            return devices
+
+        with patch("accounts.services.mfa.devices_for_user", scan_then_save):
+            self.assertEqual(self._devices(), [])
+        self.assertEqual(self._devices(), created)
+
+    def test_successful_verification_keeps_the_cached_set(self):
+        from django_otp.oath import totp
+
+        from .services import mfa
+
+        device = self._totp(confirmed=True)
+        self._devices()
+        code = totp(device.bin_key, device.step, device.t0, device.digits, device.drift)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(mfa.verify(self._devices(), str(code).zfill(device.digits)))
+        self.assertIsNotNone(mfa._cached(self.user.pk)[1])
+
+    def test_stale_reference_falls_back_to_a_full_scan(self):
+        from .services import mfa
+
+        device = self._totp(confirmed=True)
+        generation, _ = mfa._cached(self.user.pk)
+        cache.set(mfa._cache_key(self.user.pk), {
+            "generation": generation, "devices": [["otp_totp.totpdevice", device.pk + 99]],
+        })
+        self.assertEqual(self._devices(), [device])
+
+    def test_unreachable_cache_never_means_no_mfa(self):
+        device = self._totp(confirmed=True)
+        with patch("accounts.services.mfa.cache") as broken, \
+             self.assertLogs("accounts.services.mfa", level="ERROR"):
+            broken.get_many.side_effect = ConnectionError("down")
+            broken.set.side_effect = ConnectionError("down")
+            self.assertEqual(self._devices(), [device])
+
+
 class EmailVerificationTests(TestCase):
     def setUp(self):
         cache.clear()
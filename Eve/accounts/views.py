@@ -1,5 +1,6 @@
 import logging
 
+from core import outbox
 from core.throttling import rate_limit
 from django.contrib import messages
 from django.contrib.auth import login, logout
@@ -7,6 +8,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
 from django.core import signing
+from django.http import HttpResponse
 from django.shortcuts import redirect, render
 from django.views.decorators.http import require_POST
 
@@ -15,7 +17,7 @@ from .models import Profile
 
 # Lockout lives in a service shared with the API token endpoint, so a single
 # implementation guards every password-accepting entry point.
-from .services import lockout
+from .services import credential_guard, hashing, lockout
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +28,7 @@ EMAIL_TOKEN_MAX_AGE = 60 * 60 * 24 * 3  # 3 days
 def _send_verification_email(user):
     from .tasks import send_verification_email
 
-    send_verification_email.delay(user.pk)
+    outbox.publish(send_verification_email, user.pk)
 
 
 @rate_limit("register", limit=5, window_seconds=3600)
@@ -47,7 +49,6 @@ def register_view(request):
     return render(request, "accounts/register.html", {"form": form})
 
 
-@rate_limit("login", limit=5, window_seconds=300)
 def login_view(request):
     # If user is already logged in, no need to show login form
     if request.user.is_authenticated:
@@ -55,7 +56,15 @@ def login_view(request):
 
     if request.method == "POST":
         username = request.POST.get("username", "")
-        if username and lockout.is_locked(username):
+        # Per-IP limit and per-username lockout in one cache round trip
+        verdict = credential_guard.check(
+            request, "login", username, limit=5, window_seconds=300
+        )
+        if verdict == credential_guard.RATE_LIMITED:
+            return HttpResponse(
+                "Too many attempts. Please try again later.", status=429
+            )
+        if verdict == credential_guard.LOCKED:
             messages.error(
                 request,
                 "This account is temporarily locked after repeated failed "
@@ -67,7 +76,20 @@ def login_view(request):
             )
 
         form = AuthenticationForm(request, data=request.POST)
-        if form.is_valid():
+        try:
+            with hashing.verification_slot():
+                valid = form.is_valid()
+        except hashing.HashingBusy:
+            messages.error(
+                request, "Sign-in is busy right now. Please try again in a moment."
+            )
+            response = render(
+                request, "accounts/login.html",
+                {"form": AuthenticationForm()}, status=503,
+            )
+            response["Retry-After"] = str(hashing.RETRY_AFTER_SECONDS)
+            return response
+        if valid:
             lockout.clear_failures(username)
             login(request, form.get_user())
             return redirect("product_catalogue")
@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrderCursorPagination(CursorPagination):
+    """Keyset pagination for order history, newest first.
+
+    Each page resumes from an opaque cursor on created_at instead of an
+    offset, so it is one range scan of the (user, created_at, id) index
+    however many orders the account has; `id` orders rows created in the
+    same instant. Responses are `{next, previous, results}`: no `count`,
+    which would need a full scan of the user's orders on every page.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 20
@@ -0,0 +1,24 @@
+"""JSON request parser on the core.fastjson decoder.
+
+Like DRF's parser it rejects NaN and infinities. Bodies declared in a
+charset other than UTF-8, and every body when orjson is not installed (the
+standard library accepts NaN), are left to DRF's parser.
+"""
+from core import fastjson
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import JSONRenderer
+
+
+class JSONParser(parsers.JSONParser):
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding") or "utf-8"
+        if fastjson.BACKEND != "orjson" or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return fastjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from None
@@ -0,0 +1,32 @@
+"""JSON renderer on the core.fastjson encoder.
+
+Every API response is rendered here, so it is a per-request CPU cost. The
+output matches DRF's compact rendering byte for byte for everything a
+serializer produces. Values only DRF's encoder understands (Decimal, lazy
+strings, querysets, datetimes in its own format) are handed to it. Indented
+output (`Accept: application/json; indent=4`) and non-default
+UNICODE_JSON / COMPACT_JSON settings still go through DRF's renderer. One
+difference remains: a NaN or infinite float renders as null instead of
+raising.
+"""
+from core import fastjson
+from rest_framework import renderers
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = fastjson.dumps(
+            data, default=self.encoder_class().default, passthrough_datetime=True
+        )
+        # Kept from DRF: JSON that is also a strict JavaScript subset
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
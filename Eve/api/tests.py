@@ -300,6 +300,73 @@ class CheckoutEndpointTests(ApiTestCase):
         self.assertEqual(response.json()["error"]["code"], "checkout_disabled")
 
 
+@override_settings(CHECKOUT_ENABLED=True, CHECKOUT_ASYNC=True)
+class AsyncCheckoutEndpointTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def _post(self, key="key-async"):
+        with (
+            patch("api.v1.views.cart_service.get_cart", return_value=make_cart(self.user.id)),
+            patch("api.v1.views.cart_service.clear_cart") as clear,
+            patch("payments.tasks.complete_checkout_attempt.apply_async") as publish,
+        ):
+            response = self.client.post(
+                "/api/v1/checkout/", **{"HTTP_IDEMPOTENCY_KEY": key}
+            )
+        clear.assert_not_called()  # the worker clears it once the order exists
+        return response, publish
+
+    def test_accepts_the_attempt_and_queues_the_mutations(self):
+        from payments.models import CheckoutAttempt
+
+        response, publish = self._post()
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual(body["state"], "queued")
+        self.assertIsNone(body["order"])
+        self.assertEqual(response["Location"], f"/api/v1/checkout/{body['id']}/")
+        self.assertEqual(publish.call_args.args[:2], ([body["id"]], {}))
+        self.assertEqual(
+            CheckoutAttempt.objects.get(pk=body["id"]).state, CheckoutAttempt.State.QUEUED
+        )
+
+    def test_retrying_the_key_returns_the_same_attempt(self):
+        first, _ = self._post()
+        second, publish = self._post()
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(second.json()["id"], first.json()["id"])
+        publish.assert_not_called()
+
+    def test_status_endpoint_reports_the_order_once_completed(self):
+        from payments.models import CheckoutAttempt
+
+        attempt_id = self._post()[0].json()["id"]
+        response = self.client.get(f"/api/v1/checkout/{attempt_id}/")
+        self.assertEqual(response.json()["state"], "queued")
+        self.assertEqual(response["Retry-After"], "1")
+
+        attempt = CheckoutAttempt.objects.get(pk=attempt_id)
+        Order.objects.create(
+            user=self.user, saleor_order_id="ORD-ASYNC", idempotency_key=attempt.idempotency_key,
+            total_amount="5.00", currency="EUR", status=Order.Status.PENDING,
+        )
+        attempt.state = CheckoutAttempt.State.COMPLETED
+        attempt.save()
+        response = self.client.get(f"/api/v1/checkout/{attempt_id}/")
+        self.assertEqual(response.json()["order"]["saleor_order_id"], "ORD-ASYNC")
+        self.assertFalse(response.has_header("Retry-After"))
+
+    def test_status_of_another_users_attempt_is_not_found(self):
+        attempt_id = self._post()[0].json()["id"]
+        bob = User.objects.create_user("bob", "bob@example.com", "S3curePass!x")
+        self.client.force_login(bob)
+        response = self.client.get(f"/api/v1/checkout/{attempt_id}/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["error"]["code"], "not_found")
+
+
 class OrderEndpointTests(ApiTestCase):
     def setUp(self):
         super().setUp()
@@ -318,10 +385,26 @@ class OrderEndpointTests(ApiTestCase):
         response = self.client.get("/api/v1/orders/")
         self.assertEqual(response.status_code, 200)
         body = response.json()
-        self.assertEqual(body["count"], 1)
-        self.assertEqual(body["results"][0]["saleor_order_id"], "ORD-MINE")
+        self.assertEqual([o["saleor_order_id"] for o in body["results"]], ["ORD-MINE"])
+        self.assertIsNone(body["next"])
         self.assertNotContains(response, "ORD-BOBS")
 
+    def test_list_pages_by_cursor_newest_first(self):
+        for number in range(25):
+            Order.objects.create(
+                user=self.user, saleor_order_id=f"ORD-{number:02d}",
+                total_amount="1.00", currency="EUR",
+            )
+        first = self.client.get("/api/v1/orders/").json()
+        self.assertEqual(len(first["results"]), 20)
+        self.assertEqual(first["results"][0]["saleor_order_id"], "ORD-24")
+        self.assertNotIn("count", first)
+
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(len(second["results"]), 6)
+        self.assertEqual(second["results"][-1]["saleor_order_id"], "ORD-MINE")
+        self.assertIsNone(second["next"])
+
     def test_cannot_retrieve_another_users_order(self):
         response = self.client.get("/api/v1/orders/ORD-BOBS/")
         self.assertEqual(response.status_code, 404)
@@ -816,3 +899,44 @@ class RefreshTokenRotationTests(ApiTestCase):
         )
         self.assertEqual(response.status_code, 204)
         self.assertEqual(self._refresh(body["refresh"]).status_code, 401)
+
+
+class FastJSONRendererTests(TestCase):
+    """The fastjson renderer and parser are drop-in replacements for DRF's."""
+
+    def test_output_matches_drf_byte_for_byte(self):
+        import datetime
+        import decimal
+        import uuid
+
+        from rest_framework.renderers import JSONRenderer as DRFJSONRenderer
+        from rest_framework.utils.serializer_helpers import ReturnDict
+
+        from api.renderers import JSONRenderer
+
+        data = ReturnDict({
+            "amount": decimal.Decimal("49.99"),
+            "at": datetime.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            "id": uuid.UUID(int=7),
+            "text": "é\u2028\u2029",
+            "items": [1, 2.5, None, True],
+        }, serializer=None)
+        self.assertEqual(
+            JSONRenderer().render(data), DRFJSONRenderer().render(data)
+        )
+        self.assertEqual(
+            JSONRenderer().render(data, "application/json; indent=2"),
+            DRFJSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+    def test_parser_rejects_malformed_and_non_finite_bodies(self):
+        import io
+
+        from rest_framework.exceptions import ParseError
+
+        from api.parsers import JSONParser
+
+        self.assertEqual(JSONParser().parse(io.BytesIO(b'{"a": [1]}')), {"a": [1]})
+        for body in (b"{not json", b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                JSONParser().parse(io.BytesIO(body))
@@ -9,7 +9,8 @@ from accounts.models import Profile
 from django.contrib.auth.models import User
 from drf_spectacular.utils import extend_schema_field
 from ecommerce.services.cart_service import MAX_REQUEST_QUANTITY
-from payments.models import Order
+from payments.models import CheckoutAttempt, Order
+from payments.services.checkout import ATTEMPT_ERRORS
 from rest_framework import serializers
 
 
@@ -154,6 +155,44 @@ class OrderSerializer(serializers.ModelSerializer):
         return {"amount": str(order.total_amount), "currency": order.currency}
 
 
+class CheckoutFailureSerializer(serializers.Serializer):
+    code = serializers.CharField(help_text="Stable machine-readable reason.")
+    message = serializers.CharField(help_text="Human-readable, safe to display.")
+
+
+class CheckoutAttemptSerializer(serializers.ModelSerializer):
+    """An asynchronous checkout, followed until `state` settles."""
+
+    order = serializers.SerializerMethodField()
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CheckoutAttempt
+        fields = ["id", "state", "order", "error", "created_at", "updated_at"]
+        read_only_fields = fields
+
+    @extend_schema_field(OrderSerializer(allow_null=True))
+    def get_order(self, attempt):
+        if attempt.state != CheckoutAttempt.State.COMPLETED:
+            return None
+        order = Order.objects.filter(
+            user_id=attempt.user_id, idempotency_key=attempt.idempotency_key
+        ).first()
+        return OrderSerializer(order).data if order else None
+
+    @extend_schema_field(CheckoutFailureSerializer(allow_null=True))
+    def get_error(self, attempt):
+        if attempt.state not in (
+            CheckoutAttempt.State.FAILED, CheckoutAttempt.State.UNKNOWN
+        ):
+            return None
+        code = attempt.last_error or "checkout_failed"
+        return {
+            "code": code,
+            "message": ATTEMPT_ERRORS.get(code, "Checkout could not be completed."),
+        }
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
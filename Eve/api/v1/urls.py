@@ -11,6 +11,7 @@ from .views import (
     CartItemDetailView,
     CartItemsView,
     CartView,
+    CheckoutStatusView,
     CheckoutView,
     OrderViewSet,
     ProductViewSet,
@@ -43,6 +44,9 @@ urlpatterns = [
     path("cart/items/", CartItemsView.as_view(), name="cart-items"),
     path("cart/items/<str:product_id>/", CartItemDetailView.as_view(), name="cart-item"),
     path("checkout/", CheckoutView.as_view(), name="checkout"),
+    path(
+        "checkout/<int:attempt_id>/", CheckoutStatusView.as_view(), name="checkout-status"
+    ),
     path("profile/", ProfileView.as_view(), name="profile"),
     path("", include(router.urls)),
 
@@ -7,13 +7,15 @@ payments.services.checkout) — no business logic is reimplemented here.
 import logging
 
 from accounts.models import Profile
-from accounts.services.lockout import clear_failures, is_locked, register_failure
+from accounts.services import credential_guard, mfa
+from accounts.services.hashing import RETRY_AFTER_SECONDS, HashingBusy, verification_slot
+from accounts.services.lockout import clear_failures, register_failure
 from core.cache_lock import CacheLeaseUnavailable
-from core.throttling import rate_limit
+from core.db_router import replica_reads
 from django.conf import settings
 from django.contrib.auth import authenticate
-from django.utils.decorators import method_decorator
-from django_otp import devices_for_user
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from ecommerce.services import cart_service
 from ecommerce.services.catalogue import (
@@ -22,8 +24,9 @@ from ecommerce.services.catalogue import (
     get_product,
     list_products,
 )
-from payments.models import Order
-from payments.services.checkout import place_order_once, scoped_idempotency_key
+from payments.models import CheckoutAttempt, Order
+from payments.services.checkout import place_order_once, scoped_idempotency_key, start_checkout
+from payments.services.history import ORDER_HISTORY_FIELDS
 from payments.services.saleor_checkout import CheckoutError
 from rest_framework import mixins, status, viewsets
 from rest_framework.authentication import SessionAuthentication
@@ -35,6 +38,7 @@ from rest_framework.views import APIView
 from api.authentication import AccessTokenAuthentication
 from api.errors import APIError
 from api.models import revoke_all_tokens
+from api.pagination import OrderCursorPagination
 from api.throttling import ScopedRateThrottle
 from api.tokens import (
     InvalidToken,
@@ -46,6 +50,7 @@ from api.tokens import (
 from .serializers import (
     AddCartItemSerializer,
     CartSerializer,
+    CheckoutAttemptSerializer,
     ErrorSerializer,
     OrderSerializer,
     ProductListResponseSerializer,
@@ -60,6 +65,8 @@ from .serializers import (
 logger = logging.getLogger(__name__)
 
 MAX_IDEMPOTENCY_KEY_LENGTH = 64
+# Seconds an asynchronous checkout client is asked to wait between polls
+CHECKOUT_POLL_SECONDS = 1
 
 # Reused in the OpenAPI schema so every documented failure shows the envelope
 ERROR = ErrorSerializer
@@ -242,14 +249,18 @@ class CheckoutView(APIView):
             "* `201` — order created.\n"
             "* `200` — this Idempotency-Key was already used: the original "
             "order is returned and nothing is charged again.\n"
+            "* `202` — asynchronous checkout (when enabled): the attempt was "
+            "journaled and is being placed. Poll the `Location` header "
+            "(`/checkout/{id}/`) until `state` is `completed`, `failed` or "
+            "`unknown`. Retrying with the same key returns the same attempt.\n"
             "* `409 checkout_in_progress` — a request with this key is "
             "in flight. Do not retry; poll `/orders/`."
         ),
         parameters=[IDEMPOTENCY_KEY_PARAM],
         request=None,
         responses={
-            201: OrderSerializer, 200: OrderSerializer, 400: ERROR,
-            401: ERROR, 403: ERROR, 409: ERROR, 429: ERROR, 503: ERROR,
+            201: OrderSerializer, 200: OrderSerializer, 202: CheckoutAttemptSerializer,
+            400: ERROR, 401: ERROR, 403: ERROR, 409: ERROR, 429: ERROR, 503: ERROR,
         },
     )
     def post(self, request):
@@ -287,10 +298,9 @@ class CheckoutView(APIView):
             return Response(OrderSerializer(existing).data, status=status.HTTP_200_OK)
 
         cart = cart_service.get_cart(request.user.id)
+        place = start_checkout if settings.CHECKOUT_ASYNC else place_order_once
         try:
-            order = place_order_once(
-                user=request.user, cart=cart, idempotency_key=key
-            )
+            order = place(user=request.user, cart=cart, idempotency_key=key)
         except CacheLeaseUnavailable:
             logger.exception("Checkout coordination cache unavailable")
             raise APIError(
@@ -313,10 +323,50 @@ class CheckoutView(APIView):
                 status_code=status.HTTP_409_CONFLICT,
             )
 
+        if isinstance(order, CheckoutAttempt):
+            # The orders worker clears the cart once the order exists
+            return Response(
+                CheckoutAttemptSerializer(order).data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={
+                    "Location": reverse("v1:checkout-status", args=[order.pk]),
+                    "Retry-After": str(CHECKOUT_POLL_SECONDS),
+                },
+            )
+        if settings.CHECKOUT_ASYNC:
+            # A key completed by an earlier asynchronous request
+            return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
+
         cart_service.clear_cart(request.user.id)
         return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
 
 
+class CheckoutStatusView(APIView):
+    """Follow an asynchronous checkout attempt."""
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["checkout"],
+        summary="Follow an asynchronous checkout",
+        description=(
+            "Poll every `Retry-After` seconds while `state` is `queued`, "
+            "`started` or `completing`. `completed` carries the order; "
+            "`failed` and `unknown` carry an `error`. On `unknown`, do not "
+            "check out again: the order is being reconciled."
+        ),
+        responses={200: CheckoutAttemptSerializer, 401: ERROR, 404: ERROR},
+    )
+    def get(self, request, attempt_id):
+        attempt = get_object_or_404(
+            CheckoutAttempt, pk=attempt_id, user=request.user
+        )
+        headers = {}
+        if attempt.state not in CheckoutAttempt.SETTLED_STATES:
+            headers["Retry-After"] = str(CHECKOUT_POLL_SECONDS)
+        return Response(CheckoutAttemptSerializer(attempt).data, headers=headers)
+
+
 @extend_schema_view(
     list=extend_schema(tags=["orders"], summary="List your orders",
                        responses={200: OrderSerializer(many=True), 401: ERROR}),
@@ -331,8 +381,24 @@ class OrderViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.Ge
     lookup_field = "saleor_order_id"
     lookup_value_regex = "[^/]+"
 
+    pagination_class = OrderCursorPagination
+
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by("-created_at")
+        return (
+            Order.objects.filter(user=self.request.user)
+            .only(*ORDER_HISTORY_FIELDS)
+            .order_by("-created_at", "-id")
+        )
+
+    # Serialization happens inside list/retrieve, so the whole read stays on
+    # the replica (when configured and the user has not just checked out)
+    def list(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return super().retrieve(request, *args, **kwargs)
 
 
 class ProfileView(APIView):
@@ -375,7 +441,8 @@ class TokenView(APIView):
       spread across many IPs still locks the targeted account and emails its
       owner once per window;
     * the same per-IP rate limit the login form uses, on top of DRF's
-      scoped throttle;
+      scoped throttle, checked together with the lockout in one cache
+      round trip (`accounts.services.credential_guard`);
     * MFA: an account with a confirmed TOTP device must supply a current
       code, so an API token cannot bypass an admin's second factor;
     * the email-verification policy applied elsewhere in the product.
@@ -390,26 +457,43 @@ class TokenView(APIView):
         summary="Exchange credentials for an access and refresh token",
         request=TokenRequestSerializer,
         responses={200: TokenPairSerializer, 400: ERROR, 401: ERROR,
-                   403: ERROR, 429: ERROR},
+                   403: ERROR, 429: ERROR, 503: ERROR},
     )
-    @method_decorator(rate_limit("api-token", limit=5, window_seconds=300))
     def post(self, request):
         payload = TokenRequestSerializer(data=request.data)
         payload.is_valid(raise_exception=True)
         username = payload.validated_data["username"]
 
-        if is_locked(username):
+        verdict = credential_guard.check(
+            request, "api-token", username, limit=5, window_seconds=300
+        )
+        if verdict == credential_guard.RATE_LIMITED:
+            raise APIError(
+                "rate_limited",
+                "Too many attempts. Try again later.",
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+        if verdict == credential_guard.LOCKED:
             raise APIError(
                 "account_locked",
                 "Too many failed attempts. Try again later.",
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             )
 
-        user = authenticate(
-            request,
-            username=username,
-            password=payload.validated_data["password"],
-        )
+        try:
+            with verification_slot():
+                user = authenticate(
+                    request,
+                    username=username,
+                    password=payload.validated_data["password"],
+                )
+        except HashingBusy:
+            raise APIError(
+                "authentication_busy",
+                "Sign-in is busy right now. Retry shortly.",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                details={"retry_after_seconds": RETRY_AFTER_SECONDS},
+            ) from None
         if user is None or not user.is_active:
             register_failure(username)
             # Uniform failure: no signal about which part was wrong
@@ -420,7 +504,7 @@ class TokenView(APIView):
 
         # A second factor that guards the admin must guard the API too,
         # or a password alone reissues equivalent access.
-        devices = list(devices_for_user(user, confirmed=True))
+        devices = mfa.confirmed_devices(user)
         if devices:
             otp_code = (payload.validated_data.get("otp") or "").strip()
             if not otp_code:
@@ -429,7 +513,7 @@ class TokenView(APIView):
                     "This account requires a one-time code.",
                     status_code=status.HTTP_403_FORBIDDEN,
                 )
-            if not any(device.verify_token(otp_code) for device in devices):
+            if not mfa.verify(devices, otp_code):
                 register_failure(username)
                 raise APIError(
                     "otp_invalid", "Incorrect one-time code.",
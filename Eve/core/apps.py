@@ -7,3 +7,6 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         from . import checks  # noqa: F401 — registers deploy-time checks
+        from .tracing import configure as configure_tracing
+
+        configure_tracing()
@@ -1,4 +1,4 @@
-"""JSON serializer for the Redis cache backend.
+"""Redis cache backend: JSON serializer and instrumented client.
 
 Django's default Redis serializer pickles values, which turns a Redis
 compromise into code execution in the app (threat model R2). Everything Eve
@@ -6,19 +6,99 @@ caches is JSON-shaped (counters, flags, JWKS documents, session dicts), so
 JSON round-trips losslessly and deserialization is inert.
 
 Integers pass through raw — exactly like Django's own serializer — so that
-Redis INCR keeps working for rate-limit and lockout counters.
+Redis INCR keeps working for rate-limit and lockout counters. Everything else
+goes through core.fastjson: sessions and throttle state are (de)serialized
+on most requests.
+
+RedisCache is Django's backend with an instrumented client. Every command,
+and every pipeline, adds its round trip to the request's `redis_ms` /
+`redis_calls` (core/monitoring.py) and gets a span when tracing is on
+(core/tracing.py). It covers `cache.*` calls, cached sessions and the
+pipelines of `redis_client()`.
 """
-import json
+import time
+
+import redis
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache
+from django.core.cache.backends.redis import RedisCacheClient
+from opentelemetry.trace import SpanKind
+
+from . import fastjson, tracing
+from .monitoring import redis_calls_var, redis_ms_var
 
 
 class SafeJSONSerializer:
     def dumps(self, obj):
         if type(obj) is int:  # noqa: E721 — bool must NOT pass through raw
             return obj
-        return json.dumps(obj).encode()
+        return fastjson.dumps(obj)
 
     def loads(self, data):
         try:
             return int(data)
         except (ValueError, TypeError):
-            return json.loads(data)
+            return fastjson.loads(data)
+
+
+def redis_client():
+    """The redis-py client behind the default cache, or None when the cache
+    is not Redis (LocMem in dev and tests).
+
+    Only for the few hot paths that need a pipeline to save round trips;
+    keys must go through `cache.make_and_validate_key` so they stay
+    interchangeable with ordinary `cache.get`/`cache.incr` calls.
+    """
+    from django.core.cache import cache
+
+    backend = getattr(cache, "_cache", None)
+    if backend is None or not hasattr(backend, "get_client"):
+        return None
+    return backend.get_client(write=True)
+
+
+def _account(started):
+    redis_ms_var.set(redis_ms_var.get() + (time.monotonic() - started) * 1000)
+    redis_calls_var.set(redis_calls_var.get() + 1)
+
+
+class InstrumentedRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with tracing.span(f"redis.{args[0]}", SpanKind.CLIENT, **{
+                "db.system": "redis", "db.operation": str(args[0]),
+            }):
+                return super().execute_command(*args, **options)
+        finally:
+            _account(started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        def traced_execute(raise_on_error=True):
+            # One round trip, however many commands it carries
+            started = time.monotonic()
+            try:
+                with tracing.span("redis.pipeline", SpanKind.CLIENT, **{
+                    "db.system": "redis",
+                    "db.operation": " ".join(str(args[0]) for args, _ in pipe.command_stack),
+                }):
+                    return execute(raise_on_error)
+            finally:
+                _account(started)
+
+        pipe.execute = traced_execute
+        return pipe
+
+
+class _InstrumentedClient(RedisCacheClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = InstrumentedRedis
+
+
+class RedisCache(DjangoRedisCache):
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = _InstrumentedClient
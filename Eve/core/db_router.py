@@ -0,0 +1,95 @@
+"""Read-replica routing for staleness-tolerant reads.
+
+The primary takes every checkout and webhook write; order history, export
+and monitoring reads only compete with them there. When a replica is
+configured (DB_REPLICA_HOST adds the `replica` alias), code opts individual
+reads into it with `replica_reads()`. Nothing is routed implicitly: a read
+that feeds a write decision must see the primary, and only the caller knows
+which kind it is making.
+
+A replica trails the primary by its replication lag, so a user who has just
+checked out could open their history and not find the order. Whatever
+creates a user's Order (checkout, `reconcile_orders --fix`) calls
+`pin_to_primary(user)` once it has committed, and for DB_REPLICA_PIN_SECONDS
+afterwards that user's `replica_reads(user)` blocks read the primary instead.
+
+Writes always go to the primary, including saves of objects that were
+loaded from the replica, and migrations never run against it.
+"""
+import contextvars
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB = "replica"
+
+_replica_reads = contextvars.ContextVar("replica_reads", default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB in settings.DATABASES
+
+
+def _pin_key(user_id) -> str:
+    return f"db:primary-pin:{user_id}"
+
+
+def pin_to_primary(user):
+    """Send `user`'s replica reads to the primary for DB_REPLICA_PIN_SECONDS."""
+    if not replica_configured():
+        return
+    try:
+        cache.set(_pin_key(user.pk), 1, timeout=settings.DB_REPLICA_PIN_SECONDS)
+    except Exception:
+        logger.exception("Replica pin cache unavailable; user may read stale history")
+
+
+def _pinned(user) -> bool:
+    if user is None or not user.is_authenticated:
+        return False
+    try:
+        return cache.get(_pin_key(user.pk)) is not None
+    except Exception:
+        logger.exception("Replica pin cache unavailable; reading the primary")
+        return True
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Route reads inside the block to the replica, when one is configured
+    and `user` (if given) has not checked out within the pin window.
+
+    Querysets are lazy: evaluate them inside the block, or they run later
+    against the primary.
+    """
+    token = _replica_reads.set(replica_configured() and not _pinned(user))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Inside a transaction the primary is authoritative: the block may
+        # have written rows the replica cannot have yet
+        if _replica_reads.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return REPLICA_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data either side; a replica-loaded row may point at a primary one
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_DB}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == REPLICA_DB else None
@@ -0,0 +1,37 @@
+"""Per-request deadlines for upstream calls.
+
+RequestDeadlineMiddleware gives each request whose route has a budget in
+REQUEST_BUDGETS_MS an absolute deadline (monotonic clock), counted from the
+moment the request reached Django. Upstream clients read `remaining()` to
+clamp their timeouts and to skip retries that could not finish before the
+caller gives up anyway. Outside a budgeted request (Celery tasks, management
+commands, unbudgeted routes such as checkout) there is no deadline and
+clients keep their own timeouts.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+deadline_var = contextvars.ContextVar("deadline", default=None)
+
+
+def remaining():
+    """Seconds left before the current deadline (never negative), or None
+    when no deadline applies."""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+@contextmanager
+def deadline(seconds: float, *, started: float = None):
+    """Impose a deadline `seconds` after `started` (default: now) for the
+    enclosed code. An enclosing, earlier deadline still wins."""
+    candidate = (time.monotonic() if started is None else started) + seconds
+    current = deadline_var.get()
+    token = deadline_var.set(candidate if current is None else min(current, candidate))
+    try:
+        yield
+    finally:
+        deadline_var.reset(token)
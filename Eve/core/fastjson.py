@@ -0,0 +1,46 @@
+"""JSON encoding for the hot paths: cache values, log lines, API bodies,
+webhook payloads and Saleor responses.
+
+orjson when it is installed (requirements.txt pins it), else the standard
+library, behind one interface so callers never branch on the backend:
+`dumps` always returns bytes and `loads` accepts bytes or str. Output is
+compact and UTF-8 either way. Both backends raise TypeError for values they
+cannot encode and ValueError for malformed input, so callers' existing
+exception handling keeps working. Values orjson refuses but the standard
+library accepts (integers beyond 64 bits) are encoded by the fallback.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+if orjson:
+    # Non-string keys are stringified like the standard library does
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, default=None, passthrough_datetime=False) -> bytes:
+        """Encode `obj`. `passthrough_datetime` hands datetimes to `default`
+        instead of orjson's RFC 3339 rendering, for callers with their own
+        format (DRF)."""
+        options = _OPTIONS | (orjson.OPT_PASSTHROUGH_DATETIME if passthrough_datetime else 0)
+        try:
+            return orjson.dumps(obj, default=default, option=options)
+        except orjson.JSONEncodeError:
+            return _stdlib_dumps(obj, default)
+
+    loads = orjson.loads
+else:
+    def dumps(obj, default=None, passthrough_datetime=False) -> bytes:
+        return _stdlib_dumps(obj, default)
+
+    loads = json.loads
+
+
+def _stdlib_dumps(obj, default) -> bytes:
+    return json.dumps(
+        obj, default=default, separators=(",", ":"), ensure_ascii=False
+    ).encode()
@@ -5,12 +5,24 @@ log record carries it, so one request's records can be joined across
 workers. The redaction filter is a safety net — the primary control is that
 code never logs credentials, cookies, health data, or payment data in the
 first place.
+
+Records are shipped asynchronously (AsyncQueueHandler): the logging thread
+only stamps the correlation ID, renders the message and enqueues it. The
+redaction, JSON formatting and the write to stderr happen on one background
+thread, so a slow log pipe or a long traceback never holds up a request.
 """
+import atexit
 import contextvars
-import json
 import logging
+import os
+import queue
 import re
+import sys
+import threading
 from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from . import fastjson
 
 request_id_var = contextvars.ContextVar("request_id", default="")
 
@@ -41,9 +53,27 @@ _REDACTION_PATTERNS = [
 ]
 
 
+# One literal (or digit run) every match of the pattern at the same index
+# must contain. A single scan finds which of them occur, and only those
+# patterns run; most log lines contain none and are returned untouched.
+# Replacements never introduce another pattern's trigger, so the output is
+# the same as running all of _REDACTION_PATTERNS in order.
+_REDACTION_TRIGGERS = re.compile(
+    "|".join(f"({trigger})" for trigger in (
+        "authorization", "bearer", "password", "secret", "api[_-]?key",
+        "sessionid", "csrftoken", "cookie", r"\d{13}", "body starts with",
+    )),
+    re.IGNORECASE,
+)
+
+
 def scrub(text: str) -> str:
-    for pattern, replacement in _REDACTION_PATTERNS:
-        text = pattern.sub(replacement, text)
+    triggered = {match.lastindex - 1 for match in _REDACTION_TRIGGERS.finditer(text)}
+    if not triggered:
+        return text
+    for index, (pattern, replacement) in enumerate(_REDACTION_PATTERNS):
+        if index in triggered:
+            text = pattern.sub(replacement, text)
     return text
 
 
@@ -85,7 +115,8 @@ class JsonFormatter(logging.Formatter):
 
     def format(self, record):
         payload = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            # When it happened, not when the background thread wrote it
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -97,4 +128,98 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info:
             # Exception text bypasses filters — scrub it at format time
             payload["exception"] = scrub(self.formatException(record.exc_info))
-        return json.dumps(payload, default=str)
+        return fastjson.dumps(payload, default=str).decode()
+
+
+class _Listener(QueueListener):
+    """Writes queued records; reports drops once it catches up."""
+
+    def __init__(self, owner, handler_queue, target):
+        super().__init__(handler_queue, target)
+        self.owner = owner
+        self.reported = 0
+
+    def enqueue_sentinel(self):
+        # Blocking: on a full queue the sentinel waits for the writer
+        # instead of raising at shutdown
+        self.queue.put(self._sentinel)
+
+    def handle(self, record):
+        dropped = self.owner.dropped
+        if dropped > self.reported:
+            notice = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                "%d log record(s) dropped: log queue full", (dropped - self.reported,), None,
+            )
+            notice.event = "log_records_dropped"
+            notice.dropped = dropped - self.reported
+            notice.dropped_total = dropped
+            notice.request_id = "-"
+            self.reported = dropped
+            super().handle(notice)
+        super().handle(record)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """Enqueue records for a background thread that redacts, formats and
+    writes them to stderr (the handler's formatter applies there).
+
+    The queue holds at most `maxsize` records. When it is full, records are
+    dropped and counted instead of blocking the caller. The next record
+    written reports the count as a `log_records_dropped` warning. A forked
+    child (Celery prefork, gunicorn with preload) starts its own listener on
+    first use, and the queue is drained at interpreter exit.
+    """
+
+    def __init__(self, maxsize: int = 10000, stream=None):
+        self.maxsize = maxsize
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.target.addFilter(SensitiveDataFilter())
+        self.dropped = 0
+        self._lock_start = threading.Lock()
+        self._pid = None
+        self.listener = None
+        super().__init__(queue.Queue(maxsize))
+        atexit.register(self.flush_and_stop)
+
+    def setFormatter(self, fmt):
+        # Formatting belongs to the background writer
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock_start:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked: the parent's thread did not come along, and its
+                # queue may have been copied mid-operation
+                self.queue = queue.Queue(self.maxsize)
+            self.listener = _Listener(self, self.queue, self.target)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        """Cheap and caller-side only: resolve the message while its
+        arguments still hold their current values. Exception info travels
+        as is and is rendered (and scrubbed) by the writer."""
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def flush_and_stop(self):
+        """Write everything queued so far, then stop the writer."""
+        if self.listener and self._pid == os.getpid():
+            self.listener.stop()
+            self._pid = None
@@ -0,0 +1,108 @@
+"""Measure the JSON CPU cost of one typical request, core.fastjson against
+the standard library (docs/CAPACITY.md):
+
+    python manage.py bench_json --iterations 2000
+
+"One request" is a catalogue API call: read and write back the session,
+decode a 20-product Saleor response, render the 20-product response and
+format two log lines (`saleor_call`, `http_request`). Payloads are
+synthetic but shaped like production ones. CPU time (process_time) is
+reported, so a busy host skews the result less than wall time would.
+"""
+import json
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from core import fastjson
+
+
+def _product(i):
+    return {
+        "id": f"UHJvZHVjdDo{i}",
+        "name": f"Eve Horizon {i}",
+        "slug": f"eve-horizon-{i}",
+        "description": "A calm VR walk through a coastal forest at dawn. " * 4,
+        "thumbnail": {"url": f"https://cdn.example.com/products/{i}.png"},
+        "defaultVariant": {"id": f"UHJvZHVjdFZhcmlhbnQ6{i}"},
+        "pricing": {"priceRange": {
+            "start": {"gross": {"amount": 49.99, "currency": "EUR"}},
+            "stop": {"gross": {"amount": 49.99, "currency": "EUR"}},
+        }},
+    }
+
+
+def _workload():
+    products = [_product(i) for i in range(20)]
+    session = {
+        "_auth_user_id": "42",
+        "_auth_user_backend": "django.contrib.auth.backends.ModelBackend",
+        "_auth_user_hash": "f" * 64,
+        "_session_init_timestamp_": 1760000000.0,
+        "otp_device_id": None,
+    }
+    log_lines = [
+        {"timestamp": datetime.now(timezone.utc).isoformat(), "level": "INFO",
+         "logger": "ecommerce.services.saleor_client", "message": "saleor call ok",
+         "request_id": "a" * 32, "event": "saleor_call", "outcome": "ok",
+         "duration_ms": 84.2, "attempts": 1},
+        {"timestamp": datetime.now(timezone.utc).isoformat(), "level": "INFO",
+         "logger": "eve.requests", "message": "GET /api/v1/products/ -> 200",
+         "request_id": "a" * 32, "event": "http_request", "method": "GET",
+         "route": "api/v1/products/", "status": 200, "duration_ms": 101.5,
+         "db_queries": 3, "db_ms": 2.1, "mongo_ms": 4.4},
+    ]
+    saleor_body = json.dumps(
+        {"data": {"products": {"edges": [{"node": p} for p in products]}}}
+    ).encode()
+    session_blob = json.dumps(session).encode()
+    api_body = {"count": 20, "next": None, "previous": None, "results": products}
+    return saleor_body, session_blob, session, api_body, log_lines
+
+
+def _request_stdlib(saleor_body, session_blob, session, api_body, log_lines):
+    json.loads(session_blob)
+    json.loads(saleor_body)
+    json.dumps(api_body, separators=(",", ":"), ensure_ascii=False).encode()
+    for line in log_lines:
+        json.dumps(line, default=str)
+    json.dumps(session).encode()
+
+
+def _request_fast(saleor_body, session_blob, session, api_body, log_lines):
+    fastjson.loads(session_blob)
+    fastjson.loads(saleor_body)
+    fastjson.dumps(api_body)
+    for line in log_lines:
+        fastjson.dumps(line, default=str).decode()
+    fastjson.dumps(session)
+
+
+class Command(BaseCommand):
+    help = "Compare per-request JSON CPU time of core.fastjson and the standard library."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000,
+                            help="Simulated requests per backend (default 2000)")
+
+    @staticmethod
+    def _time(request, workload, iterations):
+        request(*workload)  # warm-up
+        started = time.process_time()
+        for _ in range(iterations):
+            request(*workload)
+        return (time.process_time() - started) / iterations * 1_000_000
+
+    def handle(self, *args, **options):
+        workload = _workload()
+        iterations = options["iterations"]
+        stdlib_us = self._time(_request_stdlib, workload, iterations)
+        fast_us = self._time(_request_fast, workload, iterations)
+        self.stdout.write(f"backend          : {fastjson.BACKEND}")
+        self.stdout.write(f"stdlib json      : {stdlib_us:8.1f} µs CPU per request")
+        self.stdout.write(f"core.fastjson    : {fast_us:8.1f} µs CPU per request")
+        self.stdout.write(
+            f"saved            : {stdlib_us - fast_us:8.1f} µs per request "
+            f"({stdlib_us / fast_us:.1f}x)" if fast_us else "saved            : n/a"
+        )
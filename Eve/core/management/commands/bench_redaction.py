@@ -0,0 +1,68 @@
+"""Measure the CPU cost of log redaction, the single-pass scrub against
+applying every pattern in turn (docs/OBSERVABILITY.md):
+
+    python manage.py bench_redaction --iterations 20000
+
+The corpus mirrors production traffic: most lines are routine request and
+Saleor call messages with nothing to redact, and a few carry an exception
+message with a token, a session cookie or a card-shaped number. CPU time
+(process_time) is reported per line.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.logging import _REDACTION_PATTERNS, scrub
+
+_CORPUS = [
+    "GET /api/v1/products/ -> 200",
+    "POST /cart/add/ -> 302",
+    "saleor call ok",
+    "saleor call failed: timeout after 2 attempt(s)",
+    "catalogue served from stale cache (saleor unavailable)",
+    "checkout attempt 8c1f2e reconciled: order 1042 confirmed",
+    "webhook ORDER_UPDATED accepted, delivery 5a7d3c queued",
+    "Celery task payments.tasks.reconcile_orders succeeded in 0.84s",
+    "upstream refused with Authorization: Bearer sk_live_51Habc",
+    "cookie: sessionid=abc123def456; csrftoken=xyz",
+    "card 4111111111111111 declined by issuer",
+    "HTTP 502 from Saleor. Body starts with: '<html><head>'",
+]
+
+
+def _sequential(text):
+    for pattern, replacement in _REDACTION_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class Command(BaseCommand):
+    help = "Compare per-line CPU time of single-pass and sequential log redaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000,
+                            help="Passes over the line corpus (default 20000)")
+
+    @staticmethod
+    def _time(function, iterations):
+        for line in _CORPUS:  # warm-up
+            function(line)
+        started = time.process_time()
+        for _ in range(iterations):
+            for line in _CORPUS:
+                function(line)
+        return (time.process_time() - started) / (iterations * len(_CORPUS)) * 1_000_000
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        mismatches = [line for line in _CORPUS if scrub(line) != _sequential(line)]
+        if mismatches:
+            self.stderr.write(f"outputs differ for: {mismatches!r}")
+        sequential_us = self._time(_sequential, iterations)
+        single_us = self._time(scrub, iterations)
+        self.stdout.write(f"sequential       : {sequential_us:8.2f} µs CPU per line")
+        self.stdout.write(f"single pass      : {single_us:8.2f} µs CPU per line")
+        self.stdout.write(
+            f"speed-up         : {sequential_us / single_us:8.1f}x" if single_us
+            else "speed-up         : n/a"
+        )
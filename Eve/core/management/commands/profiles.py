@@ -0,0 +1,91 @@
+"""Read the sampling profiler's output (core/profiling.py,
+docs/OBSERVABILITY.md):
+
+    python manage.py profiles                       # routes and slow requests
+    python manage.py profiles --route /shop/catalogue/ > catalogue.folded
+    python manage.py profiles --request <request_id> > slow.folded
+    python manage.py profiles --clear
+
+--route merges every worker's samples for that route; --request prints the
+capture of one slow request, found by the correlation ID in its
+`http_request` record. Both print collapsed stacks, most frequent first:
+pipe them to flamegraph.pl or open them in speedscope.
+"""
+import os
+import shutil
+from collections import Counter
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _read(path, into):
+    with open(path) as handle:
+        for line in handle:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                into[stack] += int(count)
+
+
+class Command(BaseCommand):
+    help = "List or print the sampling profiler's per-route and slow-request stacks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--route", help="Print the merged stacks of this route, e.g. /cart/")
+        parser.add_argument("--request", help="Print the capture of this slow request's ID")
+        parser.add_argument("--clear", action="store_true",
+                            help="Delete every profile written so far")
+
+    def _files(self, subdirectory):
+        directory = os.path.join(settings.PROFILER_DIR, subdirectory)
+        try:
+            return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                          if name.endswith(".folded"))
+        except FileNotFoundError:
+            return []
+
+    def _print(self, stacks):
+        for stack, count in stacks.most_common():
+            self.stdout.write(f"{stack} {count}")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            shutil.rmtree(settings.PROFILER_DIR, ignore_errors=True)
+            return
+
+        if options["request"]:
+            matches = [path for path in self._files("slow")
+                       if path.endswith(f"-{options['request']}.folded")]
+            if not matches:
+                raise CommandError(f"No capture for request {options['request']}.")
+            stacks = Counter()
+            _read(matches[0], stacks)
+            self._print(stacks)
+            return
+
+        # Route files are named <quoted route>.<pid>.folded
+        routes = {}
+        for path in self._files("routes"):
+            route = unquote(os.path.basename(path).rsplit(".", 2)[0])
+            _read(path, routes.setdefault(route, Counter()))
+
+        if options["route"]:
+            if options["route"] not in routes:
+                raise CommandError(f"No samples for route {options['route']}.")
+            self._print(routes[options["route"]])
+            return
+
+        if not routes:
+            self.stdout.write(f"No profiles in {settings.PROFILER_DIR}.")
+            return
+        self.stdout.write("samples  route")
+        for route, stacks in sorted(routes.items(), key=lambda item: -item[1].total()):
+            self.stdout.write(f"{stacks.total():7d}  {route}")
+        slow = self._files("slow")
+        if slow:
+            self.stdout.write("\nslow requests (newest last):")
+            for path in slow:
+                stacks = Counter()
+                _read(path, stacks)
+                self.stdout.write(f"{stacks.total():7d}  {os.path.basename(path)}")
@@ -0,0 +1,62 @@
+"""Deliver transactional-outbox publications to the Celery broker (core.outbox).
+
+Runs as its own long-lived process next to the workers:
+
+    python manage.py relay_outbox
+
+A full batch is followed by the next one at once; an empty one waits
+OUTBOX_POLL_SECONDS. While the broker is unreachable the messages stay in
+PostgreSQL and the relay backs off, up to MAX_BACKOFF_SECONDS, until it can
+deliver them. SIGTERM finishes the current batch and exits.
+"""
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.outbox import relay_once
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 10
+
+
+class Command(BaseCommand):
+    help = "Relay transactional-outbox task publications to the Celery broker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100,
+                            help="Messages per broker batch (default 100)")
+        parser.add_argument("--once", action="store_true",
+                            help="Deliver what is pending now, then exit")
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopping.set())
+
+        batch_size = options["batch_size"]
+        failures = 0
+        while not stopping.is_set():
+            close_old_connections()
+            try:
+                delivered = relay_once(batch_size)
+            except Exception:
+                failures += 1
+                delay = min(settings.OUTBOX_POLL_SECONDS * 2 ** failures, MAX_BACKOFF_SECONDS)
+                logger.exception(
+                    "Outbox relay failed; retrying in %.1fs", delay,
+                    extra={"event": "outbox_relay_failed", "failures": failures},
+                )
+                if options["once"]:
+                    raise
+                stopping.wait(delay)
+                continue
+            failures = 0
+            if options["once"] and delivered < batch_size:
+                return
+            if delivered < batch_size:
+                stopping.wait(settings.OUTBOX_POLL_SECONDS)
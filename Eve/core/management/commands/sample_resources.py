@@ -4,13 +4,26 @@ Run alongside a load test to see which resource saturates, or on a short
 cron in production for a continuous capacity signal:
 
     python manage.py sample_resources --interval 10 --duration 600
+
+Before scaling out, check the PostgreSQL connection budget for the planned
+size (web pods x gunicorn workers, plus connections kept for Celery and
+operators) against the server's max_connections:
+
+    python manage.py sample_resources --pods 6 --workers 5 --reserved 20
 """
 import json
+import logging
+import os
 import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from core.monitoring import log_resource_snapshot, snapshot_resources
+from core.monitoring import (
+    log_resource_snapshot,
+    logger,
+    postgres_connection_demand,
+    snapshot_resources,
+)
 
 
 class Command(BaseCommand):
@@ -25,8 +38,40 @@ class Command(BaseCommand):
             "--json", action="store_true",
             help="Write clean JSONL evidence to stdout for loadtest.evaluate",
         )
+        parser.add_argument(
+            "--pods", type=int, default=0,
+            help="Report PostgreSQL connection demand for this many web pods "
+                 "instead of sampling",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Gunicorn workers per pod for --pods (default: GUNICORN_WORKERS)",
+        )
+        parser.add_argument(
+            "--reserved", type=int, default=0,
+            help="Connections held outside the web pods (Celery, cron, operators)",
+        )
+
+    def _report_demand(self, options):
+        workers = options["workers"] or int(os.environ.get("GUNICORN_WORKERS", "0"))
+        if workers < 1:
+            raise CommandError("--pods needs --workers (or GUNICORN_WORKERS).")
+        report = postgres_connection_demand(options["pods"], workers, options["reserved"])
+        over = report.get("pg_headroom", 0) < 0
+        logger.log(
+            logging.WARNING if over else logging.INFO,
+            "PostgreSQL connection demand %s", report,
+            extra={"event": "pg_connection_demand", **report},
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps({"event": "pg_connection_demand", **report}))
+        else:
+            self.stdout.write(str(report))
 
     def handle(self, *args, **options):
+        if options["pods"]:
+            self._report_demand(options)
+            return
         interval = options["interval"]
         deadline = time.monotonic() + options["duration"] if options["duration"] else None
 
@@ -0,0 +1,46 @@
+"""Report which routes are burning their SLO budget (core/slo.py,
+docs/OBSERVABILITY.md):
+
+    python manage.py slo_report                  # last SLO_WINDOW_MINUTES
+    python manage.py slo_report --minutes 10 --check
+
+Counts come from every worker through Redis. --check exits non-zero while
+any route is burning, for cron or CI alerts.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slo import report
+
+
+class Command(BaseCommand):
+    help = "Show per-route p95 and error budget burn over the recent window."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutes", type=int, default=None,
+                            help="Window to evaluate (default SLO_WINDOW_MINUTES)")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+        parser.add_argument("--check", action="store_true",
+                            help="Exit non-zero if any route is burning its budget")
+
+    def handle(self, *args, **options):
+        status = report(options["minutes"])
+        if options["json"]:
+            self.stdout.write(json.dumps(status, indent=2))
+        else:
+            self.stdout.write(f"last {status['window_minutes']} minute(s)")
+            self.stdout.write(
+                f"{'route':40} {'requests':>8} {'p95':>8} {'budget':>7} "
+                f"{'latency':>8} {'errors':>8}"
+            )
+            for route, budget in status["routes"].items():
+                p95 = "-" if budget["p95_ms"] is None else f"{budget['p95_ms']:.0f}ms"
+                flag = "  BURNING" if budget["burning"] else ""
+                self.stdout.write(
+                    f"{route:40} {budget['requests']:8d} {p95:>8} "
+                    f"{budget['p95_budget_ms']:5d}ms {budget['latency_burn_rate']:7.2f}x "
+                    f"{budget['error_burn_rate']:7.2f}x{flag}"
+                )
+        if options["check"] and status["burning"]:
+            raise CommandError(f"Burning SLO budget: {', '.join(status['burning'])}")
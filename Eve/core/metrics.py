@@ -0,0 +1,164 @@
+"""Prometheus metrics, exposed on /metrics.
+
+Instruments are updated in process where the event happens (request
+latency and PostgreSQL/MongoDB/Redis time in RequestMetricsMiddleware,
+Saleor call outcomes in the Saleor client, MongoDB pool check-outs in the
+pool listener).
+Observing a histogram costs a lock and an addition, far less than shipping
+and parsing a log line. Under gunicorn every worker writes its samples to
+memory-mapped files in PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py creates
+it), and a scrape served by any worker aggregates all of them. Without that
+directory (runserver, tests, Celery) the process's own registry is served.
+
+Shared state that no single worker owns (Saleor circuit, PostgreSQL
+connections, Celery queue depths, webhook/outbox/checkout backlogs) is read
+once per scrape by SharedStateCollector, not on the request path.
+"""
+import logging
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger("eve.resources")
+
+# Label for requests that matched no URL pattern; the raw path would give
+# every scanner probe its own time series
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Upstream and query timings are mostly far below request latency
+_FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "eve_http_request_duration_seconds", "Time spent in Django per request.",
+    ["method", "route", "status"],
+)
+HTTP_DB_SECONDS = Histogram(
+    "eve_http_request_db_seconds", "PostgreSQL query time per request.",
+    ["route"], buckets=_FAST_BUCKETS,
+)
+HTTP_MONGO_SECONDS = Histogram(
+    "eve_http_request_mongo_seconds", "MongoDB command time per request.",
+    ["route"], buckets=_FAST_BUCKETS,
+)
+HTTP_REDIS_SECONDS = Histogram(
+    "eve_http_request_redis_seconds", "Redis round-trip time per request.",
+    ["route"], buckets=_FAST_BUCKETS,
+)
+HTTP_DB_CHECKOUT_SECONDS = Histogram(
+    "eve_http_request_db_checkout_seconds",
+    "Wait for a PostgreSQL connection, per request that opened one.",
+    buckets=_FAST_BUCKETS,
+)
+HTTP_QUEUE_SECONDS = Histogram(
+    "eve_http_request_queue_seconds",
+    "Time between the proxy accepting a request and a worker picking it up.",
+    buckets=_FAST_BUCKETS,
+)
+SALEOR_CALLS = Counter(
+    "eve_saleor_calls_total", "Saleor GraphQL calls by outcome.", ["outcome"],
+)
+SALEOR_CALL_SECONDS = Histogram(
+    "eve_saleor_call_duration_seconds", "Saleor GraphQL call time, retries included.",
+)
+MONGO_CONNECTIONS_CHECKED_OUT = Gauge(
+    "eve_mongo_connections_checked_out", "MongoDB connections in use.",
+    multiprocess_mode="livesum",
+)
+
+
+def observe_request(method, route, status, seconds, db_seconds, mongo_seconds,
+                    redis_seconds, db_checkout_seconds=None, queue_seconds=None):
+    try:
+        route = route or UNMATCHED_ROUTE
+        HTTP_REQUEST_SECONDS.labels(method, route, status).observe(seconds)
+        HTTP_DB_SECONDS.labels(route).observe(db_seconds)
+        HTTP_MONGO_SECONDS.labels(route).observe(mongo_seconds)
+        HTTP_REDIS_SECONDS.labels(route).observe(redis_seconds)
+        if db_checkout_seconds is not None:
+            HTTP_DB_CHECKOUT_SECONDS.observe(db_checkout_seconds)
+        if queue_seconds is not None:
+            HTTP_QUEUE_SECONDS.observe(queue_seconds)
+    except Exception:  # telemetry must never break a request
+        logger.exception("Request metrics not recorded")
+
+
+def observe_saleor_call(outcome, seconds):
+    try:
+        SALEOR_CALLS.labels(outcome).inc()
+        SALEOR_CALL_SECONDS.observe(seconds)
+    except Exception:
+        logger.exception("Saleor metrics not recorded")
+
+
+class SharedStateCollector:
+    """Gauges read at scrape time from the shared backends. A backend that
+    cannot be read leaves its gauges out of this scrape; it never fails it."""
+
+    def collect(self):
+        from ecommerce.services.saleor_client import _circuit_is_open
+
+        from .monitoring import _celery_stats, _postgres_stats
+
+        yield GaugeMetricFamily(
+            "eve_saleor_circuit_open", "1 while the Saleor circuit breaker is open.",
+            value=1 if _circuit_is_open() else 0,
+        )
+
+        postgres = _postgres_stats()
+        if "pg_total" in postgres:
+            connections = GaugeMetricFamily(
+                "eve_postgres_connections", "Connections to this database.",
+                labels=["state"],
+            )
+            connections.add_metric(["active"], postgres["pg_active"])
+            connections.add_metric(["total"], postgres["pg_total"])
+            yield connections
+            yield GaugeMetricFamily(
+                "eve_postgres_max_connections", "PostgreSQL max_connections.",
+                value=postgres["pg_max"],
+            )
+
+        stats = _celery_stats()
+        depths = GaugeMetricFamily(
+            "eve_celery_queue_depth", "Tasks waiting in the broker.", labels=["queue"],
+        )
+        for key, value in stats.items():
+            if key.startswith("queue_") and key.endswith("_depth"):
+                depths.add_metric([key[len("queue_"):-len("_depth")]], value)
+        yield depths
+        for key, help_text in (
+            ("webhook_pending", "Saleor webhooks received but not processed."),
+            ("webhook_oldest_seconds", "Age of the oldest unprocessed webhook."),
+            ("outbox_pending", "Outbox messages not yet relayed to the broker."),
+            ("outbox_oldest_seconds", "Age of the oldest unrelayed outbox message."),
+            ("checkout_uncertain", "Checkout attempts awaiting reconciliation."),
+        ):
+            if key in stats:
+                yield GaugeMetricFamily(f"eve_{key}", help_text, value=stats[key])
+
+
+class _ProcessMetrics:
+    """This process's own instruments, when there is no multiprocess dir."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def render() -> bytes:
+    """The exposition text for one scrape."""
+    registry = CollectorRegistry()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(_ProcessMetrics())
+    registry.register(SharedStateCollector())
+    return generate_latest(registry)
@@ -6,9 +6,18 @@ from ipaddress import ip_address, ip_network
 from django.conf import settings
 from django.db import connection
 from django.http import Http404
+from opentelemetry.trace import SpanKind, StatusCode
 
+from . import metrics, profiling, slo, tracing
+from .deadline import deadline_var
 from .logging import request_id_var
-from .monitoring import mongo_ms_var
+from .monitoring import (
+    db_checkout_ms_var,
+    hash_wait_ms_var,
+    mongo_ms_var,
+    redis_calls_var,
+    redis_ms_var,
+)
 
 request_logger = logging.getLogger("eve.requests")
 
@@ -35,6 +44,34 @@ class RequestIDMiddleware:
             request_id_var.reset(token)
 
 
+class RequestTracingMiddleware:
+    """Open the request's server span (core/tracing.py); every span the
+    request causes nests under it. Inbound trace headers are ignored, like
+    inbound X-Request-ID: clients must not pick trace IDs or force sampling.
+    The span is named after the route pattern; the path itself may carry
+    tokens (password reset) and is never recorded."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not tracing.enabled() or request.path.startswith(RequestMetricsMiddleware.SKIP_PREFIXES):
+            return self.get_response(request)
+        with tracing.span(request.method, SpanKind.SERVER, **{
+            "http.request.method": request.method,
+            "eve.request_id": request_id_var.get(),
+        }) as current:
+            response = self.get_response(request)
+            route = getattr(getattr(request, "resolver_match", None), "route", None)
+            if route is not None:
+                current.update_name(f"{request.method} /{route}")
+                current.set_attribute("http.route", f"/{route}")
+            current.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                current.set_status(StatusCode.ERROR)
+            return response
+
+
 class _QueryStats:
     def __init__(self):
         self.count = 0
@@ -51,10 +88,12 @@ class _QueryStats:
 
 class RequestMetricsMiddleware:
     """Emit one structured log event per request: latency, status, and
-    database time/queries. Error rates and latency percentiles are derived
-    from these events in the log platform (see docs/OBSERVABILITY.md)."""
+    database time/queries, and observe the same numbers in the /metrics
+    histograms (core/metrics.py, docs/OBSERVABILITY.md). Budgeted routes are
+    counted against their SLO (core/slo.py). With the profiler on, the
+    request's thread is sampled while it runs (core/profiling.py)."""
 
-    SKIP_PREFIXES = ("/healthz", "/static/")
+    SKIP_PREFIXES = ("/healthz", "/static/", "/metrics")
     SLOW_REQUEST_MS = 1000
 
     def __init__(self, get_response):
@@ -84,14 +123,22 @@ class RequestMetricsMiddleware:
 
         stats = _QueryStats()
         mongo_ms_var.set(0.0)  # per-request MongoDB accumulator
+        redis_ms_var.set(0.0)  # per-request Redis accumulators
+        redis_calls_var.set(0)
+        hash_wait_ms_var.set(None)  # set only if a password is verified
+        db_checkout_ms_var.set(None)  # set only if a connection is obtained
+        samples = profiling.request_started()
         started = time.monotonic()
         with connection.execute_wrapper(stats):
             response = self.get_response(request)
         duration_ms = round((time.monotonic() - started) * 1000, 1)
         mongo_ms = round(mongo_ms_var.get(), 1)
+        redis_ms = round(redis_ms_var.get(), 1)
 
-        route = getattr(getattr(request, "resolver_match", None), "route", "") or request.path
-        level = logging.WARNING if duration_ms > self.SLOW_REQUEST_MS else logging.INFO
+        resolver_match = getattr(request, "resolver_match", None)
+        route = getattr(resolver_match, "route", "") or request.path
+        slow = duration_ms > self.SLOW_REQUEST_MS
+        level = logging.WARNING if slow else logging.INFO
         payload = {
             "event": "http_request",
             "method": request.method,
@@ -101,10 +148,25 @@ class RequestMetricsMiddleware:
             "db_queries": stats.count,
             "db_ms": round(stats.seconds * 1000, 1),
             "mongo_ms": mongo_ms,
+            "redis_ms": redis_ms,
+            "redis_calls": redis_calls_var.get(),
         }
+        db_checkout_ms = db_checkout_ms_var.get()
+        if db_checkout_ms is not None:
+            payload["db_checkout_ms"] = round(db_checkout_ms, 1)
+        hash_wait_ms = hash_wait_ms_var.get()
+        if hash_wait_ms is not None:
+            payload["hash_wait_ms"] = round(hash_wait_ms, 1)
         queue_ms = self._queue_ms(request)
         if queue_ms is not None:
             payload["queue_ms"] = queue_ms
+        if samples is not None:
+            profile = profiling.request_finished(
+                samples, "/" + resolver_match.route if resolver_match else metrics.UNMATCHED_ROUTE,
+                request_id_var.get(), slow,
+            )
+            if profile is not None:
+                payload["profile"] = profile
 
         # Standard Server-Timing header: lets any client (browser devtools,
         # the load generator) separate time spent *in the application* from
@@ -120,10 +182,19 @@ class RequestMetricsMiddleware:
                 f"app;dur={duration_ms}",
                 f"db;dur={payload['db_ms']}",
                 f"mongo;dur={mongo_ms}",
+                f"redis;dur={redis_ms}",
             ]
             if queue_ms is not None:
                 timings.append(f"queue;dur={queue_ms}")
             response.headers["Server-Timing"] = ", ".join(timings)
+        metrics.observe_request(
+            request.method, route if resolver_match else None, response.status_code,
+            duration_ms / 1000, stats.seconds, mongo_ms / 1000, redis_ms / 1000,
+            db_checkout_seconds=None if db_checkout_ms is None else db_checkout_ms / 1000,
+            queue_seconds=None if queue_ms is None else queue_ms / 1000,
+        )
+        if resolver_match:
+            slo.record(f"{request.method} /{resolver_match.route}", response.status_code, duration_ms)
         request_logger.log(
             level,
             "%s %s -> %d in %sms",
@@ -133,6 +204,32 @@ class RequestMetricsMiddleware:
         return response
 
 
+class RequestDeadlineMiddleware:
+    """Apply the route's budget from REQUEST_BUDGETS_MS (keyed by URL name,
+    namespaced for the API) as the deadline for its upstream calls
+    (core/deadline.py). The clock starts when the request reaches this
+    middleware, so time spent in earlier middleware counts against it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._deadline_started = time.monotonic()
+        token = deadline_var.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            deadline_var.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Set, not entered as a context manager: a process_view that called
+        # the view itself would skip every later process_view (CSRF)
+        budget_ms = settings.REQUEST_BUDGETS_MS.get(request.resolver_match.view_name)
+        if budget_ms:
+            deadline_var.set(request._deadline_started + budget_ms / 1000)
+        return None
+
+
 class TrustedProxyMiddleware:
     """Resolve the real client IP behind trusted reverse proxies.
 
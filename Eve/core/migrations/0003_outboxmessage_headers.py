@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='headers',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
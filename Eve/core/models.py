@@ -9,4 +9,19 @@ class ContactMessage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.subject} from {self.email}"
\ No newline at end of file
+        return f"{self.subject} from {self.email}"
+
+class OutboxMessage(models.Model):
+    """A Celery task publication, written in the transaction that caused it
+    and delivered to the broker by `manage.py relay_outbox` (core.outbox)."""
+
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    # Correlation ID and trace context of the publishing request. Nullable:
+    # rows written by the previous release during a rollout have none
+    headers = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.task} queued {self.created_at:%Y-%m-%d %H:%M:%S}"
@@ -2,21 +2,29 @@
 
 Two mechanisms:
 - A pymongo pool listener that reports slow connection check-outs as they
-  happen (wait-queue pressure is invisible in request latency alone).
+  happen (wait-queue pressure is invisible in request latency alone);
+  core/postgresql/base.py does the same for the PostgreSQL pool.
 - `snapshot_resources()`, a point-in-time sample of PostgreSQL, Redis, and
   MongoDB pool usage, emitted by `manage.py sample_resources` during load
   tests and by cron in production.
 
-Everything logs structured events; nothing here needs a metrics backend.
+Everything logs structured events. The same pool and backlog figures are
+also served as Prometheus gauges on /metrics (core/metrics.py).
 """
 import contextvars
 import logging
+import os
 
 from django.conf import settings
 from django.db import connection
 from django.utils import timezone
+from opentelemetry.trace import SpanKind, StatusCode
 from pymongo import monitoring
 
+from . import tracing
+from .db_router import replica_reads
+from .metrics import MONGO_CONNECTIONS_CHECKED_OUT
+
 logger = logging.getLogger("eve.resources")
 
 # Milliseconds spent in MongoDB during the current request. Set per request
@@ -25,13 +33,40 @@ logger = logging.getLogger("eve.resources")
 # inferred.
 mongo_ms_var = contextvars.ContextVar("mongo_ms", default=0.0)
 
+# Milliseconds the current request queued for a password-verification slot
+# (accounts.services.hashing). Reported as `hash_wait_ms` only on requests
+# that verified a password, so it is a direct login-saturation signal.
+hash_wait_ms_var = contextvars.ContextVar("hash_wait_ms", default=None)
+
+# Milliseconds the current request spent obtaining a PostgreSQL connection:
+# pool check-out with DB_POOL, connection setup without it
+# (core/postgresql/base.py). None when the request opened no connection.
+db_checkout_ms_var = contextvars.ContextVar("db_checkout_ms", default=None)
+
+# Milliseconds and round trips spent in Redis during the current request:
+# rate limits, lockouts, leases, cached sessions, the Saleor circuit and
+# negative caches (core.cache.InstrumentedRedis; a pipeline is one call).
+# Reported as `redis_ms` / `redis_calls` and Server-Timing `redis;dur`.
+redis_ms_var = contextvars.ContextVar("redis_ms", default=0.0)
+redis_calls_var = contextvars.ContextVar("redis_calls", default=0)
+
 
 class MongoCommandTimer(monitoring.CommandListener):
-    """Accumulates MongoDB command duration into the per-request counter."""
+    """Accumulates MongoDB command duration into the per-request counter
+    and, with tracing on, gives each command a span. Events of one command
+    arrive on the thread that ran it, so the span nests under the caller's."""
 
-    def _record(self, event):
+    def __init__(self):
+        self._spans = {}
+
+    def _record(self, event, failed=False):
         try:
             mongo_ms_var.set(mongo_ms_var.get() + event.duration_micros / 1000)
+            command_span = self._spans.pop(event.request_id, None)
+            if command_span is not None:
+                if failed:
+                    command_span.set_status(StatusCode.ERROR)
+                command_span.end()
         except Exception:  # telemetry must never break a query
             pass
 
@@ -39,10 +74,23 @@ class MongoCommandTimer(monitoring.CommandListener):
         self._record(event)
 
     def failed(self, event):
-        self._record(event)
+        self._record(event, failed=True)
 
     def started(self, event):
-        pass
+        try:
+            collection = event.command.get(event.command_name)
+            command_span = tracing.start_span(
+                f"mongodb.{event.command_name}", SpanKind.CLIENT, **{
+                    "db.system": "mongodb",
+                    "db.name": event.database_name,
+                    "db.operation": event.command_name,
+                    "db.mongodb.collection": collection if isinstance(collection, str) else "",
+                },
+            )
+            if command_span is not None:
+                self._spans[event.request_id] = command_span
+        except Exception:
+            pass
 
 # Only report check-outs that actually waited — every request checks out a
 # connection, so logging them all would drown the log
@@ -53,6 +101,7 @@ class MongoPoolLogger(monitoring.ConnectionPoolListener):
     """Surfaces MongoDB wait-queue pressure and pool exhaustion."""
 
     def connection_checked_out(self, event):
+        MONGO_CONNECTIONS_CHECKED_OUT.inc()
         duration_ms = getattr(event, "duration", 0) * 1000
         if duration_ms >= SLOW_CHECKOUT_MS:
             logger.warning(
@@ -76,7 +125,9 @@ class MongoPoolLogger(monitoring.ConnectionPoolListener):
     def connection_ready(self, event): pass
     def connection_closed(self, event): pass
     def connection_check_out_started(self, event): pass
-    def connection_checked_in(self, event): pass
+
+    def connection_checked_in(self, event):
+        MONGO_CONNECTIONS_CHECKED_OUT.dec()
 
 
 def _postgres_stats():
@@ -95,6 +146,35 @@ def _postgres_stats():
         return {"pg_error": type(exc).__name__}
 
 
+def postgres_connection_demand(pods: int, workers: int, reserved: int = 0) -> dict:
+    """Worst-case PostgreSQL connections for `pods` web pods of `workers`
+    processes each, plus `reserved` for everything else (Celery, cron,
+    operators), against the server's max_connections.
+
+    Each process holds at most the pool's max_size connections; without
+    the pool it holds one per thread (GUNICORN_THREADS).
+    """
+    pool = settings.DATABASES["default"].get("OPTIONS", {}).get("pool")
+    if pool:
+        # psycopg_pool's own default when max_size is not given
+        per_process = pool.get("max_size", 4) if isinstance(pool, dict) else 4
+    else:
+        per_process = int(os.environ.get("GUNICORN_THREADS", "4"))
+    demand = pods * workers * per_process + reserved
+    report = {
+        "pg_pool_enabled": bool(pool),
+        "pg_connections_per_process": per_process,
+        "pg_demand": demand,
+    }
+    stats = _postgres_stats()
+    if "pg_max" in stats:
+        report["pg_max"] = stats["pg_max"]
+        report["pg_headroom"] = stats["pg_max"] - demand
+    else:
+        report.update(stats)
+    return report
+
+
 def _redis_stats():
     """In-use vs available connections in this process's pool."""
     try:
@@ -141,7 +221,7 @@ def _mongo_stats():
 
 
 def _celery_stats():
-    """Broker queue depth and durable webhook backlog age."""
+    """Broker queue depth, and durable webhook and outbox backlog age."""
     stats = {}
     try:
         from redis import Redis
@@ -161,31 +241,41 @@ def _celery_stats():
     try:
         from payments.models import CheckoutAttempt, WebhookEvent
 
-        pending = WebhookEvent.objects.filter(status=WebhookEvent.Status.PENDING)
-        oldest = pending.order_by("received_at").values_list("received_at", flat=True).first()
-        stats["webhook_pending"] = pending.count()
-        stats["webhook_oldest_seconds"] = (
+        # Backlog ages tolerate replication lag; keep the scan off the primary
+        with replica_reads():
+            pending = WebhookEvent.objects.filter(status=WebhookEvent.Status.PENDING)
+            oldest = pending.order_by("received_at").values_list("received_at", flat=True).first()
+            stats["webhook_pending"] = pending.count()
+            stats["webhook_oldest_seconds"] = (
+                round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0
+            )
+            uncertain = CheckoutAttempt.objects.filter(
+                state__in=CheckoutAttempt.RECONCILE_STATES
+            )
+            oldest_attempt = uncertain.order_by("created_at").values_list(
+                "created_at", flat=True
+            ).first()
+            stats["checkout_uncertain"] = uncertain.count()
+            stats["checkout_oldest_uncertain_seconds"] = (
+                round((timezone.now() - oldest_attempt).total_seconds(), 1)
+                if oldest_attempt
+                else 0
+            )
+    except Exception as exc:
+        stats["webhook_backlog_error"] = type(exc).__name__
+
+    try:
+        from core.models import OutboxMessage
+
+        # On the primary: relayed rows are deleted within a poll interval,
+        # well inside any replication lag
+        oldest = OutboxMessage.objects.order_by("pk").values_list("created_at", flat=True).first()
+        stats["outbox_pending"] = OutboxMessage.objects.count()
+        stats["outbox_oldest_seconds"] = (
             round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0
         )
-        uncertain = CheckoutAttempt.objects.filter(
-            state__in=[
-                CheckoutAttempt.State.STARTED,
-                CheckoutAttempt.State.CHECKOUT_CREATED,
-                CheckoutAttempt.State.COMPLETING,
-                CheckoutAttempt.State.UNKNOWN,
-            ]
-        )
-        oldest_attempt = uncertain.order_by("created_at").values_list(
-            "created_at", flat=True
-        ).first()
-        stats["checkout_uncertain"] = uncertain.count()
-        stats["checkout_oldest_uncertain_seconds"] = (
-            round((timezone.now() - oldest_attempt).total_seconds(), 1)
-            if oldest_attempt
-            else 0
-        )
     except Exception as exc:
-        stats["webhook_backlog_error"] = type(exc).__name__
+        stats["outbox_error"] = type(exc).__name__
     return stats
 
 
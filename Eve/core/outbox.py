@@ -0,0 +1,104 @@
+"""Transactional outbox for Celery task publications.
+
+Calling `.delay()` from a request thread made the request wait on broker
+I/O, and a publication that failed after the business rows committed was
+only logged: the work waited for a recovery sweep, or never ran at all.
+`publish()` instead writes an OutboxMessage row in the caller's transaction,
+so the publication commits or rolls back with the rows it refers to and no
+request ever talks to the broker.
+
+`manage.py relay_outbox` delivers the rows in batches over one producer
+connection and deletes them once sent. A broker error stops the batch, but
+the rows already sent are still deleted, so only the unsent ones go out
+again. Delivery is still at least once: a relay that dies between sending
+and committing sends its batch again. Tasks that change state must
+therefore be idempotent. Webhook processing and checkout completion are,
+because they act only on rows still in their pending state. A duplicate
+verification or lockout email is the accepted cost of that crash. Several
+relays may run at once; each claims its batch with SKIP LOCKED.
+
+Under CELERY_TASK_ALWAYS_EAGER (tests, local runs without a broker) no relay
+runs, so `publish()` delivers at once and the task runs inline, as `.delay()`
+did.
+"""
+import logging
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from opentelemetry.trace import SpanKind
+
+from . import tracing
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def publish(task, *args, **kwargs):
+    """Queue `task(*args, **kwargs)` for delivery once the current
+    transaction commits. Arguments must be JSON-serializable. The task
+    runs with this request's correlation ID and in its trace."""
+    with tracing.span(f"outbox {task.name}", SpanKind.PRODUCER):
+        message = OutboxMessage.objects.create(
+            task=task.name, args=list(args), kwargs=kwargs, headers=tracing.inject({}),
+        )
+    if getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False):
+        _deliver([message])
+    return message
+
+
+def _deliver(messages, producer=None) -> int:
+    """Send `messages` and delete the rows of those that were sent, even
+    when a later send fails."""
+    delivered = []
+    try:
+        for message in messages:
+            task = current_app.tasks.get(message.task)
+            if task is None:
+                # A task renamed or removed since it was published; retrying
+                # cannot help, and the row must not block the ones behind it
+                logger.error(
+                    "Outbox message %s names unknown task %s; dropped",
+                    message.pk, message.task,
+                    extra={"event": "outbox_unknown_task", "task": message.task},
+                )
+            else:
+                task.apply_async(
+                    message.args, message.kwargs, producer=producer, headers=message.headers
+                )
+            delivered.append(message.pk)
+    finally:
+        if delivered:
+            OutboxMessage.objects.filter(pk__in=delivered).delete()
+    return len(delivered)
+
+
+def relay_once(batch_size: int = 100) -> int:
+    """Deliver up to `batch_size` of the oldest pending messages; returns
+    how many were delivered. Broker errors propagate after the deletion of
+    the messages already sent has committed."""
+    failure = None
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .order_by("pk")[:batch_size]
+        )
+        if not batch:
+            return 0
+        lag_ms = round((timezone.now() - batch[0].created_at).total_seconds() * 1000, 1)
+        try:
+            with current_app.producer_or_acquire() as producer:
+                delivered = _deliver(batch, producer=producer)
+        except Exception as error:
+            # Raised inside the atomic block, it would roll back the
+            # deletion of the messages sent before it, and the next relay
+            # would send them again
+            failure = error
+    if failure is not None:
+        raise failure
+    logger.info(
+        "Outbox relayed %d message(s)", delivered,
+        extra={"event": "outbox_relay", "delivered": delivered, "lag_ms": lag_ms},
+    )
+    return delivered
@@ -0,0 +1,50 @@
+"""Django's PostgreSQL backend, with connection check-out timed.
+
+With the psycopg pool (DB_POOL), every request borrows its connection when
+it first touches the database; when every connection is busy that borrow
+queues, and the wait is invisible in `db_ms`, which only covers query
+execution. Without the pool the same hook times opening a fresh connection
+(TCP, TLS, authentication). Either way the time lands in the request's
+`db_checkout_ms` (docs/OBSERVABILITY.md).
+
+With tracing on, every query also gets a span (core/tracing.py).
+"""
+import logging
+import time
+
+from django.db.backends.postgresql import base
+from psycopg_pool import PoolTimeout
+
+from core import tracing
+from core.monitoring import SLOW_CHECKOUT_MS, db_checkout_ms_var
+
+logger = logging.getLogger("eve.resources")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if tracing.enabled():
+            # First in the list, so it stays the outermost wrapper under
+            # the per-request ones pushed and popped above it
+            self.execute_wrappers.append(tracing.traced_query)
+
+    def get_new_connection(self, conn_params):
+        started = time.monotonic()
+        try:
+            return super().get_new_connection(conn_params)
+        except PoolTimeout:
+            logger.error(
+                "PostgreSQL pool check-out timed out after %.0fms",
+                (time.monotonic() - started) * 1000,
+                extra={"event": "pg_pool_exhausted"},
+            )
+            raise
+        finally:
+            waited_ms = (time.monotonic() - started) * 1000
+            db_checkout_ms_var.set((db_checkout_ms_var.get() or 0.0) + waited_ms)
+            if self.pool is not None and waited_ms >= SLOW_CHECKOUT_MS:
+                logger.warning(
+                    "PostgreSQL connection wait %.0fms", waited_ms,
+                    extra={"event": "pg_pool_wait", "wait_ms": round(waited_ms, 1)},
+                )
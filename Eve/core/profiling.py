@@ -0,0 +1,194 @@
+"""Continuous sampling profiler (docs/OBSERVABILITY.md, "Profiling").
+
+With PROFILER_ENABLED, a daemon thread in each worker process wakes every
+PROFILER_INTERVAL_MS and records the Python stack of every thread that is
+serving a request (RequestMetricsMiddleware registers them). Stacks are
+tallied per route and written to PROFILER_DIR as collapsed stacks, one
+`frame;frame;frame count` line per distinct stack: the input format of
+flamegraph.pl and speedscope. A request slower than SLOW_REQUEST_MS also
+gets a file of its own, named in its `http_request` record (`profile`).
+`manage.py profiles` lists and merges the files of every worker.
+
+A thread, not a SIGPROF timer: Python runs signal handlers on the main
+thread only, and gthread workers serve requests on other threads. The
+request thread only registers and unregisters itself; walking stacks,
+tallying and writing files all happen on the sampler thread.
+"""
+import atexit
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from django.conf import settings
+
+logger = logging.getLogger("eve.resources")
+
+# Per-route totals are rewritten this often; a slow request's file is
+# written on the next sample
+FLUSH_SECONDS = 30
+
+_lock = threading.Lock()
+# Thread ID -> stacks sampled during that thread's current request
+_active = {}
+# Route -> stacks sampled in this process, and the routes not yet flushed
+_routes = defaultdict(Counter)
+_dirty = set()
+# Slow requests whose samples are waiting to be written: (name, stacks)
+_captured = []
+_pid = None
+
+
+def route_filename(route: str) -> str:
+    """Reversible (urllib.parse.unquote) and safe as a file name."""
+    return quote(route, safe="")
+
+
+# Code object -> "module:qualname"; a code object belongs to one module, so
+# each label is built once
+_labels = {}
+
+
+def _collapse(frame):
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        label = _labels.get(code)
+        if label is None:
+            label = _labels[code] = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+        labels.append(label)
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sample():
+    """Record one stack for every thread serving a request."""
+    frames = sys._current_frames()
+    with _lock:
+        for thread_id, stacks in _active.items():
+            frame = frames.get(thread_id)
+            if frame is not None:
+                stacks[_collapse(frame)] += 1
+
+
+def _write(path, stacks):
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "w") as handle:
+        for stack, count in stacks.most_common():
+            handle.write(f"{stack} {count}\n")
+    os.replace(partial, path)  # readers never see half a file
+
+
+def _prune(directory, keep):
+    # Names start with a UTC timestamp, so name order is age order
+    names = sorted(os.listdir(directory))
+    for name in names[:max(0, len(names) - keep)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:  # another worker got there first
+            pass
+
+
+def flush():
+    """Write pending slow-request captures and the per-route totals of
+    every route sampled since the last flush."""
+    with _lock:
+        captured = _captured[:]
+        _captured.clear()
+        routes = {route: _routes[route].copy() for route in _dirty}
+        _dirty.clear()
+    directory = settings.PROFILER_DIR
+    try:
+        if captured:
+            os.makedirs(os.path.join(directory, "slow"), exist_ok=True)
+            for name, stacks in captured:
+                _write(os.path.join(directory, "slow", name), stacks)
+            _prune(os.path.join(directory, "slow"), settings.PROFILER_KEEP_SLOW)
+        if routes:
+            os.makedirs(os.path.join(directory, "routes"), exist_ok=True)
+            for route, stacks in routes.items():
+                _write(
+                    os.path.join(directory, "routes", f"{route_filename(route)}.{os.getpid()}.folded"),
+                    stacks,
+                )
+    except OSError:
+        logger.exception("Profiles not written to %s", directory)
+
+
+def _run(interval):
+    next_flush = time.monotonic() + FLUSH_SECONDS
+    while True:
+        time.sleep(interval)
+        try:
+            sample()
+            now = time.monotonic()
+            if now >= next_flush:
+                next_flush = now + FLUSH_SECONDS
+                flush()
+            elif _captured:
+                flush()
+        except Exception:  # the profiler must never take the worker down
+            logger.exception("Profiler sample failed")
+
+
+def _ensure_sampler():
+    global _pid
+    if _pid == os.getpid():
+        return
+    with _lock:
+        if _pid == os.getpid():
+            return
+        threading.Thread(
+            target=_run, args=(settings.PROFILER_INTERVAL_MS / 1000,),
+            name="eve-profiler", daemon=True,
+        ).start()
+        atexit.register(flush)
+        _pid = os.getpid()
+
+
+def _forked():
+    # The parent's sampler thread does not come along, its samples are the
+    # parent's to write, and the lock may have been copied held
+    global _lock, _pid
+    _lock = threading.Lock()
+    _pid = None
+    _active.clear()
+    _routes.clear()
+    _dirty.clear()
+    _captured.clear()
+
+
+os.register_at_fork(after_in_child=_forked)
+
+
+def request_started():
+    """Have the current thread sampled until `request_finished`. Returns
+    the request's sample tally, or None with the profiler off."""
+    if not settings.PROFILER_ENABLED:
+        return None
+    _ensure_sampler()
+    stacks = Counter()
+    with _lock:
+        _active[threading.get_ident()] = stacks
+    return stacks
+
+
+def request_finished(stacks, route, request_id, slow):
+    """Add the request's samples to its route's tally. A slow request's
+    samples are also kept on their own; the file name is returned."""
+    with _lock:
+        _active.pop(threading.get_ident(), None)
+        if not stacks:
+            return None
+        _routes[route].update(stacks)
+        _dirty.add(route)
+        if not slow:
+            return None
+        finished = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        name = f"{finished}-{request_id or 'unknown'}.folded"
+        _captured.append((name, stacks))
+    return name
@@ -0,0 +1,258 @@
+"""Per-route latency and error budgets, tracked in production
+(docs/OBSERVABILITY.md, "SLO budgets").
+
+The budgets are the load test's release budgets (loadtest/config.py), held
+per route: a p95 ceiling, and at most MAX_FAILURE_RATIO of requests
+answered with a 5xx. Each worker records its budgeted requests in one
+latency sketch per route. Every FLUSH_SECONDS a background thread adds
+those counts to the current minute's Redis hash. `report()` merges the last
+SLO_WINDOW_MINUTES of every worker and says which routes are burning their
+budget faster than it allows. `manage.py slo_report` and /healthz/slo/ serve
+the result.
+
+Without Redis (dev, tests) the minute buckets live in the default cache,
+which only holds one process's requests.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from loadtest.config import BUDGET_ROUTES, MAX_FAILURE_RATIO, P95_BUDGETS_MS
+
+from .cache import redis_client
+
+logger = logging.getLogger("eve.resources")
+
+FLUSH_SECONDS = 10
+# A p95 budget lets 5 % of requests run over it
+LATENCY_ALLOWANCE = 0.05
+
+
+def _route_budgets():
+    budgets = {}
+    for name, route in BUDGET_ROUTES.items():
+        budgets[route] = max(budgets.get(route, 0), P95_BUDGETS_MS[name])
+    return budgets
+
+
+# "METHOD /pattern" -> p95 budget in milliseconds
+BUDGETS_MS = _route_budgets()
+
+
+class LatencySketch:
+    """DDSketch (Masson, Rim & Lee, 2019): latencies counted in
+    logarithmically spaced buckets, so any quantile is returned within
+    ACCURACY of its true value. Sketches merge by adding bucket counts,
+    which Redis does with HINCRBY."""
+
+    ACCURACY = 0.01
+    _GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    _LOG_GAMMA = math.log(_GAMMA)
+    # Everything faster shares the lowest bucket
+    _FLOOR_MS = 0.01
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.errors = 0
+
+    @classmethod
+    def bucket(cls, ms: float) -> int:
+        return math.ceil(math.log(max(ms, cls._FLOOR_MS)) / cls._LOG_GAMMA)
+
+    @classmethod
+    def _value(cls, bucket: int) -> float:
+        # The point of the bucket that is within ACCURACY of either bound
+        return 2 * cls._GAMMA ** bucket / (cls._GAMMA + 1)
+
+    def add(self, ms: float, error: bool = False):
+        self.buckets[self.bucket(ms)] += 1
+        self.count += 1
+        self.errors += error
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.errors += other.errors
+
+    def quantile(self, q: float):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return self._value(bucket)
+        return self._value(max(self.buckets))
+
+    def share_above(self, ms: float) -> float:
+        """Share of requests slower than `ms`, to the sketch's accuracy."""
+        if not self.count:
+            return 0.0
+        limit = self.bucket(ms)
+        return sum(n for bucket, n in self.buckets.items() if bucket > limit) / self.count
+
+
+_lock = threading.Lock()
+# Route -> sketch of this worker's requests since the last flush
+_pending = {}
+_pid = None
+
+
+def record(route: str, status: int, duration_ms: float):
+    """Count one request against its route's budget. Called by
+    RequestMetricsMiddleware for every request; unbudgeted routes are
+    ignored."""
+    if route not in BUDGETS_MS or not settings.SLO_TRACKING:
+        return
+    _ensure_flusher()
+    with _lock:
+        sketch = _pending.get(route)
+        if sketch is None:
+            sketch = _pending[route] = LatencySketch()
+        sketch.add(duration_ms, error=status >= 500)
+
+
+def _minute() -> int:
+    return int(time.time() // 60)
+
+
+def _key(minute: int) -> str:
+    return f"slo:{minute}"
+
+
+def _fields(pending):
+    fields = Counter()
+    for route, sketch in pending.items():
+        fields[f"{route}|n"] = sketch.count
+        fields[f"{route}|e"] = sketch.errors
+        for bucket, n in sketch.buckets.items():
+            fields[f"{route}|{bucket}"] = n
+    return fields
+
+
+def flush():
+    """Add this worker's counts since the last flush to the current
+    minute. Counts that cannot be written are dropped, never retried on
+    the request path."""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    if not pending:
+        return
+    fields = _fields(pending)
+    key = _key(_minute())
+    ttl = (settings.SLO_WINDOW_MINUTES + 5) * 60
+    try:
+        client = redis_client()
+        if client is not None:
+            full_key = cache.make_and_validate_key(key)
+            pipe = client.pipeline(transaction=False)
+            for field, n in fields.items():
+                pipe.hincrby(full_key, field, n)
+            pipe.expire(full_key, ttl)
+            pipe.execute()
+        else:
+            stored = Counter(cache.get(key) or {})
+            stored.update(fields)
+            cache.set(key, dict(stored), timeout=ttl)
+    except Exception:
+        logger.exception("SLO counts not recorded")
+
+
+def _run():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush()
+
+
+def _ensure_flusher():
+    global _pid
+    if _pid == os.getpid():
+        return
+    with _lock:
+        if _pid == os.getpid():
+            return
+        threading.Thread(target=_run, name="eve-slo", daemon=True).start()
+        atexit.register(flush)
+        _pid = os.getpid()
+
+
+def _forked():
+    # The parent's flusher does not come along; its counts are its own
+    global _lock, _pending, _pid
+    _lock = threading.Lock()
+    _pending = {}
+    _pid = None
+
+
+os.register_at_fork(after_in_child=_forked)
+
+
+def window(minutes: int):
+    """Route -> sketch of every worker's requests over the last `minutes`
+    minutes, the current one included."""
+    now = _minute()
+    keys = [_key(minute) for minute in range(now - minutes + 1, now + 1)]
+    client = redis_client()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(cache.make_and_validate_key(key))
+        hashes = pipe.execute()
+    else:
+        hashes = list(cache.get_many(keys).values())
+    sketches = {}
+    for stored in hashes:
+        for field, n in stored.items():
+            if isinstance(field, bytes):
+                field = field.decode()
+            route, _, part = field.rpartition("|")
+            sketch = sketches.get(route)
+            if sketch is None:
+                sketch = sketches[route] = LatencySketch()
+            if part == "n":
+                sketch.count += int(n)
+            elif part == "e":
+                sketch.errors += int(n)
+            else:
+                sketch.buckets[int(part)] += int(n)
+    return sketches
+
+
+def report(minutes=None):
+    """Budget status of every budgeted route over the window. A burn rate
+    is the share of requests over budget (slower than the p95 budget, or
+    5xx) divided by the share the budget allows; above 1 the route is
+    burning. Routes with fewer than SLO_MIN_REQUESTS requests are not
+    judged."""
+    minutes = minutes or settings.SLO_WINDOW_MINUTES
+    sketches = window(minutes)
+    routes = {}
+    for route, budget_ms in sorted(BUDGETS_MS.items()):
+        sketch = sketches.get(route) or LatencySketch()
+        p95 = sketch.quantile(0.95)
+        latency_burn = sketch.share_above(budget_ms) / LATENCY_ALLOWANCE
+        error_burn = (sketch.errors / sketch.count / MAX_FAILURE_RATIO) if sketch.count else 0.0
+        judged = sketch.count >= settings.SLO_MIN_REQUESTS
+        routes[route] = {
+            "requests": sketch.count,
+            "p95_ms": None if p95 is None else round(p95, 1),
+            "p95_budget_ms": budget_ms,
+            "error_ratio": round(sketch.errors / sketch.count, 4) if sketch.count else 0.0,
+            "latency_burn_rate": round(latency_burn, 2),
+            "error_burn_rate": round(error_burn, 2),
+            "burning": judged and (latency_burn > 1 or error_burn > 1),
+        }
+    return {
+        "window_minutes": minutes,
+        "burning": sorted(route for route, status in routes.items() if status["burning"]),
+        "routes": routes,
+    }
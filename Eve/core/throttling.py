@@ -1,5 +1,7 @@
 import logging
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
 
 from django.conf import settings
@@ -8,6 +10,19 @@ from django.http import HttpResponse
 
 logger = logging.getLogger(__name__)
 
+# Local pre-filter (see _local_reject). Only clients the shared counter has
+# already reported over their limit are tracked, and the table is bounded so
+# an attack from many addresses cannot grow worker memory without limit.
+LOCAL_MAX_ENTRIES = 10_000
+# Locally rejected hits are pushed to the shared counter in batches, so it
+# keeps an honest total for other workers and for monitoring.
+LOCAL_SYNC_BATCH = 20
+LOCAL_SYNC_SECONDS = 5.0
+
+# cache key -> [last shared count, hits not yet synced, last sync time]
+_local_windows = OrderedDict()
+_local_lock = threading.Lock()
+
 
 def _effective_limit(limit: int) -> int:
     """Apply RATE_LIMIT_SCALE (1 everywhere except load-test environments;
@@ -15,12 +30,15 @@ def _effective_limit(limit: int) -> int:
     return max(1, int(limit * getattr(settings, "RATE_LIMIT_SCALE", 1)))
 
 
-def _current_count(key_prefix: str, ident: str, limit: int, window_seconds: int):
+def _window_key(key_prefix: str, ident: str, window_seconds: int) -> str:
+    window = int(time.time() // window_seconds)
+    return f"ratelimit:{key_prefix}:{ident}:{window}"
+
+
+def _current_count(key: str, window_seconds: int):
     """Increment and return the fixed-window counter, or None if the cache
     backend is unreachable (fail open: availability over throttling, loudly
     logged so monitoring catches a dead Redis)."""
-    window = int(time.time() // window_seconds)
-    key = f"ratelimit:{key_prefix}:{ident}:{window}"
     try:
         if cache.add(key, 1, timeout=window_seconds):
             return 1
@@ -34,12 +52,64 @@ def _current_count(key_prefix: str, ident: str, limit: int, window_seconds: int)
         return None
 
 
+def _remember_over_limit(key: str, count: int):
+    with _local_lock:
+        _local_windows[key] = [count, 0, time.monotonic()]
+        _local_windows.move_to_end(key)
+        while len(_local_windows) > LOCAL_MAX_ENTRIES:
+            _local_windows.popitem(last=False)
+
+
+def _local_reject(key: str, limit: int) -> bool:
+    """Reject without a network call when this process already knows `key`
+    is over `limit`.
+
+    A fixed-window count only grows until the window rolls over (and the
+    key, which embeds the window number, changes with it), so once the
+    shared counter has said "over", every later hit in the same window is
+    over too. Anything not yet known to be over — including a client just
+    below its limit — still goes to the shared counter, which stays
+    authoritative for every borderline decision.
+    """
+    with _local_lock:
+        entry = _local_windows.get(key)
+        if entry is None or entry[0] <= limit:
+            return False
+        _local_windows.move_to_end(key)
+        entry[1] += 1
+        now = time.monotonic()
+        if entry[1] < LOCAL_SYNC_BATCH and now - entry[2] < LOCAL_SYNC_SECONDS:
+            return True
+        delta = entry[1]
+        entry[0] += delta
+        entry[1] = 0
+        entry[2] = now
+    try:
+        cache.incr(key, delta)
+    except ValueError:  # window expired in the shared cache; nothing to add to
+        pass
+    except Exception:
+        logger.exception("Rate-limit cache unavailable; local count not synced")
+    return True
+
+
+def reset_local_rate_limits():
+    """Forget every locally mirrored window (tests and operator tooling)."""
+    with _local_lock:
+        _local_windows.clear()
+
+
 def rate_limit(key_prefix: str, limit: int, window_seconds: int):
     """Fixed-window per-IP rate limit for POST requests.
 
     Keyed on REMOTE_ADDR, not X-Forwarded-For, which clients can spoof.
     Backed by Django's cache — Redis in production (see REDIS_URL), so the
     window is shared across all workers.
+
+    With RATE_LIMIT_LOCAL_PREFILTER on, a client the shared counter has
+    already reported over its limit is refused from process memory for the
+    rest of the window: a credential-stuffing burst then costs Redis one
+    round trip per worker per window instead of one per attempt.
     """
     def decorator(view_func):
         @wraps(view_func)
@@ -47,8 +117,17 @@ def rate_limit(key_prefix: str, limit: int, window_seconds: int):
             if request.method == "POST":
                 ident = request.META.get("REMOTE_ADDR", "unknown")
                 effective = _effective_limit(limit)
-                count = _current_count(key_prefix, ident, effective, window_seconds)
+                prefilter = getattr(settings, "RATE_LIMIT_LOCAL_PREFILTER", False)
+                key = _window_key(key_prefix, ident, window_seconds)
+                if prefilter and _local_reject(key, effective):
+                    return HttpResponse(
+                        "Too many attempts. Please try again later.",
+                        status=429,
+                    )
+                count = _current_count(key, window_seconds)
                 if count is not None and count > effective:
+                    if prefilter:
+                        _remember_over_limit(key, count)
                     return HttpResponse(
                         "Too many attempts. Please try again later.",
                         status=429,
@@ -0,0 +1,215 @@
+"""Per-request span tracing (OpenTelemetry).
+
+With TRACE_EXPORTER set, each request becomes a trace. It holds a span for
+every ORM query (core/postgresql/base.py), MongoDB command
+(MongoCommandTimer), Redis command (core.cache.RedisCache), Saleor HTTP
+send (saleor_client) and Celery publish. A task's execution span joins the
+trace of the request that published it, across the outbox and the broker.
+Spans are batched off the request path and written either to a local
+JSON-lines file (TRACE_EXPORTER=file) or to an OpenTelemetry collector over
+OTLP/HTTP (TRACE_EXPORTER=otlp, which needs
+opentelemetry-exporter-otlp-proto-http).
+
+Unset, nothing is recorded: `span()` yields None and the hooks cost one
+attribute check. Spans carry operation names only, never SQL parameters,
+cache values, Mongo documents or GraphQL variables.
+
+Task headers always carry the publishing request's correlation ID
+(`eve_request_id`), tracing or not, so a task's log lines join the request
+that caused it.
+"""
+import logging
+import os
+from contextlib import contextmanager
+
+from opentelemetry import context, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+from .logging import request_id_var
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "eve_request_id"
+
+_propagator = TraceContextTextMapPropagator()
+# None while tracing is off
+_tracer = None
+
+
+class FileSpanExporter(SpanExporter):
+    """Append finished spans to `path`, one JSON object per line. Each batch
+    is a single O_APPEND write, so every worker can share one file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans):
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+            try:
+                os.write(fd, lines.encode())
+            finally:
+                os.close(fd)
+        except OSError:
+            logger.exception("Span export to %s failed", self.path)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _exporter(settings):
+    if settings.TRACE_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACE_FILE)
+    if settings.TRACE_EXPORTER == "otlp":
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_*
+        # environment variables
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown TRACE_EXPORTER {settings.TRACE_EXPORTER!r}")
+
+
+def configure():
+    """Start tracing per TRACE_EXPORTER (called once, from CoreConfig)."""
+    global _tracer
+    from django.conf import settings
+
+    if not settings.TRACE_EXPORTER:
+        return
+    provider = TracerProvider(
+        resource=Resource.create({
+            "service.name": "eve",
+            "deployment.environment": settings.DEPLOYMENT_ENVIRONMENT,
+        }),
+        # A task or request joins its parent's decision, so traces are
+        # sampled whole
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACE_SAMPLE_RATE)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(_exporter(settings)))
+    trace.set_tracer_provider(provider)
+    _tracer = provider.get_tracer("eve")
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+@contextmanager
+def span(name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes):
+    """A span around the enclosed code, current for its duration; yields
+    None when tracing is off. Exceptions are recorded and re-raised."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, kind=kind, attributes=attributes) as current:
+        yield current
+
+
+def start_span(name: str, kind: SpanKind = SpanKind.INTERNAL, parent=None, **attributes):
+    """A span for callback-style hooks whose start and end arrive as
+    separate events; the caller ends it. Not made current. None when
+    tracing is off."""
+    if _tracer is None:
+        return None
+    return _tracer.start_span(name, context=parent, kind=kind, attributes=attributes)
+
+
+def traced_query(execute, sql, params, many, context):
+    """Connection execute wrapper: one span per ORM query. The statement
+    text is recorded, its parameters never are."""
+    with span("db.query", SpanKind.CLIENT, **{
+        "db.system": "postgresql",
+        "db.statement": sql,
+    }):
+        return execute(sql, params, many, context)
+
+
+def inject(headers: dict) -> dict:
+    """Add the current correlation ID and trace context to outgoing
+    `headers` (Celery task headers). A correlation ID already present wins:
+    the relay publishes on behalf of the request that wrote the outbox row."""
+    request_id = request_id_var.get()
+    if request_id:
+        headers.setdefault(REQUEST_ID_HEADER, request_id)
+    if _tracer is not None:
+        _propagator.inject(headers)
+    return headers
+
+
+def extract(headers: dict):
+    """The trace context carried in incoming `headers`, or None."""
+    if _tracer is None or not headers:
+        return None
+    return _propagator.extract(headers)
+
+
+# --- Celery. Publish spans are keyed by task ID between the before and
+# after publish signals; execution state between prerun and postrun.
+
+_publishing = {}
+_running = {}
+
+
+def _task_header(task, key):
+    # A worker merges custom headers into the request; eager runs keep them
+    # under `headers`
+    request = task.request
+    return getattr(request, key, None) or (getattr(request, "headers", None) or {}).get(key)
+
+
+def task_publishing(task_name: str, headers: dict):
+    # Relayed from the outbox: continue the publishing request's trace
+    parent = extract(headers) if headers.get("traceparent") else None
+    published = start_span(f"publish {task_name}", SpanKind.PRODUCER, parent=parent, **{
+        "messaging.system": "celery",
+        "messaging.destination.name": task_name,
+    })
+    if published is not None:
+        token = context.attach(trace.set_span_in_context(published))
+        try:
+            inject(headers)
+        finally:
+            context.detach(token)
+        _publishing[headers.get("id")] = published
+    else:
+        inject(headers)
+
+
+def task_published(headers: dict):
+    published = _publishing.pop(headers.get("id"), None)
+    if published is not None:
+        published.end()
+
+
+def task_started(task_id, task):
+    request_id = _task_header(task, REQUEST_ID_HEADER)
+    request_token = request_id_var.set(request_id) if request_id else None
+    executed = context_token = None
+    if _tracer is not None:
+        parent = extract({"traceparent": _task_header(task, "traceparent") or ""})
+        executed = start_span(f"run {task.name}", SpanKind.CONSUMER, parent=parent, **{
+            "messaging.system": "celery",
+            "messaging.destination.name": task.name,
+            "messaging.message.id": task_id or "",
+        })
+        context_token = context.attach(trace.set_span_in_context(executed))
+    _running[task_id] = (request_token, executed, context_token)
+
+
+def task_finished(task_id, state):
+    request_token, executed, context_token = _running.pop(task_id, (None, None, None))
+    if executed is not None:
+        executed.set_attribute("celery.state", state or "")
+        if state == "FAILURE":
+            executed.set_status(trace.StatusCode.ERROR)
+        executed.end()
+        context.detach(context_token)
+    if request_token is not None:
+        request_id_var.reset(request_token)
@@ -8,4 +8,6 @@ urlpatterns = [
     path("healthz/", views.readiness_view, name="health"),  # legacy alias
     path("healthz/live/", views.liveness_view, name="liveness"),
     path("healthz/ready/", views.readiness_view, name="readiness"),
+    path("healthz/slo/", views.slo_view, name="slo"),
+    path("metrics", views.metrics_view, name="metrics"),
 ]
\ No newline at end of file
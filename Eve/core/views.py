@@ -1,10 +1,14 @@
+import hmac
 import logging
 
+from django.conf import settings
 from django.contrib import messages
 from django.db import connection
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
+from prometheus_client import CONTENT_TYPE_LATEST
 
+from . import metrics, slo
 from .forms import ContactForm
 from .throttling import rate_limit
 
@@ -64,6 +68,44 @@ def readiness_view(request):
     )
 
 
+def _refuse_unless_monitor(request):
+    """None for a monitor presenting METRICS_TOKEN as a bearer token, else
+    the refusal. Without a token the endpoint does not exist (404)."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    scheme, _, presented = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(presented.encode(), token.encode()):
+        response = HttpResponse(status=401)
+        response.headers["WWW-Authenticate"] = "Bearer"
+        return response
+    return None
+
+
+def metrics_view(request):
+    """Prometheus scrape target, for the holder of METRICS_TOKEN."""
+    refusal = _refuse_unless_monitor(request)
+    if refusal is not None:
+        return refusal
+    return HttpResponse(metrics.render(), content_type=CONTENT_TYPE_LATEST)
+
+
+def slo_view(request):
+    """Which routes are burning their latency or error budget
+    (core/slo.py), for the holder of METRICS_TOKEN. Always 200 while it can
+    answer: a burning route is for a human, not for the orchestrator, so
+    this is never a probe."""
+    refusal = _refuse_unless_monitor(request)
+    if refusal is not None:
+        return refusal
+    try:
+        status = slo.report()
+    except Exception:
+        logger.exception("SLO report unavailable")
+        return JsonResponse({"status": "unavailable"}, status=503)
+    return JsonResponse({"status": "burning" if status["burning"] else "ok", **status})
+
+
 @rate_limit("contact", limit=5, window_seconds=3600)
 def contact_view(request):
     if request.method == "POST":
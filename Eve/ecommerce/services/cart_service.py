@@ -156,6 +156,22 @@ def set_item_quantity(user_id: int, product_id: str, quantity: int) -> bool:
     return result.matched_count > 0
 
 
+def reprice_items(user_id: int, prices: dict):
+    """Replace the display price of every line whose variant is in `prices`
+    ({variant_id: {"amount", "currency"}}) in one atomic update."""
+    if not prices:
+        return
+    updates = {"updated_at": _now()}
+    array_filters = []
+    for index, (variant_id, gross) in enumerate(prices.items()):
+        updates[f"items.$[v{index}].price_amount"] = gross["amount"]
+        updates[f"items.$[v{index}].price_currency"] = gross["currency"]
+        array_filters.append({f"v{index}.variant_id": variant_id})
+    carts_collection.update_one(
+        {"user_id": user_id}, {"$set": updates}, array_filters=array_filters
+    )
+
+
 def remove_from_cart(user_id: int, product_id: str):
     carts_collection.update_one(
         {"user_id": user_id},
@@ -6,16 +6,48 @@ Resilience properties:
   mutations are never auto-retried because they are not idempotent
 - Cache-backed circuit breaker shared across workers: after consecutive
   failures the circuit opens and calls fail fast for a cooldown period
+- Adaptive concurrency limit on in-flight reads, per process (AIMD: grows
+  by one call per window of healthy calls, shrinks multiplicatively on slow
+  or failed ones) and, optionally, a cluster-wide budget in the shared cache.
+  A read over either limit fails fast with SaleorOverloaded, long before
+  five failures would open the circuit, so a slow Saleor cannot hold every
+  web thread for a read timeout plus retries. Mutations are always sent
+  (one per checkout step; refusing checkoutComplete after checkoutCreate
+  would strand the attempt) but count towards both limits.
+- Deadline-aware: within a request that has a deadline (core/deadline.py)
+  timeouts are clamped to the time left and retries that cannot finish in
+  time are skipped. A per-process retry budget caps retries at
+  SALEOR_RETRY_BUDGET_RATIO of calls, so an incident cannot triple the load.
+- Optional hedged reads (SALEOR_HEDGE_READS): a read attempt still
+  unanswered at this process's observed p90 latency is sent a second time
+  on another pooled connection and the first answer wins. Hedges come out
+  of their own budget (SALEOR_HEDGE_BUDGET_RATIO of calls).
+- Every document sent is a module-level constant registered with
+  `register_query`. With SALEOR_PERSISTED_QUERIES on, a registered document
+  is sent as its SHA-256 alone (Automatic Persisted Queries); the full text
+  follows only when Saleor answers PersistedQueryNotFound, or rejects the
+  hash-only request outright (no APQ support, after which this process sends
+  full documents). Nothing runs on either answer, so the resend is safe for
+  mutations too.
 - Error messages carry status codes and metadata only. Response bodies,
   tokens, and personal data must never appear in exceptions or logs.
 """
+import contextvars
+import hashlib
 import logging
 import random
+import threading
 import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import requests
+from core import deadline, fastjson, metrics, tracing
+from core.cache import redis_client
 from django.conf import settings
 from django.core.cache import cache
+from opentelemetry.trace import SpanKind
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +58,16 @@ CONNECT_TIMEOUT = 3.05
 READ_TIMEOUT = 10
 MAX_ATTEMPTS = 3          # 1 initial + 2 retries, reads only
 BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_JITTER_SECONDS = 0.5
 RETRYABLE_STATUS = {429, 502, 503, 504}
+# An attempt with less time than this left is not worth sending
+MIN_ATTEMPT_SECONDS = 0.05
+# Retries an idle process may spend at once before calls have earned more
+RETRY_BUDGET_MAX_TOKENS = 10
+# Answer times the hedge delay (their p90) is taken from, and how many must
+# be seen before hedging starts
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
 
 CIRCUIT_FAILURE_THRESHOLD = 5
 CIRCUIT_COOLDOWN_SECONDS = 60
@@ -35,10 +76,30 @@ _CB_OPEN_KEY = "saleor:circuit:open"
 # Outlives the cooldown so the first success afterwards can log recovery
 _CB_WAS_OPEN_KEY = "saleor:circuit:was-open"
 
+LIMIT_DECREASE_FACTOR = 0.7
+LIMIT_DECREASE_INTERVAL_SECONDS = 1.0
+_CLUSTER_INFLIGHT_KEY = "saleor:inflight"
+# No call lasts longer than this, so an older slot belonged to a process
+# killed mid-call and is dropped; the key outlives its newest slot by as much
+_CLUSTER_SLOT_SECONDS = int((CONNECT_TIMEOUT + READ_TIMEOUT) * MAX_ATTEMPTS) + 10
+# Sorted set of call ID -> start time. Pruning, counting and taking a slot
+# are one step, so concurrent calls cannot both take the last slot
+_CLUSTER_ACQUIRE_SCRIPT = """
+local now, max_age = tonumber(ARGV[1]), tonumber(ARGV[2])
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - max_age)
+if ARGV[4] == "1" or redis.call("ZCARD", KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call("ZADD", KEYS[1], now, ARGV[5])
+    redis.call("EXPIRE", KEYS[1], max_age)
+    return 1
+end
+return 0
+"""
+
 
 def _log_call(outcome: str, started: float, attempts: int, **extra):
     """One structured event per upstream call — request rate, outcome mix,
     and upstream latency are all derived from these (docs/OBSERVABILITY.md)."""
+    metrics.observe_saleor_call(outcome, time.monotonic() - started)
     logger.info(
         "saleor call %s in %.0fms (%d attempt(s))",
         outcome, (time.monotonic() - started) * 1000, attempts,
@@ -85,6 +146,10 @@ class SaleorCircuitOpen(SaleorAPIError):
     """Failing fast: Saleor has been failing repeatedly and is in cooldown."""
 
 
+class SaleorOverloaded(SaleorCircuitOpen):
+    """Failing fast: too many calls to Saleor are already in flight."""
+
+
 # --- Circuit breaker (shared via Django cache / Redis). Cache failures are
 # swallowed: an unreachable cache must not take the client down with it.
 
@@ -131,23 +196,312 @@ def _circuit_record_success():
         pass
 
 
+# --- Adaptive concurrency limit
+
+class _AdaptiveLimit:
+    """In-flight Saleor calls allowed in this process.
+
+    Additive increase, multiplicative decrease: every call that completes
+    within SALEOR_SLOW_CALL_MS adds 1/limit (about one more slot per full
+    window of healthy calls); a slow or failed one cuts the limit by
+    LIMIT_DECREASE_FACTOR, at most once per LIMIT_DECREASE_INTERVAL_SECONDS
+    so a burst of timeouts from one stall counts once. The limit never drops
+    below one call, which keeps probing a recovering Saleor.
+    """
+
+    def __init__(self, ceiling: int):
+        self.ceiling = max(1, ceiling)
+        self.limit = float(self.ceiling)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, force: bool = False) -> bool:
+        with self._lock:
+            if not force and self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def cancel(self):
+        """Give back a slot whose call was never sent."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def release(self, healthy: bool):
+        with self._lock:
+            self.in_flight -= 1
+            if healthy:
+                self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+                return
+            now = time.monotonic()
+            if now - self._last_decrease < LIMIT_DECREASE_INTERVAL_SECONDS:
+                return
+            self._last_decrease = now
+            previous = self.limit
+            self.limit = max(1.0, self.limit * LIMIT_DECREASE_FACTOR)
+        if int(self.limit) < int(previous):
+            logger.warning(
+                "Saleor concurrency limit lowered to %d", int(self.limit),
+                extra={"event": "saleor_limit", "limit": int(self.limit),
+                       "in_flight": self.in_flight},
+            )
+
+
+_limit = _AdaptiveLimit(settings.SALEOR_MAX_CONCURRENCY)
+_cluster_lock = threading.Lock()
+
+
+def _cluster_acquire(force: bool = False):
+    """Take a slot in the cluster-wide budget: the slot's ID, to hand to
+    `_cluster_release`, or None when the budget is spent. "" admits the
+    call without a slot: no budget is set, or the cache is unreachable
+    (the per-process limit still applies)."""
+    budget = settings.SALEOR_CLUSTER_CONCURRENCY
+    if not budget:
+        return ""
+    slot = uuid.uuid4().hex
+    now = time.time()
+    try:
+        client = redis_client()
+        if client is not None:
+            taken = client.register_script(_CLUSTER_ACQUIRE_SCRIPT)(
+                keys=[cache.make_and_validate_key(_CLUSTER_INFLIGHT_KEY)],
+                args=[now, _CLUSTER_SLOT_SECONDS, budget, int(force), slot],
+            )
+            return slot if taken else None
+        # Without Redis the cache is this process's own (LocMem)
+        with _cluster_lock:
+            slots = {
+                held: since for held, since in (cache.get(_CLUSTER_INFLIGHT_KEY) or {}).items()
+                if since > now - _CLUSTER_SLOT_SECONDS
+            }
+            if len(slots) >= budget and not force:
+                return None
+            slots[slot] = now
+            cache.set(_CLUSTER_INFLIGHT_KEY, slots, timeout=_CLUSTER_SLOT_SECONDS)
+            return slot
+    except Exception:
+        return ""
+
+
+def _cluster_release(slot: str):
+    if not slot:
+        return
+    try:
+        client = redis_client()
+        if client is not None:
+            client.zrem(cache.make_and_validate_key(_CLUSTER_INFLIGHT_KEY), slot)
+            return
+        with _cluster_lock:
+            slots = cache.get(_CLUSTER_INFLIGHT_KEY) or {}
+            if slots.pop(slot, None) is not None:
+                cache.set(_CLUSTER_INFLIGHT_KEY, slots, timeout=_CLUSTER_SLOT_SECONDS)
+    except Exception:
+        pass  # dropped as stale once the call could no longer be running
+
+
+# --- Retry and hedge budgets
+
+class _TokenBudget:
+    """Token bucket: every call deposits `ratio` of a token, every extra
+    request (a retry, or a hedge) withdraws one. It starts full, so an idle
+    process can still spend a few on isolated failures."""
+
+    def __init__(self, ratio: float, capacity: float = RETRY_BUDGET_MAX_TOKENS):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+_retry_budget = _TokenBudget(settings.SALEOR_RETRY_BUDGET_RATIO)
+
+
+_hedge_budget = _TokenBudget(settings.SALEOR_HEDGE_BUDGET_RATIO)
+_answer_times = deque(maxlen=HEDGE_WINDOW)
+# Sized like the connection pool: a send waiting here would defeat the hedge
+_hedge_pool = ThreadPoolExecutor(max_workers=10, thread_name_prefix="saleor-hedge")
+
+
+def _hedge_delay():
+    """p90 of recent answer times, or None until enough were seen."""
+    samples = sorted(_answer_times)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[int(0.9 * (len(samples) - 1))]
+
+
+def _timed_request(query, variables, timeout):
+    started = time.monotonic()
+    response = _send(query, variables, timeout)
+    _answer_times.append(time.monotonic() - started)
+    return response
+
+
+def _submit(query, variables, timeout):
+    # Copied context: the send runs on a pool thread but belongs to this call
+    return _hedge_pool.submit(
+        contextvars.copy_context().run, _timed_request, query, variables, timeout
+    )
+
+
+def _discard(future):
+    """Close the loser's response once it arrives, returning its connection."""
+    def close(done):
+        if not done.cancelled() and done.exception() is None:
+            done.result().close()
+    future.add_done_callback(close)
+
+
+def _hedged_request(query: str, variables: dict, timeout, report: dict):
+    """Send a read, and again if the first send is slower than the p90.
+
+    When a hedge is sent, `report` gets hedged=True and the winner
+    ("primary" or "hedge") for the `saleor_call` event. Raises the hedge's
+    transport error when both sends fail.
+    """
+    delay = _hedge_delay()
+    if delay is None:
+        return _timed_request(query, variables, timeout)
+    primary = _submit(query, variables, timeout)
+    done, _ = wait([primary], timeout=delay)
+    left = deadline.remaining()
+    if done or (left is not None and left < MIN_ATTEMPT_SECONDS) or not _hedge_budget.withdraw():
+        return primary.result()
+
+    hedge = _submit(query, variables, timeout)
+    report["hedged"] = True
+    sends = {primary: "primary", hedge: "hedge"}
+    pending = set(sends)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    _discard(other)
+                report["winner"] = sends[future]
+                return future.result()
+    return hedge.result()
+
+
+def _may_retry(attempt: int) -> str:
+    """Why the retry after `attempt` must be skipped ("" when it may run):
+    it could not finish before the deadline, or the budget is spent."""
+    left = deadline.remaining()
+    longest_wait = BACKOFF_BASE_SECONDS * (2 ** attempt) + BACKOFF_JITTER_SECONDS
+    if left is not None and left < longest_wait + MIN_ATTEMPT_SECONDS:
+        return "deadline"
+    if not _retry_budget.withdraw():
+        return "budget"
+    return ""
+
+
 def _backoff_sleep(attempt: int):
-    delay = BACKOFF_BASE_SECONDS * (2 ** attempt) + random.uniform(0, 0.5)
+    delay = BACKOFF_BASE_SECONDS * (2 ** attempt) + random.uniform(0, BACKOFF_JITTER_SECONDS)
     time.sleep(delay)
 
 
-def _do_request(query: str, variables: dict) -> requests.Response:
+# --- Query registry and persisted queries
+
+# name -> document, for every GraphQL document Eve sends to Saleor
+QUERIES = {}
+_QUERY_HASHES = {}
+_QUERY_NAMES = {}
+# Cleared for the life of the process when Saleor answers that it does not
+# support persisted queries at all
+_persisted_queries = {"supported": True}
+
+
+def register_query(name: str, document: str) -> str:
+    """Register a module-level GraphQL document under `name` and return it
+    unchanged; its hash is computed once, here."""
+    if QUERIES.get(name, document) != document:
+        raise ValueError(f"GraphQL query {name!r} is already registered")
+    QUERIES[name] = document
+    _QUERY_HASHES[document] = hashlib.sha256(document.encode()).hexdigest()
+    _QUERY_NAMES[document] = name
+    return document
+
+
+def _persisted_query_miss(response: requests.Response) -> str:
+    """"not_found" / "not_supported" when Saleor refused a hash-only request,
+    else "". Errors come first in the body, so its head is enough and
+    successful answers are not decoded twice.
+
+    Only an APQ-aware server names the extension. One without it, stock
+    Saleor included, sees a request with no document and answers 400 "Must
+    provide a query string."; any 400 to a hash-only request is read that
+    way. Other 4xx (auth, throttling) are not about the document and are
+    left to the caller."""
+    head = response.content[:300]
+    if b"PERSISTED_QUERY_NOT_SUPPORTED" in head or b"PersistedQueryNotSupported" in head:
+        return "not_supported"
+    if b"PERSISTED_QUERY_NOT_FOUND" in head or b"PersistedQueryNotFound" in head:
+        return "not_found"
+    if response.status_code == 400 or b"Must provide a query" in head:
+        return "not_supported"
+    return ""
+
+
+def _send(query: str, variables: dict, timeout) -> requests.Response:
+    """One attempt: a span per send when tracing, named by the registered
+    query (the document and variables are never recorded)."""
+    with tracing.span("saleor.graphql", SpanKind.CLIENT, **{
+        "graphql.operation.name": _QUERY_NAMES.get(query, "unregistered"),
+    }) as attempt:
+        response = _send_once(query, variables, timeout)
+        if attempt is not None:
+            attempt.set_attribute("http.response.status_code", response.status_code)
+        return response
+
+
+def _send_once(query: str, variables: dict, timeout) -> requests.Response:
+    digest = _QUERY_HASHES.get(query)
+    if not (digest and settings.SALEOR_PERSISTED_QUERIES and _persisted_queries["supported"]):
+        return _do_request(query, variables, timeout)
+    response = _do_request(None, variables, timeout, digest)
+    miss = _persisted_query_miss(response)
+    if not miss:
+        return response
+    if miss == "not_supported":
+        _persisted_queries["supported"] = False
+        logger.warning("Saleor does not support persisted queries; sending full documents")
+    return _do_request(query, variables, timeout, digest)
+
+
+def _do_request(
+    query, variables: dict, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), digest=None
+) -> requests.Response:
+    """POST one GraphQL request. `query` None sends `digest` alone; a
+    document with a digest registers it with Saleor."""
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
     if getattr(settings, "SALEOR_API_TOKEN", ""):
         headers["Authorization"] = f"Bearer {settings.SALEOR_API_TOKEN}"
+    payload = {"variables": variables}
+    if query is not None:
+        payload["query"] = query
+    if digest:
+        payload["extensions"] = {"persistedQuery": {"version": 1, "sha256Hash": digest}}
     return _session.post(
         SALEOR_GRAPHQL_URL,
-        json={"query": query, "variables": variables},
+        json=payload,
         headers=headers,
-        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        timeout=timeout,
     )
 
 
@@ -163,7 +517,7 @@ def _parse_response(response: requests.Response) -> dict:
         raise SaleorAPIError("non_json_response", status=status, content_type=content_type)
 
     try:
-        payload = response.json()
+        payload = fastjson.loads(response.content)
     except ValueError:
         raise SaleorAPIError(
             "invalid_json", status=status, content_type=content_type
@@ -201,21 +555,91 @@ def saleor_graphql(query: str, variables: dict, retry: bool = True) -> dict:
         _log_call("circuit_open", started, 0)
         raise SaleorCircuitOpen("circuit_open")
 
+    left = deadline.remaining()
+    if left is not None and left < MIN_ATTEMPT_SECONDS:
+        _log_call("deadline_exceeded", started, 0)
+        raise SaleorAPIError("deadline_exceeded")
+
+    # Reads may be refused; mutations (retry=False) are only counted
+    force = not retry
+    if not _limit.acquire(force):
+        _log_call("overloaded", started, 0, scope="process", limit=int(_limit.limit))
+        raise SaleorOverloaded("overloaded", detail="scope=process")
+    slot = _cluster_acquire(force)
+    if slot is None:
+        _limit.cancel()
+        _log_call("overloaded", started, 0, scope="cluster")
+        raise SaleorOverloaded("overloaded", detail="scope=cluster")
+
+    answered = False
+    try:
+        data = _call_with_retries(query, variables, retry, started)
+        answered = True
+        return data
+    except SaleorAPIError as exc:
+        answered = _answered(exc)
+        raise
+    finally:
+        _cluster_release(slot)
+        # A slow answer lowers the limit too: Saleor is saturating before
+        # it starts failing
+        _limit.release(
+            answered and time.monotonic() - started < settings.SALEOR_SLOW_CALL_MS / 1000
+        )
+
+
+def _answered(exc: SaleorAPIError) -> bool:
+    """Whether Saleor itself rejected the request, promptly and on its
+    merits (a GraphQL or 4xx error), rather than failing to serve it."""
+    if exc.code == "graphql_error":
+        return True
+    return exc.code == "http_error" and exc.status < 500 and exc.status != 429
+
+
+def _call_with_retries(query: str, variables: dict, retry: bool, started: float) -> dict:
+    _retry_budget.deposit()
+    hedge = retry and settings.SALEOR_HEDGE_READS
+    if hedge:
+        _hedge_budget.deposit()
     attempts = MAX_ATTEMPTS if retry else 1
     last_error = None
+    skipped = ""
+    hedged = {}
 
     for attempt in range(attempts):
+        left = deadline.remaining()
+        if left is not None and left < MIN_ATTEMPT_SECONDS:
+            # Spent while waiting for the limiter or a backoff: a zero
+            # timeout would make requests raise ValueError, which no caller
+            # treats as a Saleor failure
+            _log_call("deadline_exceeded", started, attempt, **hedged)
+            raise SaleorAPIError("deadline_exceeded")
+        clamped = left is not None and left < READ_TIMEOUT
+        timeout = (
+            (min(CONNECT_TIMEOUT, left), left) if clamped
+            else (CONNECT_TIMEOUT, READ_TIMEOUT)
+        )
         try:
-            response = _do_request(query, variables)
+            if hedge:
+                response = _hedged_request(query, variables, timeout, hedged)
+            else:
+                response = _send(query, variables, timeout)
             if retry and response.status_code in RETRYABLE_STATUS and attempt < attempts - 1:
-                logger.warning(
-                    "Saleor HTTP %d, retrying (attempt %d/%d)",
-                    response.status_code, attempt + 1, attempts,
-                )
-                _backoff_sleep(attempt)
-                continue
+                skipped = _may_retry(attempt)
+                if not skipped:
+                    logger.warning(
+                        "Saleor HTTP %d, retrying (attempt %d/%d)",
+                        response.status_code, attempt + 1, attempts,
+                    )
+                    _backoff_sleep(attempt)
+                    continue
             data = _parse_response(response)
         except requests.Timeout:
+            if clamped:
+                # Our deadline ran out, not Saleor's patience: no circuit
+                # failure, and no time left for a retry
+                _log_call("deadline_exceeded", started, attempt + 1, **hedged)
+                raise SaleorAPIError("deadline_exceeded") from None
             last_error = SaleorAPIError("timeout")
             logger.warning("Saleor timeout (attempt %d/%d)", attempt + 1, attempts)
         except requests.RequestException as exc:
@@ -228,18 +652,24 @@ def saleor_graphql(query: str, variables: dict, retry: bool = True) -> dict:
             )
         except SaleorAPIError as exc:
             _circuit_record_failure()
-            _log_call(exc.code, started, attempt + 1, status=exc.status)
+            extra = {"retry_skipped": skipped} if skipped else {}
+            _log_call(exc.code, started, attempt + 1, status=exc.status, **extra, **hedged)
             raise
         else:
             _circuit_record_success()
-            _log_call("ok", started, attempt + 1)
+            _log_call("ok", started, attempt + 1, **hedged)
             return data
 
         if attempt < attempts - 1:
+            skipped = _may_retry(attempt)
+            if skipped:
+                attempts = attempt + 1
+                break
             _backoff_sleep(attempt)
 
     _circuit_record_failure()
-    _log_call(last_error.code, started, attempts)
+    extra = {"retry_skipped": skipped} if skipped else {}
+    _log_call(last_error.code, started, attempts, **extra, **hedged)
     raise last_error
 
 
@@ -262,20 +692,32 @@ PRODUCT_FIELDS = """
     }
 """
 
-
-def fetch_products_from_saleor(first=20):
-    query = f"""
-    query ($first: Int!, $channel: String!) {{
-      products(first: $first, channel: $channel) {{
-        edges {{
-          node {{
-            {PRODUCT_FIELDS}
-          }}
-        }}
+PRODUCTS_QUERY = register_query("products", f"""
+query ($first: Int!, $channel: String!) {{
+  products(first: $first, channel: $channel) {{
+    edges {{
+      node {{
+        {PRODUCT_FIELDS}
       }}
     }}
-    """
-    data = saleor_graphql(query, {"first": first, "channel": SALEOR_CHANNEL})
+  }}
+}}
+""")
+
+PRODUCT_BY_SLUG_QUERY = register_query("product_by_slug", f"""
+query ($slug: String!, $channel: String!) {{
+  product(slug: $slug, channel: $channel) {{
+    {PRODUCT_FIELDS}
+    media {{
+      url
+    }}
+  }}
+}}
+""")
+
+
+def fetch_products_from_saleor(first=20):
+    data = saleor_graphql(PRODUCTS_QUERY, {"first": first, "channel": SALEOR_CHANNEL})
     try:
         return [edge["node"] for edge in data["products"]["edges"]]
     except (KeyError, TypeError):
@@ -283,17 +725,7 @@ def fetch_products_from_saleor(first=20):
 
 
 def fetch_product_by_slug(slug: str):
-    query = f"""
-    query ($slug: String!, $channel: String!) {{
-      product(slug: $slug, channel: $channel) {{
-        {PRODUCT_FIELDS}
-        media {{
-          url
-        }}
-      }}
-    }}
-    """
-    data = saleor_graphql(query, {"slug": slug, "channel": SALEOR_CHANNEL})
+    data = saleor_graphql(PRODUCT_BY_SLUG_QUERY, {"slug": slug, "channel": SALEOR_CHANNEL})
     if "product" not in data:
         raise SaleorAPIError("incomplete_response")
     return data["product"]  # can be None if slug not found
@@ -1,13 +1,18 @@
+import hashlib
+import json
+import time
+from collections import deque
 from unittest.mock import MagicMock, patch
 
 import requests
+from core.deadline import deadline
 from django.contrib.auth.models import User
 from django.core.cache import cache
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from .services import saleor_client
-from .services.saleor_client import SaleorAPIError, SaleorCircuitOpen
+from .services.saleor_client import SaleorAPIError, SaleorCircuitOpen, SaleorOverloaded
 
 
 def make_product(**overrides):
@@ -216,11 +221,11 @@ def _mock_response(
     response = MagicMock()
     response.status_code = status
     response.headers = {"content-type": content_type}
-    response.content = body
     if json_error:
-        response.json.side_effect = ValueError("bad json")
-    else:
-        response.json.return_value = json_data if json_data is not None else {}
+        body = body or b"{not json"
+    elif not body:
+        body = json.dumps(json_data if json_data is not None else {}).encode()
+    response.content = body
     return response
 
 
@@ -232,6 +237,9 @@ class SaleorClientResilienceTests(TestCase):
 
     def setUp(self):
         cache.clear()  # closed circuit at the start of every test
+        patcher = patch.object(saleor_client, "_retry_budget", saleor_client._TokenBudget(0.1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_connection_error_retries_then_fails(self):
         with patch.object(
@@ -347,6 +355,9 @@ class SaleorTelemetryTests(TestCase):
 
     def setUp(self):
         cache.clear()
+        patcher = patch.object(saleor_client, "_retry_budget", saleor_client._TokenBudget(0.1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_successful_call_logs_one_event(self):
         response = _mock_response(json_data={"data": {"ok": True}})
@@ -374,6 +385,46 @@ class SaleorTelemetryTests(TestCase):
         self.assertEqual(events[0].outcome, "http_error")
         self.assertEqual(events[0].attempts, 3)  # retries are visible
 
+    def test_call_outcomes_are_counted_for_prometheus(self):
+        from prometheus_client import REGISTRY
+
+        def count(outcome):
+            return REGISTRY.get_sample_value(
+                "eve_saleor_calls_total", {"outcome": outcome}
+            ) or 0
+
+        before = count("http_error")
+        with patch.object(saleor_client._session, "post", return_value=_mock_response(status=503)):
+            with self.assertRaises(SaleorAPIError):
+                saleor_client.saleor_graphql("query {}", {})
+        # One call, however many attempts it took
+        self.assertEqual(count("http_error"), before + 1)
+
+    def test_each_attempt_is_a_span_named_by_the_registered_query(self):
+        from core import tracing
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        responses = [_mock_response(status=503), _mock_response(json_data={"data": {}})]
+        with (
+            patch.object(tracing, "_tracer", provider.get_tracer("test")),
+            patch.object(saleor_client._session, "post", side_effect=responses),
+            patch.object(saleor_client, "_backoff_sleep"),
+        ):
+            saleor_client.saleor_graphql(saleor_client.PRODUCTS_QUERY, {"first": 1})
+        attempts = exporter.get_finished_spans()
+        self.assertEqual([span.name for span in attempts], ["saleor.graphql"] * 2)
+        self.assertEqual(
+            [span.attributes["http.response.status_code"] for span in attempts], [503, 200]
+        )
+        self.assertEqual(attempts[0].attributes["graphql.operation.name"], "products")
+
     def test_open_circuit_logs_fast_fail_without_calling_upstream(self):
         response = _mock_response(status=500)
         with patch.object(saleor_client._session, "post", return_value=response):
@@ -417,6 +468,412 @@ class SaleorTelemetryTests(TestCase):
         self.assertEqual([r.state for r in close_events], ["closed"])
 
 
+@patch.object(saleor_client, "SALEOR_GRAPHQL_URL", "https://saleor.example.com/graphql/")
+@patch.object(saleor_client, "_backoff_sleep", lambda attempt: None)
+class SaleorConcurrencyLimitTests(TestCase):
+    """Excess calls are refused before they can hold a thread, and the
+    per-process limit follows Saleor's health."""
+
+    def setUp(self):
+        cache.clear()
+        self.limit = saleor_client._AdaptiveLimit(4)
+        patcher = patch.object(saleor_client, "_limit", self.limit)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_process_limit_refuses_reads_without_calling_upstream(self):
+        self.limit.in_flight = 4
+        with patch.object(saleor_client._session, "post") as post:
+            with self.assertRaises(SaleorOverloaded) as ctx:
+                saleor_client.saleor_graphql("query {}", {})
+        post.assert_not_called()
+        self.assertIsInstance(ctx.exception, SaleorCircuitOpen)
+        self.assertEqual(self.limit.in_flight, 4)
+        self.assertFalse(saleor_client._circuit_is_open())
+
+    def test_mutations_are_sent_over_the_limit(self):
+        self.limit.in_flight = 4
+        good = _mock_response(json_data={"data": {"ok": True}})
+        with patch.object(saleor_client._session, "post", return_value=good) as post:
+            saleor_client.saleor_graphql("mutation {}", {}, retry=False)
+        post.assert_called_once()
+        self.assertEqual(self.limit.in_flight, 4)
+
+    def test_failures_and_slow_answers_lower_the_limit_and_health_restores_it(self):
+        clock = [100.0]
+        with patch.object(saleor_client.time, "monotonic", lambda: clock[0]):
+            self.limit.acquire()
+            self.limit.release(healthy=False)
+            self.assertEqual(int(self.limit.limit), 2)  # 4 * 0.7
+            # A second failure from the same stall does not count again
+            self.limit.acquire()
+            self.limit.release(healthy=False)
+            self.assertEqual(int(self.limit.limit), 2)
+            clock[0] += saleor_client.LIMIT_DECREASE_INTERVAL_SECONDS
+            for _ in range(10):
+                self.limit.acquire()
+                self.limit.release(healthy=False)
+                clock[0] += saleor_client.LIMIT_DECREASE_INTERVAL_SECONDS
+            self.assertEqual(self.limit.limit, 1.0)  # never below one call
+
+        for _ in range(20):
+            self.assertTrue(self.limit.acquire())
+            self.limit.release(healthy=True)
+        self.assertEqual(self.limit.limit, 4)  # capped at the ceiling
+        self.assertEqual(self.limit.in_flight, 0)
+
+    @override_settings(SALEOR_SLOW_CALL_MS=0)
+    def test_slow_success_counts_against_the_limit(self):
+        good = _mock_response(json_data={"data": {"ok": True}})
+        with patch.object(saleor_client._session, "post", return_value=good):
+            saleor_client.saleor_graphql("query {}", {})
+        self.assertLess(self.limit.limit, 4)
+
+    def test_graphql_rejection_does_not_lower_the_limit(self):
+        response = _mock_response(json_data={"errors": [{"extensions": {"code": "INVALID"}}]})
+        with patch.object(saleor_client._session, "post", return_value=response):
+            with self.assertRaises(SaleorAPIError):
+                saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(self.limit.limit, 4)
+
+    @override_settings(SALEOR_CLUSTER_CONCURRENCY=2)
+    def test_cluster_budget_refuses_reads_and_returns_every_slot(self):
+        held = [saleor_client._cluster_acquire(), saleor_client._cluster_acquire()]
+        with (
+            patch.object(saleor_client._session, "post") as post,
+            self.assertLogs("ecommerce.services.saleor_client", level="INFO") as logs,
+        ):
+            with self.assertRaises(SaleorOverloaded) as ctx:
+                saleor_client.saleor_graphql("query {}", {})
+        post.assert_not_called()
+        self.assertIn("scope=cluster", str(ctx.exception))
+        self.assertEqual([r.outcome for r in logs.records], ["overloaded"])
+        self.assertEqual(set(cache.get(saleor_client._CLUSTER_INFLIGHT_KEY)), set(held))
+        self.assertEqual(self.limit.in_flight, 0)
+
+        saleor_client._cluster_release(held.pop())
+        with patch.object(
+            saleor_client._session, "post", side_effect=requests.ConnectionError("boom")
+        ):
+            with self.assertRaises(SaleorAPIError):
+                saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(set(cache.get(saleor_client._CLUSTER_INFLIGHT_KEY)), set(held))
+
+    @override_settings(SALEOR_CLUSTER_CONCURRENCY=2)
+    def test_cluster_budget_holds_past_the_first_slots_lifetime(self):
+        # LocMem expires keys by time.time() too
+        clock = [1000.0]
+        with patch("time.time", lambda: clock[0]):
+            first = saleor_client._cluster_acquire()
+            clock[0] += 30
+            second = saleor_client._cluster_acquire()
+            clock[0] += 15
+            saleor_client._cluster_release(first)
+            third = saleor_client._cluster_acquire()
+            self.assertTrue(second and third)
+            # Past the lifetime of a key created with the first slot, two
+            # calls are still in flight
+            clock[0] = 1000.0 + saleor_client._CLUSTER_SLOT_SECONDS + 5
+            self.assertIsNone(saleor_client._cluster_acquire())
+            saleor_client._cluster_release(second)
+            saleor_client._cluster_release(second)  # a second release is a no-op
+            self.assertTrue(saleor_client._cluster_acquire())
+            self.assertIsNone(saleor_client._cluster_acquire())
+            # A slot older than any call can last was leaked by a dead process
+            clock[0] += saleor_client._CLUSTER_SLOT_SECONDS
+            self.assertTrue(saleor_client._cluster_acquire())
+
+    def test_overloaded_catalogue_serves_stale_products(self):
+        self.limit.in_flight = 4
+        with (
+            patch("ecommerce.services.catalogue.get_cached_products", return_value=[]),
+            patch(
+                "ecommerce.services.catalogue.get_stale_cached_products",
+                return_value=[make_product()],
+            ),
+            patch.object(saleor_client._session, "post") as post,
+        ):
+            response = self.client.get(reverse("product_catalogue"))
+        post.assert_not_called()
+        self.assertContains(response, "Eve Horizon")
+
+
+@patch.object(saleor_client, "SALEOR_GRAPHQL_URL", "https://saleor.example.com/graphql/")
+@patch.object(saleor_client, "_backoff_sleep", lambda attempt: None)
+class SaleorDeadlineTests(TestCase):
+    """Within a request deadline, Saleor waits are clamped and retries that
+    cannot finish are skipped; retries never exceed the budget."""
+
+    def setUp(self):
+        cache.clear()
+        self.budget = saleor_client._TokenBudget(0.1)
+        patcher = patch.object(saleor_client, "_retry_budget", self.budget)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timeouts_are_clamped_to_the_deadline(self):
+        good = _mock_response(json_data={"data": {"ok": True}})
+        with (
+            deadline(0.5),
+            patch.object(saleor_client._session, "post", return_value=good) as post,
+        ):
+            saleor_client.saleor_graphql("query {}", {})
+        connect, read = post.call_args.kwargs["timeout"]
+        self.assertLessEqual(connect, 0.5)
+        self.assertLessEqual(read, 0.5)
+
+        with patch.object(saleor_client._session, "post", return_value=good) as post:
+            saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(
+            post.call_args.kwargs["timeout"],
+            (saleor_client.CONNECT_TIMEOUT, saleor_client.READ_TIMEOUT),
+        )
+
+    def test_retry_that_cannot_finish_in_time_is_skipped(self):
+        with (
+            deadline(0.3),
+            patch.object(
+                saleor_client._session, "post", side_effect=requests.ConnectionError("boom")
+            ) as post,
+            self.assertLogs("ecommerce.services.saleor_client", level="INFO") as logs,
+        ):
+            with self.assertRaises(SaleorAPIError):
+                saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(post.call_count, 1)
+        events = [r for r in logs.records if getattr(r, "event", "") == "saleor_call"]
+        self.assertEqual(events[0].retry_skipped, "deadline")
+        self.assertEqual(self.budget.tokens, saleor_client.RETRY_BUDGET_MAX_TOKENS)
+
+    def test_retry_is_skipped_when_backoff_jitter_could_outlast_the_deadline(self):
+        # 0.5 s backoff + 0.05 s attempt fit in 0.6 s; the 0.5 s jitter does not
+        with (
+            deadline(0.6),
+            patch.object(
+                saleor_client._session, "post", side_effect=requests.ConnectionError("boom")
+            ) as post,
+            self.assertLogs("ecommerce.services.saleor_client", level="INFO") as logs,
+        ):
+            with self.assertRaises(SaleorAPIError):
+                saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(post.call_count, 1)
+        events = [r for r in logs.records if getattr(r, "event", "") == "saleor_call"]
+        self.assertEqual(events[0].retry_skipped, "deadline")
+
+    def test_attempt_after_a_backoff_that_spent_the_deadline_is_not_sent(self):
+        with (
+            deadline(0.1),
+            patch.object(saleor_client, "_may_retry", return_value=""),
+            patch.object(saleor_client, "_backoff_sleep", lambda attempt: time.sleep(0.15)),
+            patch.object(
+                saleor_client._session, "post", side_effect=requests.ConnectionError("boom")
+            ) as post,
+        ):
+            with self.assertRaises(SaleorAPIError) as ctx:
+                saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(ctx.exception.code, "deadline_exceeded")
+
+    def test_clamped_timeout_is_not_a_circuit_failure(self):
+        with (
+            deadline(0.5),
+            patch.object(saleor_client._session, "post", side_effect=requests.Timeout("slow")),
+        ):
+            with self.assertRaises(SaleorAPIError) as ctx:
+                saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(ctx.exception.code, "deadline_exceeded")
+        self.assertIsNone(cache.get(saleor_client._CB_FAILURES_KEY))
+
+    def test_spent_deadline_sends_nothing(self):
+        with (
+            deadline(0),
+            patch.object(saleor_client._session, "post") as post,
+        ):
+            with self.assertRaises(SaleorAPIError) as ctx:
+                saleor_client.saleor_graphql("query {}", {})
+        post.assert_not_called()
+        self.assertEqual(ctx.exception.code, "deadline_exceeded")
+
+    def test_retries_stop_when_the_budget_is_spent(self):
+        self.budget.tokens = 1.05  # one retry, plus 0.1 per call
+        bad = _mock_response(status=503)
+        with (
+            patch.object(saleor_client._session, "post", return_value=bad) as post,
+            self.assertLogs("ecommerce.services.saleor_client", level="INFO") as logs,
+        ):
+            with self.assertRaises(SaleorAPIError):
+                saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(post.call_count, 2)
+        events = [r for r in logs.records if getattr(r, "event", "") == "saleor_call"]
+        self.assertEqual(events[0].retry_skipped, "budget")
+
+        # Ten calls earn one retry back
+        for _ in range(10):
+            self.budget.deposit()
+        self.assertTrue(self.budget.withdraw())
+
+
+@override_settings(SALEOR_HEDGE_READS=True)
+@patch.object(saleor_client, "SALEOR_GRAPHQL_URL", "https://saleor.example.com/graphql/")
+class SaleorHedgingTests(TestCase):
+    """A read slower than the observed p90 is sent again; the first answer
+    wins and the event says which."""
+
+    def setUp(self):
+        cache.clear()
+        self.budget = saleor_client._TokenBudget(0.05)
+        self.answers = deque([0.02] * 50, maxlen=saleor_client.HEDGE_WINDOW)
+        for name, value in (("_hedge_budget", self.budget), ("_answer_times", self.answers)):
+            patcher = patch.object(saleor_client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _sends(self, *delays):
+        """A post mock whose n-th send answers after delays[n] seconds."""
+        calls = iter(delays)
+
+        def post(*args, **kwargs):
+            response = _mock_response(json_data={"data": {"ok": True}})
+            time.sleep(next(calls))
+            return response
+        return post
+
+    def _call(self, post):
+        with (
+            patch.object(saleor_client._session, "post", side_effect=post) as mock,
+            self.assertLogs("ecommerce.services.saleor_client", level="INFO") as logs,
+        ):
+            data = saleor_client.saleor_graphql("query {}", {})
+        self.assertEqual(data, {"ok": True})
+        events = [r for r in logs.records if getattr(r, "event", "") == "saleor_call"]
+        return mock.call_count, events[0]
+
+    def test_slow_read_is_hedged_and_the_first_answer_wins(self):
+        sends, event = self._call(self._sends(0.5, 0))
+        self.assertEqual(sends, 2)
+        self.assertTrue(event.hedged)
+        self.assertEqual(event.winner, "hedge")
+        self.assertLess(event.duration_ms, 400)
+
+    def test_read_answered_within_the_p90_is_sent_once(self):
+        sends, event = self._call(self._sends(0))
+        self.assertEqual(sends, 1)
+        self.assertFalse(hasattr(event, "hedged"))
+
+    def test_no_hedging_without_enough_samples_or_budget(self):
+        self.answers.clear()
+        sends, _ = self._call(self._sends(0.1))
+        self.assertEqual(sends, 1)
+
+        self.answers.extend([0.02] * 50)
+        self.budget.tokens = 0
+        sends, event = self._call(self._sends(0.1))
+        self.assertEqual(sends, 1)
+        self.assertFalse(hasattr(event, "hedged"))
+
+    def test_mutations_are_never_hedged(self):
+        with patch.object(saleor_client._session, "post", side_effect=self._sends(0.1)) as post:
+            saleor_client.saleor_graphql("mutation {}", {}, retry=False)
+        self.assertEqual(post.call_count, 1)
+
+
+@override_settings(SALEOR_PERSISTED_QUERIES=True)
+@patch.object(saleor_client, "SALEOR_GRAPHQL_URL", "https://saleor.example.com/graphql/")
+class PersistedQueryTests(TestCase):
+    """Registered documents travel as their hash; the text follows only
+    when Saleor does not know the hash yet."""
+
+    NOT_FOUND = (
+        b'{"errors":[{"message":"PersistedQueryNotFound",'
+        b'"extensions":{"code":"PERSISTED_QUERY_NOT_FOUND"}}]}'
+    )
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch.object(saleor_client, "_persisted_queries", {"supported": True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.good = _mock_response(json_data={"data": {"products": {"edges": []}}})
+
+    def _payloads(self, post):
+        return [call.kwargs["json"] for call in post.call_args_list]
+
+    def test_known_hash_sends_no_document(self):
+        with patch.object(saleor_client._session, "post", return_value=self.good) as post:
+            saleor_client.fetch_products_from_saleor()
+        [payload] = self._payloads(post)
+        self.assertNotIn("query", payload)
+        self.assertEqual(
+            payload["extensions"]["persistedQuery"]["sha256Hash"],
+            hashlib.sha256(saleor_client.PRODUCTS_QUERY.encode()).hexdigest(),
+        )
+
+    def test_unknown_hash_is_followed_by_the_document(self):
+        miss = _mock_response(json_data={}, body=self.NOT_FOUND)
+        with patch.object(saleor_client._session, "post", side_effect=[miss, self.good]) as post:
+            self.assertEqual(saleor_client.fetch_products_from_saleor(), [])
+        first, second = self._payloads(post)
+        self.assertNotIn("query", first)
+        self.assertEqual(second["query"], saleor_client.PRODUCTS_QUERY)
+        self.assertEqual(second["extensions"], first["extensions"])
+
+    def test_unsupported_server_gets_full_documents_from_then_on(self):
+        refused = _mock_response(
+            status=400, json_data={}, body=b'{"errors":[{"message":"PersistedQueryNotSupported"}]}'
+        )
+        with patch.object(
+            saleor_client._session, "post", side_effect=[refused, self.good, self.good]
+        ) as post:
+            saleor_client.fetch_products_from_saleor()
+            saleor_client.fetch_products_from_saleor()
+        self.assertEqual(
+            ["query" in payload for payload in self._payloads(post)], [False, True, True]
+        )
+
+    def test_server_without_apq_rejecting_the_missing_document_gets_full_documents(self):
+        # What a GraphQL server that ignores the extension answers
+        refused = _mock_response(
+            status=400, json_data={"errors": [{"message": "Must provide a query string."}]}
+        )
+        with patch.object(
+            saleor_client._session, "post", side_effect=[refused, self.good, self.good]
+        ) as post:
+            self.assertEqual(saleor_client.fetch_products_from_saleor(), [])
+            saleor_client.fetch_products_from_saleor()
+        self.assertEqual(
+            ["query" in payload for payload in self._payloads(post)], [False, True, True]
+        )
+        self.assertFalse(saleor_client._persisted_queries["supported"])
+
+    def test_auth_failure_on_a_hash_only_request_is_not_a_missing_feature(self):
+        denied = _mock_response(status=401, json_data={"errors": [{"message": "Unauthorized"}]})
+        with patch.object(saleor_client._session, "post", return_value=denied) as post:
+            with self.assertRaises(SaleorAPIError):
+                saleor_client.fetch_products_from_saleor()
+        self.assertFalse(any("query" in payload for payload in self._payloads(post)))
+        self.assertTrue(saleor_client._persisted_queries["supported"])
+
+    @override_settings(SALEOR_PERSISTED_QUERIES=False)
+    def test_disabled_sends_the_document(self):
+        with patch.object(saleor_client._session, "post", return_value=self.good) as post:
+            saleor_client.fetch_products_from_saleor()
+        [payload] = self._payloads(post)
+        self.assertEqual(payload["query"], saleor_client.PRODUCTS_QUERY)
+        self.assertNotIn("extensions", payload)
+
+    def test_every_document_eve_sends_is_registered(self):
+        import payments.management.commands.reconcile_orders  # noqa: F401
+        import payments.management.commands.verify_production_acceptance  # noqa: F401
+        import payments.services.saleor_checkout  # noqa: F401
+
+        self.assertLessEqual(
+            {"products", "product_by_slug", "checkout_create", "checkout_complete",
+             "variants_preflight", "reconcile_orders", "acceptance_order"},
+            set(saleor_client.QUERIES),
+        )
+        with self.assertRaises(ValueError):
+            saleor_client.register_query("products", "query { shop { name } }")
+
+
 class ExternalUrlSanitizationTests(TestCase):
     def test_javascript_thumbnail_urls_never_rendered(self):
         evil = make_product(thumbnail={"url": "javascript:alert(1)"})
@@ -4,7 +4,14 @@ import os
 import time
 
 from celery import Celery
-from celery.signals import task_failure, task_postrun, task_prerun
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+)
+from core import tracing
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eve.settings")
 
@@ -16,8 +23,21 @@ logger = logging.getLogger("eve.tasks")
 _started = {}
 
 
+@before_task_publish.connect
+def propagate_request_context(sender=None, headers=None, **kwargs):
+    # Correlation ID and trace context travel in the task headers
+    tracing.task_publishing(sender, headers)
+
+
+@after_task_publish.connect
+def end_publish_span(headers=None, **kwargs):
+    tracing.task_published(headers)
+
+
 @task_prerun.connect
 def log_task_started(task_id=None, task=None, **kwargs):
+    # First, so the task's own log lines carry the publishing request's ID
+    tracing.task_started(task_id, task)
     _started[task_id] = time.monotonic()
     logger.info(
         "Task started: %s",
@@ -42,6 +62,7 @@ def log_task_finished(task_id=None, task=None, state=None, **kwargs):
             "duration_ms": duration_ms,
         },
     )
+    tracing.task_finished(task_id, state)
 
 
 @task_failure.connect
@@ -69,7 +69,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'core.middleware.TrustedProxyMiddleware',
     'core.middleware.RequestIDMiddleware',
+    'core.middleware.RequestTracingMiddleware',
     'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.RequestDeadlineMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'core.middleware.SecurityHeadersMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -129,6 +131,40 @@ SALEOR_GRAPHQL_URL = config("SALEOR_GRAPHQL_URL", default="")
 SALEOR_CHANNEL = config("SALEOR_CHANNEL", default="default-channel")
 SALEOR_API_TOKEN = config("SALEOR_API_TOKEN", default="")
 
+# Adaptive limit on in-flight Saleor calls (ecommerce/services/saleor_client.py):
+# the per-process ceiling the limit grows back to, the answer time above which
+# a call counts as slow, and an optional budget for the whole deployment
+# (0 = none; one shared cache entry per in-flight call)
+SALEOR_MAX_CONCURRENCY = config("SALEOR_MAX_CONCURRENCY", default=8, cast=int)
+SALEOR_SLOW_CALL_MS = config("SALEOR_SLOW_CALL_MS", default=2000, cast=int)
+SALEOR_CLUSTER_CONCURRENCY = config("SALEOR_CLUSTER_CONCURRENCY", default=0, cast=int)
+
+# Deadline for upstream calls made while serving these routes, by URL name
+# (core/deadline.py). Saleor timeouts are clamped to what is left and retries
+# that cannot finish in time are skipped, so a slow Saleor turns into the
+# stale-catalogue fallback within the budget instead of ~35 s of retries.
+# Checkout routes are deliberately absent: a clamped checkoutComplete would
+# only turn into an outcome-unknown attempt.
+CATALOGUE_DEADLINE_MS = config("CATALOGUE_DEADLINE_MS", default=2500, cast=int)
+REQUEST_BUDGETS_MS = {
+    "product_catalogue": CATALOGUE_DEADLINE_MS,
+    "product_detail": CATALOGUE_DEADLINE_MS,
+    "add_to_cart": CATALOGUE_DEADLINE_MS,
+    "v1:cart-items": CATALOGUE_DEADLINE_MS,
+    "v1:product-list": CATALOGUE_DEADLINE_MS,
+    "v1:product-detail": CATALOGUE_DEADLINE_MS,
+}
+# At most this share of Saleor calls may be retries, per process (token
+# bucket); during an incident retries cannot multiply the load on Saleor
+SALEOR_RETRY_BUDGET_RATIO = config("SALEOR_RETRY_BUDGET_RATIO", default=0.1, cast=float)
+# Hedged reads: a read still unanswered at the observed p90 is sent once more
+# and the first answer wins; hedges are capped at this share of reads
+SALEOR_HEDGE_READS = config("SALEOR_HEDGE_READS", default=False, cast=bool)
+SALEOR_HEDGE_BUDGET_RATIO = config("SALEOR_HEDGE_BUDGET_RATIO", default=0.05, cast=float)
+# Send registered GraphQL documents as their SHA-256 (Automatic Persisted
+# Queries) instead of the full text; needs APQ support in front of Saleor
+SALEOR_PERSISTED_QUERIES = config("SALEOR_PERSISTED_QUERIES", default=False, cast=bool)
+
 # Saleor signs webhook bodies as detached RS256 JWS. When unset, the JWKS URL
 # is derived from SALEOR_GRAPHQL_URL's origin.
 SALEOR_JWKS_URL = config("SALEOR_JWKS_URL", default="")
@@ -144,6 +180,11 @@ PRODUCT_CACHE_TTL_SECONDS = config("PRODUCT_CACHE_TTL_SECONDS", default=3600, ca
 CHECKOUT_RECOVERY_GRACE_SECONDS = config(
     "CHECKOUT_RECOVERY_GRACE_SECONDS", default=300, cast=int
 )
+# Check stock and prices with one read-only Saleor query before taking the
+# checkout lease (payments/services/checkout.py)
+CHECKOUT_PREFLIGHT = config("CHECKOUT_PREFLIGHT", default=False, cast=bool)
+# Answer checkout with 202 and run the Saleor mutations on the orders queue
+CHECKOUT_ASYNC = config("CHECKOUT_ASYNC", default=False, cast=bool)
 
 # --- Data retention (enforced by manage.py purge_expired_data, run daily)
 CONTACT_MESSAGE_RETENTION_DAYS = config("CONTACT_MESSAGE_RETENTION_DAYS", default=365, cast=int)
@@ -185,11 +226,17 @@ CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
 CELERY_WORKER_CANCEL_LONG_RUNNING_TASKS_ON_CONNECTION_LOSS = True
+# Request threads never publish to the broker directly: tasks go through the
+# transactional outbox (core/outbox.py), which `manage.py relay_outbox`
+# polls this often when idle
+OUTBOX_POLL_SECONDS = config("OUTBOX_POLL_SECONDS", default=0.2, cast=float)
 CELERY_TASK_ROUTES = {
     "accounts.tasks.*": {"queue": "email"},
     "payments.tasks.process_webhook_event": {"queue": "webhooks"},
     "payments.tasks.recover_pending_webhooks": {"queue": "webhooks"},
     "payments.tasks.reconcile_orders": {"queue": "orders"},
+    "payments.tasks.complete_checkout_attempt": {"queue": "orders"},
+    "payments.tasks.recover_queued_checkouts": {"queue": "orders"},
     "core.tasks.purge_expired_data": {"queue": "maintenance"},
     "core.tasks.sample_resources": {"queue": "maintenance"},
     "ecommerce.tasks.refresh_catalogue": {"queue": "catalogue"},
@@ -199,6 +246,10 @@ CELERY_BEAT_SCHEDULE = {
         "task": "payments.tasks.recover_pending_webhooks",
         "schedule": 60.0,
     },
+    "recover-queued-checkouts": {
+        "task": "payments.tasks.recover_queued_checkouts",
+        "schedule": 60.0,
+    },
     "reconcile-saleor-orders": {
         "task": "payments.tasks.reconcile_orders",
         "schedule": 60.0 * 60.0,
@@ -222,7 +273,7 @@ if REDIS_URL:
 
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "BACKEND": "core.cache.RedisCache",
             "LOCATION": REDIS_URL,
             "OPTIONS": {
                 # JSON instead of pickle: a compromised Redis must not be
@@ -272,18 +323,51 @@ if DB_ENGINE == "sqlite":
 else:
     DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # Django's PostgreSQL backend, plus connection check-out timing for
+        # the http_request event (core/postgresql/base.py)
+        "ENGINE": "core.postgresql",
         "NAME": config("DB_NAME", default="eve_db"),
         "USER": config("DB_USER", default="eve_user"),
         "PASSWORD": config("DB_PASSWORD", default="password"),
         "HOST": config("DB_HOST", default="localhost"),
         "PORT": config("DB_PORT", default="5432"),
-        # Persistent connections with health checks; put PgBouncer in front
-        # when worker count × CONN_MAX_AGE pressure approaches max_connections
+        # Persistent connections with health checks; only used with
+        # DB_POOL off (Django refuses CONN_MAX_AGE alongside a pool)
         "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
         "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
     }
+    # psycopg 3 connection pool, one per process. Requests borrow a
+    # connection for their duration and hand it back, so a process holds
+    # at most DB_POOL_MAX_SIZE connections however long it lives, and
+    # idle ones above DB_POOL_MIN_SIZE are closed. gunicorn.conf.py sets
+    # the maximum to the worker's thread count. A request that cannot get
+    # a connection within DB_POOL_TIMEOUT seconds fails rather than
+    # queueing until the worker timeout.
+    if config("DB_POOL", default=True, cast=bool):
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": config("DB_POOL_MIN_SIZE", default=1, cast=int),
+            "max_size": config("DB_POOL_MAX_SIZE", default=4, cast=int),
+            "timeout": config("DB_POOL_TIMEOUT", default=5, cast=float),
+        }
+    # Optional streaming replica for history, export and monitoring reads
+    # (core/db_router.py). Same database and credentials, different host.
+    if config("DB_REPLICA_HOST", default=""):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": config("DB_REPLICA_HOST"),
+            "PORT": config("DB_REPLICA_PORT", default=DATABASES["default"]["PORT"]),
+            "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+            "TEST": {"MIRROR": "default"},
+        }
+
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+# After a user's order is written, their history reads the primary this long, so
+# replication lag never hides the order they just placed
+DB_REPLICA_PIN_SECONDS = config("DB_REPLICA_PIN_SECONDS", default=30, cast=int)
+
 MONGODB = {
     "HOST": config("MONGODB_URI", default="mongodb://localhost:27017"),
     "DB_NAME": config("MONGODB_DB_NAME", default="EVEDB"),
@@ -303,6 +387,14 @@ TRUSTED_PROXIES = config("DJANGO_TRUSTED_PROXIES", default="", cast=Csv())
 # check (eve.W002) fails the release otherwise.
 RATE_LIMIT_SCALE = config("RATE_LIMIT_SCALE", default=1, cast=int)
 
+# Per-process pre-filter in front of the shared rate-limit counters: a client
+# Redis has already reported over its limit is refused from worker memory
+# for the rest of the window, so a credential-stuffing burst cannot saturate
+# the Redis pool. The shared counter still decides every borderline case.
+RATE_LIMIT_LOCAL_PREFILTER = config(
+    "RATE_LIMIT_LOCAL_PREFILTER", default=True, cast=bool
+)
+
 # API tokens are hashed at rest and expire (threat model R11)
 # Access tokens are short-lived and signed; refresh tokens are stored
 # hashed and rotate on every use (api/tokens.py).
@@ -338,8 +430,14 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # core.fastjson underneath: same output as DRF's, less CPU per request
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "api.renderers.JSONRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
@@ -362,6 +460,37 @@ REST_FRAMEWORK = {
 # (prod default); "console" keeps human-readable output (dev default).
 LOG_FORMAT = config("LOG_FORMAT", default="console")
 LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+# Records are written by a background thread (core.logging.AsyncQueueHandler)
+# from a queue of at most LOG_QUEUE_SIZE; beyond that they are dropped and
+# counted rather than slowing requests down. LOG_ASYNC=False writes inline.
+LOG_ASYNC = config("LOG_ASYNC", default=True, cast=bool)
+LOG_QUEUE_SIZE = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+# Bearer token the Prometheus scraper presents on /metrics (core/metrics.py).
+# Empty disables the endpoint. Scrape pods directly: the proxy refuses it.
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+# Span tracing (core/tracing.py): "" (off), "file" (JSON lines appended to
+# TRACE_FILE) or "otlp" (OTEL_EXPORTER_OTLP_ENDPOINT, needs
+# opentelemetry-exporter-otlp-proto-http). TRACE_SAMPLE_RATE is the share
+# of requests traced; tasks follow the request that published them.
+TRACE_EXPORTER = config("TRACE_EXPORTER", default="")
+TRACE_FILE = config("TRACE_FILE", default="/tmp/eve-spans.jsonl")
+TRACE_SAMPLE_RATE = config("TRACE_SAMPLE_RATE", default=1.0, cast=float)
+# Sampling profiler (core/profiling.py), off unless PROFILER_ENABLED. Each
+# worker samples the stacks of its request threads every
+# PROFILER_INTERVAL_MS and writes collapsed stacks per route, plus one file
+# per request slower than SLOW_REQUEST_MS (the newest PROFILER_KEEP_SLOW are
+# kept), under PROFILER_DIR. `manage.py profiles` reads them.
+PROFILER_ENABLED = config("PROFILER_ENABLED", default=False, cast=bool)
+PROFILER_INTERVAL_MS = config("PROFILER_INTERVAL_MS", default=10, cast=int)
+PROFILER_DIR = config("PROFILER_DIR", default="/tmp/eve-profiles")
+PROFILER_KEEP_SLOW = config("PROFILER_KEEP_SLOW", default=200, cast=int)
+# Per-route SLO budgets (core/slo.py, budgets in loadtest/config.py): every
+# worker's latency sketches are merged in Redis; a route is burning when,
+# over the last SLO_WINDOW_MINUTES and at least SLO_MIN_REQUESTS requests,
+# it runs over its p95 or error budget faster than the budget allows.
+SLO_TRACKING = config("SLO_TRACKING", default=True, cast=bool)
+SLO_WINDOW_MINUTES = config("SLO_WINDOW_MINUTES", default=60, cast=int)
+SLO_MIN_REQUESTS = config("SLO_MIN_REQUESTS", default=20, cast=int)
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "Eve API",
@@ -405,7 +534,13 @@ LOGGING = {
         "json": {"()": "core.logging.JsonFormatter"},
     },
     "handlers": {
+        # Redaction runs on the background writer when LOG_ASYNC is on
         "console": {
+            "()": "core.logging.AsyncQueueHandler",
+            "maxsize": LOG_QUEUE_SIZE,
+            "formatter": "json" if LOG_FORMAT == "json" else "verbose",
+            "filters": ["request_id"],
+        } if LOG_ASYNC else {
             "class": "logging.StreamHandler",
             "formatter": "json" if LOG_FORMAT == "json" else "verbose",
             "filters": ["request_id", "redact"],
@@ -453,8 +588,16 @@ if SENTRY_DSN:
 # a login cost ~3.2s of CPU on staging). The PBKDF2 hashers stay listed so
 # existing passwords still verify; Django transparently upgrades each hash
 # on the owner's next successful login.
-# Note: Argon2 is memory-hard (~100 MiB per concurrent hash by default);
-# budget RAM as workers x threads x memory_cost.
+# Note: Argon2 is memory-hard (~100 MiB per concurrent hash by default), so
+# each worker admits only PASSWORD_HASH_CONCURRENCY verifications at once
+# (accounts.services.hashing). gunicorn.conf.py derives it from the
+# container's CPU and memory allocation and passes it to the workers; the
+# default here covers runserver and Celery. Logins that cannot get a slot
+# within PASSWORD_HASH_QUEUE_TIMEOUT_MS are answered 503 immediately.
+PASSWORD_HASH_CONCURRENCY = config("PASSWORD_HASH_CONCURRENCY", default=2, cast=int)
+PASSWORD_HASH_QUEUE_TIMEOUT_MS = config(
+    "PASSWORD_HASH_QUEUE_TIMEOUT_MS", default=500, cast=int
+)
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.Argon2PasswordHasher",
     "django.contrib.auth.hashers.PBKDF2PasswordHasher",
@@ -41,14 +41,20 @@ CSRF_TRUSTED_ORIGINS = config("DJANGO_CSRF_TRUSTED_ORIGINS", default="", cast=Cs
 if DB_ENGINE == "sqlite":
     raise ImproperlyConfigured("DB_ENGINE=sqlite is a local evaluation mode only.")
 DATABASES["default"].update({
-    "ENGINE": "django.db.backends.postgresql",
+    "ENGINE": "core.postgresql",
     "NAME": config("DB_NAME"),
     "USER": config("DB_USER"),
     "PASSWORD": config("DB_PASSWORD"),
     "HOST": config("DB_HOST"),
     "PORT": config("DB_PORT", default="5432"),
-    "OPTIONS": {"sslmode": config("DB_SSLMODE", default="require")},
 })
+# Merged, not replaced: OPTIONS also carries the connection pool
+DATABASES["default"]["OPTIONS"]["sslmode"] = config("DB_SSLMODE", default="require")
+if "replica" in DATABASES:
+    DATABASES["replica"].update({
+        key: DATABASES["default"][key] for key in ("ENGINE", "NAME", "USER", "PASSWORD")
+    })
+    DATABASES["replica"]["OPTIONS"]["sslmode"] = DATABASES["default"]["OPTIONS"]["sslmode"]
 if DATABASES["default"]["PASSWORD"] in ("", "password"):
     raise ImproperlyConfigured("DB_PASSWORD must be set to a real password in production.")
 
@@ -84,7 +90,7 @@ from core.cache import SafeJSONSerializer  # noqa: E402
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "BACKEND": "core.cache.RedisCache",
         "LOCATION": REDIS_URL,
         "OPTIONS": {
             # JSON instead of pickle (threat model R2)
@@ -29,6 +29,9 @@ CACHES = {
     }
 }
 SESSION_ENGINE = "django.contrib.sessions.backends.db"
+# Tests reset rate limits with cache.clear(); a per-process mirror of the
+# counters would outlive that. RateLimitPrefilterTests opts back in.
+RATE_LIMIT_LOCAL_PREFILTER = False
 
 # Fast hashing keeps the suite quick; PasswordHashingTests overrides this
 # to exercise the real Argon2id configuration.
@@ -52,3 +55,6 @@ MONGODB = {**MONGODB, "HOST": "mongodb://127.0.0.1:27017/?serverSelectionTimeout
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 PUBLIC_BASE_URL = "http://testserver"
 SERVER_TIMING_ENABLED = True
+# No background SLO flusher writing into the shared test cache; SloTests
+# turn it on
+SLO_TRACKING = False
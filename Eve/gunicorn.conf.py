@@ -1,7 +1,9 @@
 """Gunicorn configuration. Tunables come from the environment so the same
 image serves every deployment size."""
+import math
 import multiprocessing
 import os
+import shutil
 
 
 def detect_cpus() -> float:
@@ -36,7 +38,52 @@ def detect_cpus() -> float:
     return float(multiprocessing.cpu_count())
 
 
+def detect_memory_bytes() -> int:
+    """Memory *allocated to this container*, for the same reason as
+    detect_cpus(): /proc/meminfo inside a container describes the host."""
+    # cgroup v2
+    try:
+        with open("/sys/fs/cgroup/memory.max") as handle:
+            limit = handle.read().strip()
+        if limit != "max":
+            return int(limit)
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1 reports "unlimited" as a near-2^63 sentinel
+    try:
+        with open("/sys/fs/cgroup/memory/memory.limit_in_bytes") as handle:
+            limit = int(handle.read())
+        if 0 < limit < 1 << 60:
+            return limit
+    except (OSError, ValueError):
+        pass
+
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+# Django's Argon2id default: memory_cost=102400 KiB held for every
+# concurrent verification. Hashing may use at most this share of the
+# container's memory; the rest belongs to the application itself.
+ARGON2_MEMORY_BYTES = 102400 * 1024
+PASSWORD_HASH_MEMORY_SHARE = 0.5
+
+
+def password_hash_slots(cpus: float, memory_bytes: int, workers: int, threads: int) -> int:
+    """Concurrent password verifications each worker admits.
+
+    Argon2id is CPU-bound and memory-hard: more verifications in flight than
+    there are CPUs only time-slices them (every login gets slower), and each
+    one pins ~100 MiB, so `workers x threads` of them can push a small
+    container into swap. Always at least one, so logins never stop.
+    """
+    by_cpu = math.ceil(cpus / workers)
+    by_memory = int(memory_bytes * PASSWORD_HASH_MEMORY_SHARE) // ARGON2_MEMORY_BYTES // workers
+    return max(1, min(threads, by_cpu, by_memory))
+
+
 ALLOCATED_CPUS = detect_cpus()
+ALLOCATED_MEMORY = detect_memory_bytes()
 
 bind = "0.0.0.0:8000"
 
@@ -50,6 +97,26 @@ workers = int(os.environ.get(
 ))
 threads = int(os.environ.get("GUNICORN_THREADS", "4"))
 
+# Handed to every worker's Django settings (accounts.services.hashing). An
+# explicit PASSWORD_HASH_CONCURRENCY in the environment wins.
+password_hash_concurrency = int(os.environ.get(
+    "PASSWORD_HASH_CONCURRENCY",
+    password_hash_slots(ALLOCATED_CPUS, ALLOCATED_MEMORY, workers, threads),
+))
+# Each thread serves one request and a request holds one PostgreSQL
+# connection, so a pool of `threads` never makes a request wait on another
+# thread's connection and never holds more than it can use.
+db_pool_max_size = int(os.environ.get("DB_POOL_MAX_SIZE", threads))
+# Workers write their Prometheus samples here and any worker serving
+# /metrics aggregates them (core/metrics.py). Set in the master before the
+# workers fork, so it is in place before they import prometheus_client.
+prometheus_multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "/tmp/eve-metrics")
+raw_env = [
+    f"PASSWORD_HASH_CONCURRENCY={password_hash_concurrency}",
+    f"DB_POOL_MAX_SIZE={db_pool_max_size}",
+    f"PROMETHEUS_MULTIPROC_DIR={prometheus_multiproc_dir}",
+]
+
 timeout = 30
 graceful_timeout = 30
 keepalive = 5
@@ -67,9 +134,27 @@ errorlog = "-"
 
 def on_starting(server):
     """Make the effective sizing visible in the deployment logs: guessing it
-    from the outside is what hid the oversized pool in the first place."""
+    from the outside is what hid the oversized pool in the first place.
+    Also start from an empty metrics directory: files left by a previous
+    master would be counted as live workers."""
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir)
     server.log.info(
         "gunicorn sizing: %d workers x %d threads (%s); detected %.2f allocated CPU(s); "
         "PostgreSQL connections per pod <= %d",
-        workers, threads, worker_class, ALLOCATED_CPUS, workers * threads,
+        workers, threads, worker_class, ALLOCATED_CPUS,
+        workers * min(threads, db_pool_max_size),
+    )
+    server.log.info(
+        "password hashing: %d concurrent verification(s) per worker; "
+        "detected %d MiB allocated memory",
+        password_hash_concurrency, ALLOCATED_MEMORY // (1024 * 1024),
     )
+
+
+def child_exit(server, worker):
+    """Drop a recycled worker's live gauges (max_requests replaces workers
+    routinely); its counters and histograms keep counting."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid, prometheus_multiproc_dir)
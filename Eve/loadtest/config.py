@@ -1,4 +1,5 @@
-"""Configuration shared by the load-test runner, evaluator, and tests."""
+"""Configuration shared by the load-test runner, evaluator, and tests, and
+by the app's production SLO tracking (core/slo.py)."""
 
 DEFAULT_MANIFEST_PATH = "loadtest/manifest.json"
 
@@ -15,3 +16,18 @@ P95_BUDGETS_MS = {
     "POST /payments/webhooks/saleor/": 300,
 }
 MAX_FAILURE_RATIO = 0.01
+
+# The route each budgeted request exercises, as the app labels it (method
+# and URL pattern). Production holds every route to the same budget;
+# requests that share a route share the most lenient of their budgets, since
+# the product page serves cache hits and misses alike.
+BUDGET_ROUTES = {
+    "GET /": "GET /",
+    "GET /shop/catalogue/": "GET /shop/catalogue/",
+    "GET /shop/product/[hit]": "GET /shop/product/<slug:slug>/",
+    "GET /shop/product/[miss]": "GET /shop/product/<slug:slug>/",
+    "POST /accounts/login/": "POST /accounts/login/",
+    "POST /shop/cart/add/": "POST /shop/cart/add/<slug:slug>/",
+    "GET /shop/cart/": "GET /shop/cart/",
+    "POST /payments/webhooks/saleor/": "POST /payments/webhooks/saleor/",
+}
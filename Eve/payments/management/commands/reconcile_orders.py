@@ -3,27 +3,46 @@
 If the local Order write fails after checkoutComplete, Saleor owns an order
 Eve doesn't know about — and its webhooks are then acknowledged-and-dropped.
 Run this daily and alert when discrepancies appear.
+
+The Saleor feed is read incrementally: oldest change first, page by page,
+from the `updatedAt` high-water mark the last `--fix` run stored. A backlog
+larger than one run can read is therefore continued by the next run instead
+of falling off the end of a "newest N" window. Missing orders with no local
+user are stored with the mark and reported again by every run until someone
+creates their local Order.
 """
 import logging
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 
+from core.db_router import pin_to_primary, replica_reads
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models.functions import Lower
 from django.utils import timezone
-from ecommerce.services.saleor_client import SaleorAPIError, saleor_graphql
+from django.utils.dateparse import parse_datetime
+from ecommerce.services.saleor_client import SaleorAPIError, register_query, saleor_graphql
 
-from payments.models import CheckoutAttempt, Order
+from payments.models import CheckoutAttempt, Order, ReconciliationCheckpoint
 
 logger = logging.getLogger(__name__)
 
-ORDERS_QUERY = """
-query ($first: Int!) {
-  orders(first: $first, sortBy: {field: CREATION_DATE, direction: DESC}) {
+ORDERS_QUERY = register_query("reconcile_orders", """
+query ($first: Int!, $after: String, $since: DateTime!) {
+  orders(
+    first: $first
+    after: $after
+    filter: {updatedAt: {gte: $since}}
+    sortBy: {field: LAST_MODIFIED_AT, direction: ASC}
+  ) {
+    pageInfo { hasNextPage endCursor }
     edges {
       node {
         id
+        updatedAt
         userEmail
         eveIdempotencyKey: metafield(key: "eve_idempotency_key")
         total { gross { amount currency } }
@@ -31,48 +50,220 @@ query ($first: Int!) {
     }
   }
 }
-"""
+""")
+
+CHECKPOINT = "saleor_orders"
+
+
+def _aware_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if timezone.is_aware(parsed) else parsed.replace(tzinfo=dt_timezone.utc)
 
 
 class Command(BaseCommand):
     help = (
-        "Compare recent Saleor orders with the local Order table and report "
-        "orders Saleor knows about but Eve does not. --fix creates missing "
-        "local records (status=pending; the next webhook re-delivery or a "
-        "manual Saleor check promotes them). Run daily; alert on mismatches."
+        "Compare Saleor orders changed since the last run with the local "
+        "Order table and report orders Saleor knows about but Eve does not. "
+        "--fix creates missing local records (status=pending; the next "
+        "webhook re-delivery or a manual Saleor check promotes them) and "
+        "advances the stored high-water mark. Run daily; alert on mismatches."
     )
 
     def add_arguments(self, parser):
         parser.add_argument("--first", type=int, default=100,
-                            help="How many recent Saleor orders to compare (default 100)")
+                            help="Saleor orders per page (default 100)")
+        parser.add_argument("--max-pages", type=int, default=20,
+                            help="Stop after this many pages; the next run continues")
+        parser.add_argument("--since", type=_aware_datetime, default=None,
+                            help="Re-read from this ISO timestamp instead of the stored mark")
+        parser.add_argument("--lookback-hours", type=int, default=24,
+                            help="Where to start when no mark is stored yet (default 24)")
         parser.add_argument("--fix", action="store_true",
                             help="Create local records for missing orders with a matching user")
 
-    def handle(self, *args, **options):
+    def _start(self, options):
+        if options["since"]:
+            return options["since"]
+        checkpoint = ReconciliationCheckpoint.objects.filter(name=CHECKPOINT).first()
+        if checkpoint:
+            return checkpoint.high_water_mark
+        return timezone.now() - timedelta(hours=options["lookback_hours"])
+
+    def _fetch(self, first, after, since):
         try:
-            data = saleor_graphql(ORDERS_QUERY, {"first": options["first"]})
-            nodes = [edge["node"] for edge in data["orders"]["edges"]]
+            data = saleor_graphql(
+                ORDERS_QUERY, {"first": first, "after": after, "since": since.isoformat()}
+            )
+            orders = data["orders"]
+            nodes = [edge["node"] for edge in orders["edges"]]
         except (SaleorAPIError, KeyError, TypeError) as exc:
             self.stderr.write(self.style.ERROR(f"Could not fetch Saleor orders: {exc}"))
             raise CommandError("Saleor order reconciliation failed") from None
+        page_info = orders.get("pageInfo") or {}
+        next_cursor = page_info.get("endCursor") if page_info.get("hasNextPage") else None
+        return [n for n in nodes if isinstance(n, dict) and n.get("id")], next_cursor
+
+    @staticmethod
+    def _missing(nodes):
+        saleor_ids = [n["id"] for n in nodes]
+        # The bulk comparison can run on the replica. Orders it reports
+        # missing are re-checked on the primary: one written within the
+        # replication lag is not missing, and --fix must never duplicate it.
+        with replica_reads():
+            known = set(
+                Order.objects.filter(saleor_order_id__in=saleor_ids)
+                .values_list("saleor_order_id", flat=True)
+            )
+        unconfirmed = [i for i in saleor_ids if i not in known]
+        if unconfirmed:
+            known.update(
+                Order.objects.filter(saleor_order_id__in=unconfirmed)
+                .values_list("saleor_order_id", flat=True)
+            )
+        return [n for n in nodes if n["id"] not in known]
+
+    @staticmethod
+    def _owners(missing):
+        """Checkout attempts by idempotency key and users by lower-cased
+        email for a whole page: two queries however many orders are missing."""
+        keys = {n.get("eveIdempotencyKey") for n in missing} - {None, ""}
+        attempts = {
+            attempt.idempotency_key: attempt
+            for attempt in CheckoutAttempt.objects.select_related("user").filter(
+                idempotency_key__in=keys
+            )
+        } if keys else {}
+        emails = {
+            n["userEmail"].lower() for n in missing
+            if n.get("userEmail") and n.get("eveIdempotencyKey") not in attempts
+        }
+        users = {}
+        if emails:
+            matches = (
+                User.objects.annotate(email_lower=Lower("email"))
+                .filter(email_lower__in=emails)
+                .order_by("pk")
+            )
+            for user in matches:
+                users.setdefault(user.email_lower, user)
+        return attempts, users
 
-        saleor_ids = [n["id"] for n in nodes if isinstance(n, dict) and n.get("id")]
-        known = set(
-            Order.objects.filter(saleor_order_id__in=saleor_ids)
+    def _reconcile_page(self, missing, fix, high_water_mark, since):
+        """Report and (with --fix) recreate one page's missing orders, and
+        store the page's high-water mark and unmatched orders in the same
+        transaction."""
+        attempts, users = self._owners(missing) if missing else ({}, {})
+        now = timezone.now()
+        orders, completed, unmatched = [], [], []
+        for node in missing:
+            attempt = attempts.get(node.get("eveIdempotencyKey") or "")
+            email = (node.get("userEmail") or "").lower()
+            user = attempt.user if attempt else users.get(email)
+            if user is None:
+                unmatched.append(node["id"])
+            # Order ids are logged; emails are not (log hygiene)
+            logger.warning(
+                "Reconciliation: Saleor order %s missing locally (user %s)",
+                node["id"], "matched" if user else "unmatched",
+            )
+            self.stdout.write(
+                f"MISSING {node['id']} — local user "
+                f"{'found' if user else 'NOT FOUND (manual review needed)'}"
+            )
+            if not (fix and user):
+                continue
+            gross = ((node.get("total") or {}).get("gross") or {})
+            orders.append(Order(
+                user=user,
+                saleor_order_id=node["id"],
+                saleor_checkout_id=(attempt.saleor_checkout_id if attempt else ""),
+                idempotency_key=(attempt.idempotency_key if attempt else None),
+                total_amount=str(gross.get("amount") or "0"),
+                currency=gross.get("currency") or "EUR",
+                status=Order.Status.PENDING,
+            ))
+            if attempt:
+                attempt.saleor_order_id = node["id"]
+                attempt.state = CheckoutAttempt.State.COMPLETED
+                attempt.completed_at = now
+                attempt.last_error = ""
+                attempt.updated_at = now  # bulk_update skips auto_now
+                completed.append(attempt)
+
+        if not fix:
+            return 0, unmatched
+        with transaction.atomic():
+            Order.objects.bulk_create(orders)
+            CheckoutAttempt.objects.bulk_update(
+                completed,
+                ["saleor_order_id", "state", "completed_at", "last_error", "updated_at"],
+            )
+            if high_water_mark or unmatched:
+                checkpoint, created = (
+                    ReconciliationCheckpoint.objects.select_for_update().get_or_create(
+                        name=CHECKPOINT, defaults={"high_water_mark": high_water_mark or since}
+                    )
+                )
+                changed = []
+                if not created and high_water_mark and high_water_mark > checkpoint.high_water_mark:
+                    checkpoint.high_water_mark = high_water_mark
+                    changed.append("high_water_mark")
+                if unmatched:
+                    # The mark moves past them; this list keeps them reported
+                    checkpoint.unmatched_order_ids = sorted(
+                        set(checkpoint.unmatched_order_ids or ()) | set(unmatched)
+                    )
+                    changed.append("unmatched_order_ids")
+                if changed:
+                    checkpoint.save(update_fields=[*changed, "updated_at"])
+        for user in {order.user for order in orders}:
+            pin_to_primary(user)
+        return len(orders), len(unmatched)
+
+    def _carried_unmatched(self, fix, reported):
+        """Report the unmatched orders earlier runs stored that still have no
+        local Order, except those this run already reported. With --fix,
+        forget the ones that now exist locally. Returns how many it
+        reported."""
+        checkpoint = ReconciliationCheckpoint.objects.filter(name=CHECKPOINT).first()
+        stored = (checkpoint.unmatched_order_ids or []) if checkpoint else []
+        if not stored:
+            return 0
+        resolved = set(
+            Order.objects.filter(saleor_order_id__in=stored)
             .values_list("saleor_order_id", flat=True)
         )
-        missing = [n for n in nodes if n.get("id") and n["id"] not in known]
+        carried = [
+            order_id for order_id in stored
+            if order_id not in resolved and order_id not in reported
+        ]
+        for order_id in carried:
+            logger.warning(
+                "Reconciliation: Saleor order %s still missing locally (user unmatched)",
+                order_id,
+            )
+            self.stdout.write(
+                f"MISSING {order_id} — local user NOT FOUND (manual review needed; "
+                "first reported by an earlier run)"
+            )
+        if fix and resolved:
+            with transaction.atomic():
+                checkpoint = ReconciliationCheckpoint.objects.select_for_update().get(
+                    pk=checkpoint.pk
+                )
+                checkpoint.unmatched_order_ids = [
+                    order_id for order_id in checkpoint.unmatched_order_ids or ()
+                    if order_id not in resolved
+                ]
+                checkpoint.save(update_fields=["unmatched_order_ids", "updated_at"])
+        return len(carried)
 
+    def _sweep_uncertain(self):
         cutoff = timezone.now() - timedelta(
             seconds=settings.CHECKOUT_RECOVERY_GRACE_SECONDS
         )
         uncertain = CheckoutAttempt.objects.filter(
-            state__in=[
-                CheckoutAttempt.State.STARTED,
-                CheckoutAttempt.State.CHECKOUT_CREATED,
-                CheckoutAttempt.State.COMPLETING,
-                CheckoutAttempt.State.UNKNOWN,
-            ],
+            state__in=CheckoutAttempt.RECONCILE_STATES,
             updated_at__lt=cutoff,
         )
         newly_unknown = uncertain.exclude(state=CheckoutAttempt.State.UNKNOWN).update(
@@ -90,66 +281,60 @@ class Command(BaseCommand):
                     "newly_unknown": newly_unknown,
                 },
             )
+        return uncertain_count
 
-        if not missing:
-            self.stdout.write(self.style.SUCCESS(
-                f"Reconciliation clean: all {len(saleor_ids)} recent Saleor "
-                f"orders exist locally; {uncertain_count} uncertain checkout attempt(s)."
-            ))
-            return
-
-        fixed = 0
-        for node in missing:
-            idempotency_key = node.get("eveIdempotencyKey") or ""
-            attempt = (
-                CheckoutAttempt.objects.select_related("user")
-                .filter(idempotency_key=idempotency_key)
-                .first()
-                if idempotency_key
-                else None
+    def handle(self, *args, **options):
+        since = self._start(options)
+        after = None
+        pages = compared = missing_total = fixed = 0
+        reported = set()
+        while pages < options["max_pages"]:
+            started = time.monotonic()
+            nodes, after = self._fetch(options["first"], after, since)
+            pages += 1
+            missing = self._missing(nodes)
+            marks = [parse_datetime(n.get("updatedAt") or "") for n in nodes]
+            high_water_mark = max((m for m in marks if m), default=None)
+            recreated, unmatched = self._reconcile_page(
+                missing, options["fix"], high_water_mark, since
             )
-            email = node.get("userEmail") or ""
-            user = attempt.user if attempt else (
-                User.objects.filter(email__iexact=email).first() if email else None
+            reported.update(n["id"] for n in missing)
+            compared += len(nodes)
+            missing_total += len(missing)
+            fixed += recreated
+            logger.info(
+                "Reconciliation page %d: %d order(s), %d missing",
+                pages, len(nodes), len(missing),
+                extra={
+                    "event": "order_reconciliation_page",
+                    "page": pages,
+                    "orders": len(nodes),
+                    "missing": len(missing),
+                    "recreated": recreated,
+                    "unmatched": unmatched,
+                    "high_water_mark": high_water_mark.isoformat() if high_water_mark else None,
+                    "duration_ms": round((time.monotonic() - started) * 1000, 1),
+                },
             )
-            # Order ids are logged; emails are not (log hygiene)
+            if after is None:
+                break
+        else:
             logger.warning(
-                "Reconciliation: Saleor order %s missing locally (user %s)",
-                node["id"], "matched" if user else "unmatched",
-            )
-            self.stdout.write(
-                f"MISSING {node['id']} — local user "
-                f"{'found' if user else 'NOT FOUND (manual review needed)'}"
+                "Reconciliation stopped after %d page(s) with more to read", pages,
+                extra={"event": "order_reconciliation_backlog", "pages": pages},
             )
-            if options["fix"] and user:
-                gross = ((node.get("total") or {}).get("gross") or {})
-                with transaction.atomic():
-                    Order.objects.create(
-                        user=user,
-                        saleor_order_id=node["id"],
-                        saleor_checkout_id=(attempt.saleor_checkout_id if attempt else ""),
-                        idempotency_key=(attempt.idempotency_key if attempt else None),
-                        total_amount=str(gross.get("amount") or "0"),
-                        currency=gross.get("currency") or "EUR",
-                        status=Order.Status.PENDING,
-                    )
-                    if attempt:
-                        attempt.saleor_order_id = node["id"]
-                        attempt.state = CheckoutAttempt.State.COMPLETED
-                        attempt.completed_at = timezone.now()
-                        attempt.last_error = ""
-                        attempt.save(
-                            update_fields=[
-                                "saleor_order_id",
-                                "state",
-                                "completed_at",
-                                "last_error",
-                                "updated_at",
-                            ]
-                        )
-                fixed += 1
-
-        summary = f"{len(missing)} Saleor order(s) missing locally"
+
+        missing_total += self._carried_unmatched(options["fix"], reported)
+        uncertain_count = self._sweep_uncertain()
+        if not missing_total:
+            self.stdout.write(self.style.SUCCESS(
+                f"Reconciliation clean: all {compared} Saleor order(s) changed "
+                f"since {since:%Y-%m-%d %H:%M:%S} exist locally; "
+                f"{uncertain_count} uncertain checkout attempt(s)."
+            ))
+            return
+
+        summary = f"{missing_total} Saleor order(s) missing locally"
         if options["fix"]:
             summary += f"; {fixed} recreated as pending"
         self.stdout.write(self.style.WARNING(summary))
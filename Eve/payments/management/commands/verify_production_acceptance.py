@@ -3,11 +3,11 @@
 import json
 
 from django.core.management.base import BaseCommand, CommandError
-from ecommerce.services.saleor_client import SaleorAPIError, saleor_graphql
+from ecommerce.services.saleor_client import SaleorAPIError, register_query, saleor_graphql
 
 from payments.models import CheckoutAttempt, Order, WebhookEvent
 
-SALEOR_ORDER_QUERY = """
+SALEOR_ORDER_QUERY = register_query("acceptance_order", """
 query ($id: ID!) {
   order(id: $id) {
     id
@@ -15,7 +15,7 @@ query ($id: ID!) {
     paymentStatus
   }
 }
-"""
+""")
 
 EXPECTED_EVENTS = {
     Order.Status.PAID: {"OrderFullyPaid"},
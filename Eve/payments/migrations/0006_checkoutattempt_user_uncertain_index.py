@@ -0,0 +1,19 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_order_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkoutattempt',
+            index=models.Index(condition=models.Q(('state__in', ['started', 'checkout_created', 'completing', 'unknown'])), fields=['user'], name='payments_ca_user_uncertain_idx'),
+        ),
+    ]
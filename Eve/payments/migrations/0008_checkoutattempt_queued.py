@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_reconciliationcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='checkoutattempt',
+            name='state',
+            field=models.CharField(choices=[('queued', 'Queued'), ('started', 'Started'), ('checkout_created', 'Checkout created'), ('completing', 'Completing'), ('completed', 'Completed'), ('failed', 'Failed safely'), ('unknown', 'Outcome unknown')], db_index=True, default='started', max_length=24),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_checkoutattempt_queued'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reconciliationcheckpoint',
+            name='unmatched_order_ids',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
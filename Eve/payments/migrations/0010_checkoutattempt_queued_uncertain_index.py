@@ -0,0 +1,23 @@
+# Generated by Django 5.2.16 on 2026-10-19 18:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_reconciliationcheckpoint_unmatched_order_ids'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='checkoutattempt',
+            name='payments_ca_user_uncertain_idx',
+        ),
+        migrations.AddIndex(
+            model_name='checkoutattempt',
+            index=models.Index(condition=models.Q(('state__in', ['queued', 'started', 'checkout_created', 'completing', 'unknown'])), fields=['user'], name='payments_ca_user_uncertain_idx'),
+        ),
+    ]
@@ -26,7 +26,11 @@ class Order(models.Model):
         Status.CANCELLED: set(),
     }
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
+    # Indexed by the (user, created_at, id) history index below, which
+    # serves every user_id lookup; a separate FK index would only cost writes
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="orders", db_index=False
+    )
     saleor_order_id = models.CharField(max_length=100, unique=True)
     saleor_checkout_id = models.CharField(max_length=100, blank=True, default="")
     # One checkout attempt -> at most one order, even on double-submit
@@ -39,6 +43,15 @@ class Order(models.Model):
         max_length=50, choices=Status.choices, default=Status.PENDING
     )
 
+    class Meta:
+        indexes = [
+            # Keyset-paginated history (payments/services/history.py)
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="payments_or_user_created_idx",
+            )
+        ]
+
     def can_transition_to(self, new_status: str) -> bool:
         try:
             return Order.Status(new_status) in self.ALLOWED_TRANSITIONS[
@@ -55,13 +68,38 @@ class CheckoutAttempt(models.Model):
     """Durable journal around non-idempotent Saleor checkout mutations."""
 
     class State(models.TextChoices):
+        # CHECKOUT_ASYNC: journaled, mutations waiting for the orders queue
+        QUEUED = "queued", "Queued"
         STARTED = "started", "Started"
+        # No longer written (the checkout id is journaled with COMPLETING);
+        # kept for attempts recorded by earlier releases
         CHECKOUT_CREATED = "checkout_created", "Checkout created"
         COMPLETING = "completing", "Completing"
         COMPLETED = "completed", "Completed"
         FAILED = "failed", "Failed safely"
         UNKNOWN = "unknown", "Outcome unknown"
 
+    # Outcome not settled: the customer must not resubmit, and the history
+    # page says so
+    UNCERTAIN_STATES = (
+        State.QUEUED,
+        State.STARTED,
+        State.CHECKOUT_CREATED,
+        State.COMPLETING,
+        State.UNKNOWN,
+    )
+    # Of those, the ones that may have reached Saleor: the reconciliation
+    # job has to resolve them. A queued attempt has sent nothing yet;
+    # recover_queued_checkouts republishes it instead.
+    RECONCILE_STATES = (
+        State.STARTED,
+        State.CHECKOUT_CREATED,
+        State.COMPLETING,
+        State.UNKNOWN,
+    )
+    # Nothing further happens to these without reconciliation or a new key
+    SETTLED_STATES = (State.COMPLETED, State.FAILED, State.UNKNOWN)
+
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="checkout_attempts"
     )
@@ -82,7 +120,17 @@ class CheckoutAttempt(models.Model):
             models.Index(
                 fields=["state", "updated_at"],
                 name="payments_ca_state_updated_idx",
-            )
+            ),
+            # Only unsettled attempts (normally none per user) are indexed,
+            # so "does this user have one?" is a probe of a near-empty index.
+            # The states are UNCERTAIN_STATES, which Meta cannot reference.
+            models.Index(
+                fields=["user"],
+                name="payments_ca_user_uncertain_idx",
+                condition=models.Q(
+                    state__in=["queued", "started", "checkout_created", "completing", "unknown"]
+                ),
+            ),
         ]
 
     def __str__(self):
@@ -120,3 +168,19 @@ class WebhookEvent(models.Model):
 
     def __str__(self):
         return f"Saleor {self.event_type} for {self.saleor_order_id} [{self.status}]"
+
+
+class ReconciliationCheckpoint(models.Model):
+    """How far `reconcile_orders --fix` has read a Saleor feed: every order
+    updated before `high_water_mark` has been compared. Orders passed while
+    still missing and without a local user stay in `unmatched_order_ids`
+    and are reported by every run until a local Order exists."""
+
+    name = models.CharField(max_length=64, unique=True)
+    high_water_mark = models.DateTimeField()
+    # Nullable so the column can be added while old code still runs
+    unmatched_order_ids = models.JSONField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} reconciled to {self.high_water_mark:%Y-%m-%d %H:%M:%S}"
@@ -4,22 +4,65 @@ Wraps the non-idempotent Saleor mutations in a per-user lease and a durable
 CheckoutAttempt journal, so a double submit, a lost response, or a crash
 mid-flight can never produce two orders. Both clients call
 `place_order_once`; neither reimplements any of it.
+
+With CHECKOUT_PREFLIGHT on, a new attempt is first checked against Saleor's
+current stock and prices by one read-only query, outside the lease: a cart
+that would fail anyway is refused without holding the lease through two
+mutations, and a repriced cart is refreshed for the customer to review.
+
+With CHECKOUT_ASYNC on, `start_checkout` only journals a QUEUED attempt and
+hands the two mutations to the `orders` Celery queue, so a web thread is not
+held for up to two Saleor timeouts; clients follow the attempt until it
+settles. A QUEUED attempt has journaled no mutation yet: a worker that dies
+before journaling the checkout id leaves at most an abandoned Saleor
+checkout, never an order, so redelivering the task is safe.
 """
 import hashlib
 import json
 import logging
 
+from core import outbox
 from core.cache_lock import cache_lease
+from core.db_router import pin_to_primary
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
+from ecommerce.services.cart_service import clear_cart, get_cart, reprice_items
 
 from ..models import CheckoutAttempt, Order
-from .saleor_checkout import CheckoutError, build_lines, complete_checkout, create_checkout
+from .saleor_checkout import (
+    CheckoutError,
+    CheckoutRepriced,
+    build_lines,
+    complete_checkout,
+    create_checkout,
+    preflight_cart,
+)
 
 logger = logging.getLogger(__name__)
 
 CHECKOUT_LEASE_SECONDS = 60
 
+# What the customer is told when an attempt ends in `last_error`
+ATTEMPT_ERRORS = {
+    "checkout_create_failed": (
+        "Some items in your cart could not be ordered. Please review your "
+        "cart and try again."
+    ),
+    "checkout_complete_unknown": (
+        "We could not confirm the checkout result. Do not submit it again; "
+        "we are reconciling it automatically."
+    ),
+    "cart_changed": (
+        "Your cart changed while the order was queued. Please review it and "
+        "check out again."
+    ),
+    "cart_invalid": (
+        "Your cart contains an item that can no longer be purchased. Please "
+        "review your cart."
+    ),
+}
+
 
 def scoped_idempotency_key(user, raw_key: str) -> str:
     """Bind an idempotency key to its owner before it reaches the database.
@@ -34,6 +77,161 @@ def scoped_idempotency_key(user, raw_key: str) -> str:
     return hashlib.sha256(f"{user.pk}:{raw_key}".encode()).hexdigest()
 
 
+def _preflight(user, cart):
+    try:
+        preflight_cart(cart.get("items") or [])
+    except CheckoutRepriced as exc:
+        try:
+            reprice_items(user.pk, exc.prices)
+        except Exception:
+            logger.exception("Could not refresh repriced cart items")
+        raise
+
+
+def _fingerprint(lines) -> str:
+    return hashlib.sha256(
+        json.dumps(lines, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def _open_attempt(*, user, idempotency_key, cart, state):
+    """Under the lease: find or journal the attempt for `idempotency_key`.
+
+    Returns (order, attempt, runnable). `runnable` is True only for an
+    attempt this call has just journaled in `state`, whose mutations the
+    caller must now run (or queue). Otherwise `order` is the key's order
+    when it completed, and `attempt` the one still settling, if any.
+    """
+    existing = Order.objects.filter(
+        idempotency_key=idempotency_key, user=user
+    ).first()
+    if existing:
+        return existing, None, False
+
+    lines = build_lines(cart.get("items") or [])
+    attempt, created = CheckoutAttempt.objects.get_or_create(
+        idempotency_key=idempotency_key,
+        defaults={"user": user, "cart_fingerprint": _fingerprint(lines), "state": state},
+    )
+    if not created:
+        if attempt.user_id != user.pk:
+            # Unreachable while keys are scoped; refuse rather than ever
+            # act on another account's attempt.
+            logger.error(
+                "Checkout attempt %s belongs to another user; refusing",
+                attempt.pk,
+            )
+            return None, None, False
+        if attempt.state == CheckoutAttempt.State.COMPLETED:
+            order = Order.objects.filter(
+                idempotency_key=idempotency_key, user=user
+            ).first()
+            return order, attempt, False
+        if not (
+            attempt.state == CheckoutAttempt.State.FAILED
+            and not attempt.saleor_checkout_id
+        ):
+            return None, attempt, False
+        attempt.state = state
+        attempt.last_error = ""
+        attempt.cart_fingerprint = _fingerprint(lines)
+        attempt.save(
+            update_fields=["state", "last_error", "cart_fingerprint", "updated_at"]
+        )
+
+    logger.info(
+        "Checkout attempt %s %s",
+        attempt.pk, state,
+        extra={"event": "checkout_attempt", "attempt_id": attempt.pk, "state": state},
+    )
+    return None, attempt, True
+
+
+def _run_attempt(attempt, user, items):
+    """Create and complete the Saleor checkout for a journaled attempt and
+    record the order. Raises CheckoutError with the attempt settled."""
+    idempotency_key = attempt.idempotency_key
+    # Saleor recalculates prices; cart amounts are not trusted.
+    try:
+        checkout = create_checkout(
+            user.email, items, idempotency_key=idempotency_key
+        )
+    except CheckoutError:
+        attempt.state = CheckoutAttempt.State.FAILED
+        attempt.last_error = "checkout_create_failed"
+        attempt.save(update_fields=["state", "last_error", "updated_at"])
+        raise
+
+    # One write journals both facts recovery needs before completion:
+    # which checkout to look for, and that it may now become an order.
+    # A crash between two separate writes left nothing the merged one
+    # cannot tell: no mutation runs between them.
+    attempt.saleor_checkout_id = checkout["checkout_id"]
+    attempt.state = CheckoutAttempt.State.COMPLETING
+    attempt.save(
+        update_fields=["saleor_checkout_id", "state", "updated_at"]
+    )
+    try:
+        result = complete_checkout(checkout["checkout_id"])
+    except CheckoutError:
+        # The request may have reached Saleor even if Eve lost the
+        # response. Never create another checkout for this key.
+        attempt.state = CheckoutAttempt.State.UNKNOWN
+        attempt.last_error = "checkout_complete_unknown"
+        attempt.save(update_fields=["state", "last_error", "updated_at"])
+        logger.error(
+            "Checkout attempt %s outcome unknown",
+            attempt.pk,
+            extra={
+                "event": "checkout_attempt",
+                "attempt_id": attempt.pk,
+                "state": "unknown",
+            },
+        )
+        raise
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            user=user,
+            saleor_order_id=result["order_id"],
+            saleor_checkout_id=checkout["checkout_id"],
+            idempotency_key=idempotency_key,
+            total_amount=result["total_amount"],
+            currency=result["total_currency"],
+            status=Order.Status.PENDING,
+        )
+        attempt.saleor_order_id = result["order_id"]
+        attempt.state = CheckoutAttempt.State.COMPLETED
+        attempt.completed_at = timezone.now()
+        attempt.last_error = ""
+        attempt.save(
+            update_fields=[
+                "saleor_order_id",
+                "state",
+                "completed_at",
+                "last_error",
+                "updated_at",
+            ]
+        )
+    # Pinned once the order exists, however long Saleor or the queue took
+    # to get here: the user's next history read must see it
+    pin_to_primary(user)
+    logger.info(
+        "Checkout attempt %s completed",
+        attempt.pk,
+        extra={"event": "checkout_attempt", "attempt_id": attempt.pk, "state": "completed"},
+    )
+    return order
+
+
+def _preflight_new(user, cart, idempotency_key):
+    # A replayed key answers from its attempt, whatever Saleor says now
+    if settings.CHECKOUT_PREFLIGHT and not CheckoutAttempt.objects.filter(
+        idempotency_key=idempotency_key
+    ).exclude(state=CheckoutAttempt.State.FAILED).exists():
+        _preflight(user, cart)
+
+
 def place_order_once(*, user, cart, idempotency_key):
     """Serialize Saleor mutations and the local order write per user.
 
@@ -41,117 +239,75 @@ def place_order_once(*, user, cart, idempotency_key):
     user here so no caller can forget to.
     """
     idempotency_key = scoped_idempotency_key(user, idempotency_key)
+    _preflight_new(user, cart, idempotency_key)
     with cache_lease(f"checkout:user:{user.pk}", timeout=CHECKOUT_LEASE_SECONDS) as owner:
         if not owner:
             return None
-        existing = Order.objects.filter(
-            idempotency_key=idempotency_key, user=user
-        ).first()
-        if existing:
-            return existing
-
-        lines = build_lines(cart.get("items") or [])
-        cart_fingerprint = hashlib.sha256(
-            json.dumps(lines, sort_keys=True, separators=(",", ":")).encode()
-        ).hexdigest()
-        attempt, created = CheckoutAttempt.objects.get_or_create(
-            idempotency_key=idempotency_key,
-            defaults={"user": user, "cart_fingerprint": cart_fingerprint},
+        order, attempt, runnable = _open_attempt(
+            user=user, idempotency_key=idempotency_key, cart=cart,
+            state=CheckoutAttempt.State.STARTED,
         )
-        if not created:
-            if attempt.user_id != user.pk:
-                # Unreachable while keys are scoped; refuse rather than ever
-                # act on another account's attempt.
-                logger.error(
-                    "Checkout attempt %s belongs to another user; refusing",
-                    attempt.pk,
-                )
-                return None
-            if attempt.state == CheckoutAttempt.State.COMPLETED:
-                return Order.objects.filter(
-                    idempotency_key=idempotency_key, user=user
-                ).first()
-            if not (
-                attempt.state == CheckoutAttempt.State.FAILED
-                and not attempt.saleor_checkout_id
-            ):
-                return None
-            attempt.state = CheckoutAttempt.State.STARTED
-            attempt.last_error = ""
-            attempt.cart_fingerprint = cart_fingerprint
-            attempt.save(
-                update_fields=["state", "last_error", "cart_fingerprint", "updated_at"]
+        if not runnable:
+            return order
+        return _run_attempt(attempt, user, cart["items"])
+
+
+def start_checkout(*, user, cart, idempotency_key):
+    """Journal a QUEUED attempt and queue its Saleor mutations.
+
+    Returns the Order when this key already completed, the CheckoutAttempt
+    to follow otherwise, or None when another request holds the lease.
+    """
+    idempotency_key = scoped_idempotency_key(user, idempotency_key)
+    _preflight_new(user, cart, idempotency_key)
+    with cache_lease(f"checkout:user:{user.pk}", timeout=CHECKOUT_LEASE_SECONDS) as owner:
+        if not owner:
+            return None
+        from ..tasks import complete_checkout_attempt
+
+        with transaction.atomic():
+            order, attempt, runnable = _open_attempt(
+                user=user, idempotency_key=idempotency_key, cart=cart,
+                state=CheckoutAttempt.State.QUEUED,
             )
+            if runnable:
+                outbox.publish(complete_checkout_attempt, attempt.pk)
+    return order or attempt
 
-        logger.info(
-            "Checkout attempt %s started",
-            attempt.pk,
-            extra={"event": "checkout_attempt", "attempt_id": attempt.pk, "state": "started"},
-        )
 
-        # Saleor recalculates prices; cart amounts are not trusted.
+def run_queued_attempt(attempt_id):
+    """Run a QUEUED attempt's mutations (the `orders` worker's half of
+    `start_checkout`). Returns the attempt's state afterwards, or None when
+    the user's lease is busy and the caller should try again later.
+    """
+    attempt = CheckoutAttempt.objects.select_related("user").get(pk=attempt_id)
+    user = attempt.user
+    with cache_lease(f"checkout:user:{user.pk}", timeout=CHECKOUT_LEASE_SECONDS) as owner:
+        if not owner:
+            return None
+        attempt.refresh_from_db()
+        if attempt.state != CheckoutAttempt.State.QUEUED:
+            return attempt.state  # redelivered after it settled
+
+        # The cart is read again here; the fingerprint proves it is the one
+        # the customer submitted
+        items = get_cart(user.pk).get("items") or []
         try:
-            checkout = create_checkout(
-                user.email, cart["items"], idempotency_key=idempotency_key
-            )
+            fingerprint = _fingerprint(build_lines(items))
         except CheckoutError:
+            fingerprint = None
+        if fingerprint != attempt.cart_fingerprint:
             attempt.state = CheckoutAttempt.State.FAILED
-            attempt.last_error = "checkout_create_failed"
+            attempt.last_error = "cart_invalid" if fingerprint is None else "cart_changed"
             attempt.save(update_fields=["state", "last_error", "updated_at"])
-            raise
+            return attempt.state
 
-        attempt.saleor_checkout_id = checkout["checkout_id"]
-        attempt.state = CheckoutAttempt.State.CHECKOUT_CREATED
-        attempt.save(
-            update_fields=["saleor_checkout_id", "state", "updated_at"]
-        )
-        attempt.state = CheckoutAttempt.State.COMPLETING
-        attempt.save(update_fields=["state", "updated_at"])
         try:
-            result = complete_checkout(checkout["checkout_id"])
+            _run_attempt(attempt, user, items)
         except CheckoutError:
-            # The request may have reached Saleor even if Eve lost the
-            # response. Never create another checkout for this key.
-            attempt.state = CheckoutAttempt.State.UNKNOWN
-            attempt.last_error = "checkout_complete_unknown"
-            attempt.save(update_fields=["state", "last_error", "updated_at"])
-            logger.error(
-                "Checkout attempt %s outcome unknown",
-                attempt.pk,
-                extra={
-                    "event": "checkout_attempt",
-                    "attempt_id": attempt.pk,
-                    "state": "unknown",
-                },
-            )
-            raise
-
-        with transaction.atomic():
-            order = Order.objects.create(
-                user=user,
-                saleor_order_id=result["order_id"],
-                saleor_checkout_id=checkout["checkout_id"],
-                idempotency_key=idempotency_key,
-                total_amount=result["total_amount"],
-                currency=result["total_currency"],
-                status=Order.Status.PENDING,
-            )
-            attempt.saleor_order_id = result["order_id"]
-            attempt.state = CheckoutAttempt.State.COMPLETED
-            attempt.completed_at = timezone.now()
-            attempt.last_error = ""
-            attempt.save(
-                update_fields=[
-                    "saleor_order_id",
-                    "state",
-                    "completed_at",
-                    "last_error",
-                    "updated_at",
-                ]
-            )
-        logger.info(
-            "Checkout attempt %s completed",
-            attempt.pk,
-            extra={"event": "checkout_attempt", "attempt_id": attempt.pk, "state": "completed"},
-        )
-        return order
+            return attempt.state
+    try:
+        clear_cart(user.pk)
+    except Exception:
+        logger.exception("Order placed but the cart could not be cleared")
+    return attempt.state
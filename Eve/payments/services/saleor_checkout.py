@@ -3,11 +3,17 @@
 The Mongo cart supplies only (variant_id, quantity) pairs. All prices are
 recalculated by Saleor when the checkout is created — cart price fields are
 display-only and never trusted for billing.
+
+`preflight_cart` is the optional read-only check run before any of that
+(CHECKOUT_PREFLIGHT): one batched variant query confirms every line can
+still be bought at the price the customer saw, so a sold-out or repriced
+cart is turned away before the checkout lease and the two mutations.
 """
 import logging
+from decimal import Decimal, InvalidOperation
 
 from django.conf import settings
-from ecommerce.services.saleor_client import SaleorAPIError, saleor_graphql
+from ecommerce.services.saleor_client import SaleorAPIError, register_query, saleor_graphql
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +22,19 @@ class CheckoutError(RuntimeError):
     """User-safe checkout failure; message may be shown to the customer."""
 
 
-CHECKOUT_CREATE_MUTATION = """
+class CheckoutRepriced(CheckoutError):
+    """The cart shows prices Saleor no longer charges. `prices` maps each
+    affected variant id to its current {"amount", "currency"}."""
+
+    def __init__(self, prices: dict):
+        self.prices = prices
+        super().__init__(
+            "Prices in your cart have changed since you added the items. "
+            "Please review your cart."
+        )
+
+
+CHECKOUT_CREATE_MUTATION = register_query("checkout_create", """
 mutation ($channel: String!, $email: String!, $lines: [CheckoutLineInput!]!, $metadata: [MetadataInput!]) {
   checkoutCreate(input: {channel: $channel, email: $email, lines: $lines, metadata: $metadata}) {
     checkout {
@@ -28,9 +46,9 @@ mutation ($channel: String!, $email: String!, $lines: [CheckoutLineInput!]!, $me
     errors { field code message }
   }
 }
-"""
+""")
 
-CHECKOUT_COMPLETE_MUTATION = """
+CHECKOUT_COMPLETE_MUTATION = register_query("checkout_complete", """
 mutation ($id: ID!) {
   checkoutComplete(id: $id) {
     order {
@@ -40,7 +58,23 @@ mutation ($id: ID!) {
     errors { field code message }
   }
 }
-"""
+""")
+
+
+VARIANTS_PREFLIGHT_QUERY = register_query("variants_preflight", """
+query ($ids: [ID!], $first: Int!, $channel: String!) {
+  productVariants(ids: $ids, first: $first, channel: $channel) {
+    edges {
+      node {
+        id
+        quantityAvailable
+        product { isAvailableForPurchase }
+        pricing { price { gross { amount currency } } }
+      }
+    }
+  }
+}
+""")
 
 
 def build_lines(cart_items: list) -> list:
@@ -64,6 +98,84 @@ def build_lines(cart_items: list) -> list:
     return lines
 
 
+def _displayed_price(item: dict):
+    """The cart's display price as a Decimal, or None when it has none."""
+    amount = item.get("price_amount")
+    if amount is None or isinstance(amount, bool):
+        return None
+    try:
+        return Decimal(str(amount))
+    except InvalidOperation:
+        return None
+
+
+def preflight_cart(cart_items: list) -> list:
+    """Check availability and current prices of every cart line in one
+    read-only Saleor query, and return the checkout lines.
+
+    Raises CheckoutError when a variant is gone, unavailable or short of
+    stock, and CheckoutRepriced when one now costs something other than
+    the cart shows. Safe to retry: nothing is written on either side.
+    """
+    lines = build_lines(cart_items)
+    wanted = {}
+    for line in lines:
+        wanted[line["variantId"]] = wanted.get(line["variantId"], 0) + line["quantity"]
+    try:
+        data = saleor_graphql(VARIANTS_PREFLIGHT_QUERY, {
+            "ids": list(wanted),
+            "first": len(wanted),
+            "channel": settings.SALEOR_CHANNEL,
+        })
+        variants = {
+            edge["node"]["id"]: edge["node"]
+            for edge in data["productVariants"]["edges"]
+        }
+    except (SaleorAPIError, KeyError, TypeError):
+        logger.exception("Saleor checkout pre-flight failed")
+        raise CheckoutError("Checkout is temporarily unavailable. Please try again later.") from None
+
+    current, unavailable = {}, []
+    for variant_id, quantity in wanted.items():
+        variant = variants.get(variant_id) or {}
+        gross = ((variant.get("pricing") or {}).get("price") or {}).get("gross")
+        stock = variant.get("quantityAvailable")
+        if (
+            not gross
+            or not (variant.get("product") or {}).get("isAvailableForPurchase")
+            or (stock is not None and stock < quantity)
+        ):
+            unavailable.append(variant_id)
+        current[variant_id] = gross
+    if unavailable:
+        logger.info(
+            "Checkout pre-flight: %d variant(s) unavailable", len(unavailable),
+            extra={"event": "checkout_preflight", "outcome": "unavailable",
+                   "variants": len(unavailable)},
+        )
+        raise CheckoutError(
+            "Some items in your cart are unavailable. Please review your cart."
+        )
+
+    repriced = {}
+    for item in cart_items:
+        shown = _displayed_price(item)
+        gross = current[item["variant_id"]]
+        if shown is not None and (
+            shown != Decimal(str(gross["amount"]))
+            or item.get("price_currency", gross["currency"]) != gross["currency"]
+        ):
+            repriced[item["variant_id"]] = gross
+    if repriced:
+        logger.info(
+            "Checkout pre-flight: %d variant(s) repriced", len(repriced),
+            extra={"event": "checkout_preflight", "outcome": "repriced",
+                   "variants": len(repriced)},
+        )
+        raise CheckoutRepriced(repriced)
+    return lines
+
+
 def create_checkout(email: str, cart_items: list, *, idempotency_key: str = "") -> dict:
     """Create a Saleor checkout and return
     {"checkout_id", "total_amount", "total_currency"} with Saleor-calculated
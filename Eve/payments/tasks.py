@@ -1,12 +1,14 @@
 """Idempotent background processing for payment and Saleor work."""
 import logging
+from datetime import timedelta
 
 from celery import shared_task
 from django.core.management import call_command
 from django.db import OperationalError, transaction
 from django.utils import timezone
 
-from .models import Order, WebhookEvent
+from .models import CheckoutAttempt, Order, WebhookEvent
+from .services.checkout import run_queued_attempt
 
 logger = logging.getLogger(__name__)
 
@@ -104,3 +106,41 @@ def recover_pending_webhooks(batch_size: int = 100):
 )
 def reconcile_orders(self):
     call_command("reconcile_orders", "--fix")
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    retry_jitter=True,
+    retry_kwargs={"max_retries": 5},
+)
+def complete_checkout_attempt(self, attempt_id: int):
+    """Run the Saleor mutations of one queued checkout attempt."""
+    state = run_queued_attempt(attempt_id)
+    if state is None:
+        # The user's checkout lease is held; recover_queued_checkouts
+        # picks the attempt up if these retries run out
+        raise self.retry(countdown=5, max_retries=3)
+    return state
+
+
+@shared_task
+def recover_queued_checkouts(batch_size: int = 100, older_than_seconds: int = 60):
+    """Republish queued checkout attempts whose task was lost or gave up."""
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    ids = list(
+        CheckoutAttempt.objects.filter(
+            state=CheckoutAttempt.State.QUEUED, updated_at__lt=cutoff
+        )
+        .order_by("updated_at")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    for attempt_id in ids:
+        complete_checkout_attempt.delay(attempt_id)
+    logger.info(
+        "Checkout recovery queued %d attempt(s)",
+        len(ids),
+        extra={"event": "celery_recovery", "queued": len(ids)},
+    )
+    return len(ids)
@@ -256,6 +256,350 @@ class CheckoutFlowTests(TestCase):
         self.assertEqual(attempt.state, CheckoutAttempt.State.COMPLETED)
         self.assertEqual(create_mock.call_count, 2)
 
+    def test_checkout_pins_the_users_history_to_the_primary(self):
+        from core.db_router import _pin_key
+
+        with patch("core.db_router.replica_configured", return_value=True):
+            self._post_checkout()
+        self.assertIsNotNone(cache.get(_pin_key(self.user.pk)))
+
+    def test_pin_is_taken_once_the_order_exists(self):
+        # Saleor may take two timeouts to answer; a pin taken before the
+        # mutations could expire before the order is written
+        orders_when_pinned = []
+        with patch(
+            "payments.services.checkout.pin_to_primary",
+            side_effect=lambda user: orders_when_pinned.append(Order.objects.count()),
+        ):
+            self._post_checkout()
+        self.assertEqual(orders_when_pinned, [1])
+
+
+@override_settings(CHECKOUT_PREFLIGHT=True)
+class CheckoutPreflightTests(TestCase):
+    """Stock and prices are checked by one read before the lease is taken."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "S3curePass!x")
+        self.cart = {
+            "items": [
+                {"variant_id": "V1", "quantity": 2, "price_amount": 10.0, "price_currency": "EUR"},
+                {"variant_id": "V2", "quantity": 1, "price_amount": 5, "price_currency": "EUR"},
+            ]
+        }
+
+    def _variants(self, **overrides):
+        nodes = []
+        for variant_id, amount in (("V1", 10), ("V2", 5)):
+            node = {
+                "id": variant_id,
+                "quantityAvailable": 10,
+                "product": {"isAvailableForPurchase": True},
+                "pricing": {"price": {"gross": {"amount": amount, "currency": "EUR"}}},
+            }
+            node.update(overrides.get(variant_id, {}))
+            nodes.append(node)
+        return {"productVariants": {"edges": [{"node": n} for n in nodes]}}
+
+    def _place(self, variants):
+        from .services.checkout import place_order_once
+
+        with (
+            patch(
+                "payments.services.saleor_checkout.saleor_graphql", return_value=variants
+            ) as query,
+            patch(
+                "payments.services.checkout.create_checkout",
+                return_value={"checkout_id": "CHK1"},
+            ) as create_mock,
+            patch(
+                "payments.services.checkout.complete_checkout",
+                return_value={"order_id": "ORD1", "total_amount": 25, "total_currency": "EUR"},
+            ),
+            patch("payments.services.checkout.reprice_items") as reprice,
+        ):
+            try:
+                order = place_order_once(user=self.user, cart=self.cart, idempotency_key="k")
+            except CheckoutError as exc:
+                order = exc
+        return order, query, create_mock, reprice
+
+    def test_available_cart_at_shown_prices_is_ordered(self):
+        order, query, _, _ = self._place(self._variants())
+        self.assertEqual(order.saleor_order_id, "ORD1")
+        query.assert_called_once()
+        self.assertEqual(query.call_args.args[1]["ids"], ["V1", "V2"])
+
+    def test_short_stock_fails_before_any_attempt_or_mutation(self):
+        result, _, create_mock, _ = self._place(self._variants(V2={"quantityAvailable": 0}))
+        self.assertIn("unavailable", str(result))
+        create_mock.assert_not_called()
+        self.assertFalse(CheckoutAttempt.objects.exists())
+
+    def test_repriced_cart_is_refreshed_and_refused(self):
+        variants = self._variants(
+            V1={"pricing": {"price": {"gross": {"amount": 12.5, "currency": "EUR"}}}}
+        )
+        result, _, create_mock, reprice = self._place(variants)
+        self.assertIn("Prices in your cart have changed", str(result))
+        create_mock.assert_not_called()
+        reprice.assert_called_once_with(
+            self.user.pk, {"V1": {"amount": 12.5, "currency": "EUR"}}
+        )
+
+    def test_replayed_key_skips_the_preflight(self):
+        CheckoutAttempt.objects.create(
+            user=self.user,
+            idempotency_key=scoped_idempotency_key(self.user, "k"),
+            cart_fingerprint="a" * 64,
+            state=CheckoutAttempt.State.UNKNOWN,
+        )
+        result, query, create_mock, _ = self._place(self._variants())
+        self.assertIsNone(result)
+        query.assert_not_called()
+        create_mock.assert_not_called()
+
+
+class _Crash(BaseException):
+    """The process dying mid-checkout: no `except Exception` catches it."""
+
+
+class _FakeSaleor:
+    """Saleor's side of a checkout, so a test can see what really happened."""
+
+    def __init__(self, crash_at=""):
+        self.crash_at = crash_at
+        self.checkouts = {}
+        self.orders = []
+
+    def create_checkout(self, email, items, *, idempotency_key=""):
+        if self.crash_at == "before_create":
+            raise _Crash
+        checkout_id = f"CHK{len(self.checkouts) + 1}"
+        self.checkouts[checkout_id] = idempotency_key
+        if self.crash_at == "after_create":
+            raise _Crash
+        return {"checkout_id": checkout_id, "total_amount": 20, "total_currency": "EUR"}
+
+    def complete_checkout(self, checkout_id):
+        if self.crash_at == "before_complete":
+            raise _Crash
+        order_id = f"ORD{len(self.orders) + 1}"
+        self.orders.append({
+            "id": order_id,
+            "updatedAt": "2026-03-01T10:00:00+00:00",
+            "userEmail": "alice@example.com",
+            "eveIdempotencyKey": self.checkouts[checkout_id],
+            "total": {"gross": {"amount": 20, "currency": "EUR"}},
+        })
+        if self.crash_at == "after_complete":
+            raise _Crash
+        return {"order_id": order_id, "total_amount": 20, "total_currency": "EUR"}
+
+    def graphql(self, query, variables, retry=True):
+        return {"orders": {"edges": [{"node": o} for o in self.orders]}}
+
+
+class CheckoutCrashRecoveryTests(TestCase):
+    """A crash between any two checkout steps, then a resubmit and a
+    reconciliation run, leaves exactly one order on each side or none."""
+
+    CRASH_POINTS = (
+        "before_create",
+        "after_create",
+        "before_complete",
+        "after_complete",
+        "order_write",
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "S3curePass!x")
+        self.cart = {"items": [{"variant_id": "V1", "quantity": 2}]}
+
+    def _place(self, saleor):
+        from .services.checkout import place_order_once
+
+        real_create = Order.objects.create
+
+        def create_order(**fields):
+            if saleor.crash_at == "order_write":
+                raise _Crash
+            return real_create(**fields)
+
+        with (
+            patch("payments.services.checkout.create_checkout", saleor.create_checkout),
+            patch("payments.services.checkout.complete_checkout", saleor.complete_checkout),
+            patch.object(Order.objects, "create", create_order),
+        ):
+            try:
+                place_order_once(user=self.user, cart=self.cart, idempotency_key="k")
+            except _Crash:
+                pass
+
+    def test_no_crash_point_duplicates_an_order(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        for crash_at in self.CRASH_POINTS:
+            with self.subTest(crash_at=crash_at):
+                saleor = _FakeSaleor(crash_at)
+                self._place(saleor)
+                cache.clear()  # the dead process's lease expires
+                saleor.crash_at = ""
+                self._place(saleor)  # the customer resubmits
+                with patch(
+                    "payments.management.commands.reconcile_orders.saleor_graphql",
+                    saleor.graphql,
+                ):
+                    call_command("reconcile_orders", "--fix", stdout=StringIO())
+
+                self.assertLessEqual(len(saleor.orders), 1)
+                self.assertEqual(
+                    sorted(Order.objects.values_list("saleor_order_id", flat=True)),
+                    [o["id"] for o in saleor.orders],
+                )
+                attempt = CheckoutAttempt.objects.get()
+                if saleor.orders:
+                    self.assertEqual(attempt.state, CheckoutAttempt.State.COMPLETED)
+                else:
+                    self.assertIn(attempt.state, CheckoutAttempt.UNCERTAIN_STATES)
+                Order.objects.all().delete()
+                CheckoutAttempt.objects.all().delete()
+
+    def test_successful_checkout_writes_the_journal_three_times(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            self._place(_FakeSaleor())
+        writes = [
+            q["sql"] for q in queries.captured_queries
+            if "payments_checkoutattempt" in q["sql"]
+            and q["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        self.assertEqual(len(writes), 3)  # started, completing, completed
+        self.assertEqual(
+            CheckoutAttempt.objects.get().state, CheckoutAttempt.State.COMPLETED
+        )
+
+
+@override_settings(CHECKOUT_ENABLED=True, CHECKOUT_ASYNC=True)
+class AsyncCheckoutTests(TestCase):
+    """The web thread journals; the orders worker runs the mutations."""
+
+    def setUp(self):
+        from accounts.models import Profile
+
+        cache.clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "S3curePass!x")
+        Profile.objects.create(user=self.user, email_verified=True)
+        self.client.force_login(self.user)
+        self.cart = {"items": [{"variant_id": "V1", "quantity": 2}]}
+
+    def _submit(self):
+        with (
+            patch("payments.views.get_cart", return_value=self.cart),
+            patch("payments.views.clear_cart") as clear,
+            patch("payments.tasks.complete_checkout_attempt.apply_async") as publish,
+        ):
+            self.client.get(reverse("checkout"))
+            response = self.client.post(reverse("checkout"))
+        clear.assert_not_called()
+        return response, publish
+
+    def _work(self, attempt_id, cart=None):
+        from .tasks import complete_checkout_attempt
+
+        with (
+            patch("payments.services.checkout.get_cart", return_value=cart or self.cart),
+            patch("payments.services.checkout.clear_cart") as clear,
+            patch(
+                "payments.services.checkout.create_checkout",
+                return_value={"checkout_id": "CHK1"},
+            ) as create_mock,
+            patch(
+                "payments.services.checkout.complete_checkout",
+                return_value={"order_id": "ORD1", "total_amount": 20, "total_currency": "EUR"},
+            ),
+        ):
+            state = complete_checkout_attempt.apply(args=[attempt_id]).get()
+        return state, create_mock, clear
+
+    def test_submit_redirects_to_the_pending_page_and_queues_the_attempt(self):
+        response, publish = self._submit()
+        attempt = CheckoutAttempt.objects.get()
+        self.assertRedirects(
+            response, reverse("checkout_status", args=[attempt.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(attempt.state, CheckoutAttempt.State.QUEUED)
+        self.assertEqual(publish.call_args.args[:2], ([attempt.pk], {}))
+
+        page = self.client.get(reverse("checkout_status", args=[attempt.pk]))
+        self.assertContains(page, "Placing your order")
+        self.assertEqual(page["Refresh"], "2")
+
+    def test_worker_places_the_order_and_the_pending_page_hands_over(self):
+        self._submit()
+        attempt = CheckoutAttempt.objects.get()
+        state, _, clear = self._work(attempt.pk)
+        self.assertEqual(state, CheckoutAttempt.State.COMPLETED)
+        self.assertEqual(Order.objects.get().saleor_order_id, "ORD1")
+        clear.assert_called_once_with(self.user.pk)
+
+        # A redelivered task finds the attempt settled and does nothing
+        state, create_mock, _ = self._work(attempt.pk)
+        self.assertEqual(state, CheckoutAttempt.State.COMPLETED)
+        create_mock.assert_not_called()
+
+        response = self.client.get(reverse("checkout_status", args=[attempt.pk]))
+        self.assertRedirects(response, reverse("payment_history"), fetch_redirect_response=False)
+
+    def test_the_worker_pins_the_user_when_it_writes_the_order(self):
+        from core.db_router import _pin_key
+
+        with patch("core.db_router.replica_configured", return_value=True):
+            self._submit()
+            # Queued, not yet placed: nothing for the replica to miss
+            self.assertIsNone(cache.get(_pin_key(self.user.pk)))
+            self._work(CheckoutAttempt.objects.get().pk)
+        self.assertIsNotNone(cache.get(_pin_key(self.user.pk)))
+
+    def test_cart_changed_while_queued_fails_safely(self):
+        self._submit()
+        attempt = CheckoutAttempt.objects.get()
+        changed = {"items": [{"variant_id": "V1", "quantity": 3}]}
+        state, create_mock, _ = self._work(attempt.pk, cart=changed)
+        self.assertEqual(state, CheckoutAttempt.State.FAILED)
+        create_mock.assert_not_called()
+
+        response = self.client.get(reverse("checkout_status", args=[attempt.pk]))
+        self.assertRedirects(response, reverse("checkout"), fetch_redirect_response=False)
+
+    def test_another_users_attempt_is_not_found(self):
+        self._submit()
+        attempt = CheckoutAttempt.objects.get()
+        bob = User.objects.create_user("bob", "bob@example.com", "S3curePass!x")
+        self.client.force_login(bob)
+        response = self.client.get(reverse("checkout_status", args=[attempt.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_recovery_requeues_attempts_whose_task_was_lost(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .tasks import recover_queued_checkouts
+
+        self._submit()
+        CheckoutAttempt.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+        with patch("payments.tasks.complete_checkout_attempt.delay") as delay:
+            self.assertEqual(recover_queued_checkouts(), 1)
+        delay.assert_called_once_with(CheckoutAttempt.objects.get().pk)
+
 
 @override_settings(SALEOR_GRAPHQL_URL="https://saleor.example.com/graphql/")
 class WebhookTests(TestCase):
@@ -405,15 +749,13 @@ class WebhookTests(TestCase):
         self.assertEqual(response.status_code, 400)
 
     def test_broker_failure_leaves_durable_pending_event(self):
+        from core.models import OutboxMessage
+        from core.outbox import relay_once
+
         payload = {"__typename": "OrderFullyPaid", "order": {"id": "ORD1"}}
         body, signature = _signed(payload)
-        with (
-            patch(
-                "payments.tasks.process_webhook_event.delay",
-                side_effect=ConnectionError("broker unavailable"),
-            ),
-            self.captureOnCommitCallbacks(execute=True),
-        ):
+        # A broker outage cannot reach the request: the outbox row waits
+        with override_settings(CELERY_TASK_ALWAYS_EAGER=False):
             response = self.client.post(
                 self.url,
                 data=body,
@@ -423,7 +765,25 @@ class WebhookTests(TestCase):
         self.assertEqual(response.status_code, 202)
         event = WebhookEvent.objects.get()
         self.assertEqual(event.status, WebhookEvent.Status.PENDING)
-        self.assertEqual(self.order.status, Order.Status.PENDING)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(
+            (message.task, message.args), ("payments.tasks.process_webhook_event", [event.pk])
+        )
+
+        with (
+            patch(
+                "payments.tasks.process_webhook_event.apply_async",
+                side_effect=ConnectionError("broker unavailable"),
+            ),
+            self.assertRaises(ConnectionError),
+        ):
+            relay_once()
+        self.assertTrue(OutboxMessage.objects.exists())
+
+        relay_once()  # the broker is back; eager here, so the task runs
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.PAID)
 
     def test_inbox_stores_only_minimum_safe_payload(self):
         self._post(
@@ -495,6 +855,117 @@ class OrderOwnershipTests(TestCase):
         response = self.client.get(reverse("payment_history"))
         self.assertNotContains(response, "still being confirmed")
 
+    def test_history_warns_a_user_whose_only_checkout_is_uncertain(self):
+        dave = User.objects.create_user("dave", "dave@example.com", "S3curePass!x")
+        CheckoutAttempt.objects.create(
+            user=dave,
+            idempotency_key="dave-uncertain",
+            cart_fingerprint="a" * 64,
+            state=CheckoutAttempt.State.COMPLETING,
+        )
+        self.client.force_login(dave)
+        response = self.client.get(reverse("payment_history"))
+        self.assertContains(response, "still being confirmed")
+        self.assertContains(response, "no orders yet")
+
+    def test_history_warns_about_a_queued_checkout(self):
+        CheckoutAttempt.objects.create(
+            user=self.alice,
+            idempotency_key="alice-queued",
+            cart_fingerprint="a" * 64,
+            state=CheckoutAttempt.State.QUEUED,
+        )
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse("payment_history"))
+        self.assertContains(response, "still being confirmed")
+
+    def test_reconciliation_leaves_queued_attempts_to_the_recovery_task(self):
+        from datetime import timedelta
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        attempt = CheckoutAttempt.objects.create(
+            user=self.alice,
+            idempotency_key="alice-queued",
+            cart_fingerprint="a" * 64,
+            state=CheckoutAttempt.State.QUEUED,
+        )
+        CheckoutAttempt.objects.filter(pk=attempt.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        with patch(
+            "payments.management.commands.reconcile_orders.saleor_graphql",
+            return_value={"orders": {"edges": []}},
+        ):
+            call_command("reconcile_orders", "--fix", stdout=StringIO())
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.state, CheckoutAttempt.State.QUEUED)
+
+    def test_history_reads_orders_and_the_warning_in_one_query(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_login(self.alice)
+        self.client.get(reverse("payment_history"))  # warm the session
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("payment_history"))
+        payment_queries = [q["sql"] for q in queries if "payments_" in q["sql"]]
+        self.assertEqual(len(payment_queries), 1, payment_queries)
+
+    def test_uncertain_index_covers_exactly_the_uncertain_states(self):
+        index = next(
+            i for i in CheckoutAttempt._meta.indexes
+            if i.name == "payments_ca_user_uncertain_idx"
+        )
+        self.assertEqual(
+            set(dict(index.condition.children)["state__in"]),
+            set(CheckoutAttempt.UNCERTAIN_STATES),
+        )
+
+
+class OrderHistoryPaginationTests(TestCase):
+    """History pages resume from a (created_at, id) cursor: every order
+    appears exactly once, including orders that share a timestamp."""
+
+    def setUp(self):
+        from django.utils import timezone
+
+        cache.clear()
+        self.user = User.objects.create_user("carol", "carol@example.com", "S3curePass!x")
+        for number in range(25):
+            Order.objects.create(
+                user=self.user, saleor_order_id=f"SO_{number:02d}",
+                total_amount="1.00", currency="EUR",
+            )
+        # Five orders in the same instant, straddling the page boundary
+        Order.objects.filter(saleor_order_id__in=[f"SO_{n:02d}" for n in range(2, 7)]).update(
+            created_at=timezone.now()
+        )
+        self.client.force_login(self.user)
+
+    def test_walking_every_page_shows_each_order_once(self):
+        seen = []
+        url = reverse("payment_history")
+        while url:
+            response = self.client.get(url)
+            seen.extend(order.saleor_order_id for order in response.context["orders"])
+            cursor = response.context["next_cursor"]
+            url = f"{reverse('payment_history')}?before={cursor}" if cursor else None
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_first_page_is_bounded_and_links_to_older_orders(self):
+        response = self.client.get(reverse("payment_history"))
+        self.assertEqual(len(response.context["orders"]), 20)
+        self.assertContains(response, "Older orders")
+
+    def test_unreadable_cursor_starts_from_the_newest(self):
+        response = self.client.get(reverse("payment_history"), {"before": "not-a-cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["orders"]), 20)
+
 
 @override_settings(
     CHECKOUT_ENABLED=True,
@@ -741,13 +1212,19 @@ class ReconcileOrdersTests(TestCase):
             ]
         )
         out = StringIO()
-        with patch(
-            "payments.management.commands.reconcile_orders.saleor_graphql", return_value=payload
+        with (
+            patch(
+                "payments.management.commands.reconcile_orders.saleor_graphql",
+                return_value=payload,
+            ),
+            patch("payments.management.commands.reconcile_orders.pin_to_primary") as pin,
         ):
             call_command("reconcile_orders", "--fix", stdout=out)
         output = out.getvalue()
         self.assertIn("MISSING ORD-LOST", output)
         self.assertIn("MISSING ORD-GHOST", output)
+        # The recreated order's owner reads it from the primary
+        pin.assert_called_once_with(self.user)
         # Matched user recreated as pending; unmatched left for manual review
         lost = Order.objects.get(saleor_order_id="ORD-LOST")
         self.assertEqual(lost.user, self.user)
@@ -810,6 +1287,185 @@ class ReconcileOrdersTests(TestCase):
         self.assertEqual(attempt.state, CheckoutAttempt.State.COMPLETED)
         self.assertEqual(attempt.saleor_order_id, "ORD-RECOVERED")
 
+    def test_order_not_yet_on_the_replica_is_not_reported_missing(self):
+        from contextlib import contextmanager
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        @contextmanager
+        def lagging_replica():
+            # The replica has not received ORD-KNOWN yet
+            with patch.object(Order.objects, "filter", return_value=Order.objects.none()):
+                yield
+
+        payload = self._saleor_orders([{"id": "ORD-KNOWN", "userEmail": "alice@example.com"}])
+        out = StringIO()
+        with (
+            patch(
+                "payments.management.commands.reconcile_orders.saleor_graphql",
+                return_value=payload,
+            ),
+            patch(
+                "payments.management.commands.reconcile_orders.replica_reads",
+                lagging_replica,
+            ),
+        ):
+            call_command("reconcile_orders", "--fix", stdout=out)
+        self.assertIn("Reconciliation clean", out.getvalue())
+        self.assertEqual(Order.objects.filter(saleor_order_id="ORD-KNOWN").count(), 1)
+
+    def _paged(self, pages):
+        """A saleor_graphql fake serving `pages` in turn, linked by cursors."""
+        responses = []
+        for index, nodes in enumerate(pages):
+            payload = self._saleor_orders(nodes)
+            last = index == len(pages) - 1
+            payload["orders"]["pageInfo"] = {
+                "hasNextPage": not last,
+                "endCursor": None if last else f"cursor-{index + 1}",
+            }
+            responses.append(payload)
+        return patch(
+            "payments.management.commands.reconcile_orders.saleor_graphql",
+            side_effect=responses,
+        )
+
+    def test_follows_cursors_and_stores_the_high_water_mark_with_fix(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from .models import ReconciliationCheckpoint
+
+        pages = [
+            [{"id": "ORD-KNOWN", "updatedAt": "2026-03-01T10:00:00+00:00"}],
+            [{"id": "ORD-LOST", "userEmail": "alice@example.com",
+              "updatedAt": "2026-03-01T11:00:00+00:00",
+              "total": {"gross": {"amount": 3, "currency": "EUR"}}}],
+        ]
+        with self._paged(pages) as fake:
+            call_command(
+                "reconcile_orders", "--fix", "--since", "2026-03-01T00:00:00",
+                stdout=StringIO(),
+            )
+        variables = [c.args[1] for c in fake.call_args_list]
+        self.assertEqual([v["after"] for v in variables], [None, "cursor-1"])
+        self.assertEqual(variables[0]["since"], "2026-03-01T00:00:00+00:00")
+        self.assertTrue(Order.objects.filter(saleor_order_id="ORD-LOST").exists())
+        checkpoint = ReconciliationCheckpoint.objects.get()
+        self.assertEqual(checkpoint.high_water_mark.isoformat(), "2026-03-01T11:00:00+00:00")
+
+        # The next run starts from the stored mark
+        with self._paged([[]]) as fake:
+            call_command("reconcile_orders", "--fix", stdout=StringIO())
+        self.assertEqual(fake.call_args.args[1]["since"], "2026-03-01T11:00:00+00:00")
+
+    def test_unmatched_order_is_reported_by_every_run_until_resolved(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from .models import ReconciliationCheckpoint
+
+        ghost = {"id": "ORD-GHOST", "userEmail": "nobody@example.com",
+                 "updatedAt": "2026-03-01T10:00:00+00:00"}
+        later = {"id": "ORD-KNOWN", "updatedAt": "2026-03-01T12:00:00+00:00"}
+        with self._paged([[ghost, later]]):
+            call_command(
+                "reconcile_orders", "--fix", "--since", "2026-03-01T00:00:00",
+                stdout=StringIO(),
+            )
+        checkpoint = ReconciliationCheckpoint.objects.get()
+        self.assertEqual(checkpoint.high_water_mark.isoformat(), "2026-03-01T12:00:00+00:00")
+        self.assertEqual(checkpoint.unmatched_order_ids, ["ORD-GHOST"])
+
+        # The mark has moved past it, and it is still reported
+        out = StringIO()
+        with self._paged([[]]):
+            call_command("reconcile_orders", "--fix", stdout=out)
+        self.assertIn("MISSING ORD-GHOST", out.getvalue())
+        self.assertIn("1 Saleor order(s) missing locally", out.getvalue())
+
+        # Resolved by hand: dropped from the list and from the report
+        Order.objects.create(
+            user=self.user, saleor_order_id="ORD-GHOST", total_amount="5.00",
+            currency="EUR", status=Order.Status.PENDING,
+        )
+        out = StringIO()
+        with self._paged([[]]):
+            call_command("reconcile_orders", "--fix", stdout=out)
+        self.assertIn("Reconciliation clean", out.getvalue())
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.unmatched_order_ids, [])
+
+    def test_report_only_run_leaves_the_high_water_mark_alone(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from .models import ReconciliationCheckpoint
+
+        pages = [[{"id": "ORD-KNOWN", "updatedAt": "2026-03-01T10:00:00+00:00"}]]
+        with self._paged(pages):
+            call_command("reconcile_orders", stdout=StringIO())
+        self.assertFalse(ReconciliationCheckpoint.objects.exists())
+
+    def test_stops_at_max_pages_and_reports_the_backlog(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        pages = [[{"id": "ORD-KNOWN"}]] * 3
+        with self._paged(pages) as fake, self.assertLogs(
+            "payments.management.commands.reconcile_orders", "WARNING"
+        ) as logs:
+            call_command("reconcile_orders", "--max-pages", "2", stdout=StringIO())
+        self.assertEqual(fake.call_count, 2)
+        self.assertTrue(
+            any(r.event == "order_reconciliation_backlog" for r in logs.records)
+        )
+
+    def test_page_queries_do_not_grow_with_missing_orders(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from .models import ReconciliationCheckpoint
+
+        def page(count):
+            attempts = [
+                CheckoutAttempt(
+                    user=self.user,
+                    idempotency_key=f"key-{count}-{i}",
+                    cart_fingerprint="a" * 64,
+                    state=CheckoutAttempt.State.UNKNOWN,
+                )
+                for i in range(count)
+            ]
+            CheckoutAttempt.objects.bulk_create(attempts)
+            return [
+                {"id": f"ORD-{count}-{i}",
+                 "userEmail": "alice@example.com" if i % 2 else "",
+                 "eveIdempotencyKey": "" if i % 2 else f"key-{count}-{i}",
+                 "updatedAt": f"2026-03-01T{count:02d}:00:00+00:00"}
+                for i in range(count)
+            ]
+
+        ReconciliationCheckpoint.objects.create(
+            name="saleor_orders", high_water_mark="2026-01-01T00:00:00+00:00"
+        )
+        counts = []
+        for size in (2, 10):
+            nodes = page(size)
+            with self._paged([nodes]), CaptureQueriesContext(connection) as queries:
+                call_command("reconcile_orders", "--fix", stdout=StringIO())
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Order.objects.filter(saleor_order_id__startswith="ORD-10-").count(), 10)
+
 
 @skipUnless(
     os.environ.get("SALEOR_INTEGRATION") == "1",
@@ -4,6 +4,9 @@ from . import views
 
 urlpatterns = [
     path("checkout/", views.checkout_view, name="checkout"),
+    path(
+        "checkout/<int:attempt_id>/", views.checkout_status_view, name="checkout_status"
+    ),
     path("history/", views.payment_history_view, name="payment_history"),
     path("webhooks/saleor/", views.saleor_webhook_view, name="saleor_webhook"),
 ]
\ No newline at end of file
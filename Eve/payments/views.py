@@ -1,21 +1,29 @@
 import hashlib
-import json
 import logging
 import uuid
 
+from core import fastjson, outbox
 from core.cache_lock import CacheLeaseUnavailable
+from core.db_router import replica_reads
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
+from django.db.models import Exists
 from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
-from django.shortcuts import redirect, render
+from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from ecommerce.services.cart_service import clear_cart, get_cart
 
 from .models import CheckoutAttempt, Order, WebhookEvent
-from .services.checkout import place_order_once, scoped_idempotency_key
+from .services.checkout import (
+    ATTEMPT_ERRORS,
+    place_order_once,
+    scoped_idempotency_key,
+    start_checkout,
+)
+from .services.history import order_page
 from .services.saleor_checkout import CheckoutError
 from .services.saleor_webhooks import WebhookSignatureError, verify_saleor_signature
 
@@ -23,6 +31,8 @@ logger = logging.getLogger(__name__)
 
 IDEMPOTENCY_SESSION_KEY = "checkout_idempotency_key"
 CHECKOUT_LEASE_SECONDS = 60
+# The pending page reloads itself this often while an attempt is queued
+CHECKOUT_POLL_SECONDS = 2
 MAX_WEBHOOK_BODY_BYTES = 64 * 1024
 MAX_SALEOR_ORDER_ID_LENGTH = 255
 ALLOWED_WEBHOOK_EVENTS = {
@@ -71,8 +81,9 @@ def checkout_view(request):
         messages.info(request, "This order was already placed.")
         return redirect("payment_history")
 
+    place = start_checkout if settings.CHECKOUT_ASYNC else place_order_once
     try:
-        order = place_order_once(
+        order = place(
             user=request.user,
             cart=get_cart(request.user.id),
             idempotency_key=idempotency_key,
@@ -90,11 +101,41 @@ def checkout_view(request):
         return redirect("payment_history")
 
     request.session.pop(IDEMPOTENCY_SESSION_KEY, None)
+    if isinstance(order, CheckoutAttempt):
+        # The orders worker places it and clears the cart
+        return redirect("checkout_status", attempt_id=order.pk)
+    if settings.CHECKOUT_ASYNC:
+        messages.info(request, "This order was already placed.")
+        return redirect("payment_history")
     clear_cart(request.user.id)
     messages.success(request, "Order placed. Payment confirmation may take a moment.")
     return redirect("payment_history")
 
 
+@login_required
+def checkout_status_view(request, attempt_id):
+    """The pending page of an asynchronous checkout; it reloads itself until
+    the attempt settles, then hands over to history or back to checkout."""
+    attempt = get_object_or_404(CheckoutAttempt, pk=attempt_id, user=request.user)
+    if attempt.state == CheckoutAttempt.State.COMPLETED:
+        messages.success(request, "Order placed. Payment confirmation may take a moment.")
+        return redirect("payment_history")
+    if attempt.state == CheckoutAttempt.State.FAILED:
+        messages.error(
+            request,
+            ATTEMPT_ERRORS.get(attempt.last_error, "Checkout could not be completed."),
+        )
+        return redirect("checkout")
+    if attempt.state == CheckoutAttempt.State.UNKNOWN:
+        messages.error(request, ATTEMPT_ERRORS["checkout_complete_unknown"])
+        return redirect("payment_history")
+
+    response = render(request, "payments/checkout_pending.html", {"attempt": attempt})
+    response["Refresh"] = str(CHECKOUT_POLL_SECONDS)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
 @csrf_exempt
 @require_POST
 def saleor_webhook_view(request):
@@ -122,7 +163,7 @@ def saleor_webhook_view(request):
         return HttpResponse(status=401)
 
     try:
-        payload = json.loads(raw_body)
+        payload = fastjson.loads(raw_body)
         order_id = payload["order"]["id"]
         event_type = payload["__typename"]
         if (
@@ -136,47 +177,51 @@ def saleor_webhook_view(request):
         logger.warning("Saleor webhook rejected: malformed or unsupported payload")
         return HttpResponse(status=400)
 
-    safe_payload = {"__typename": event_type, "order": {"id": order_id}}
-    event, created = WebhookEvent.objects.get_or_create(
-        fingerprint=hashlib.sha256(raw_body).hexdigest(),
-        defaults={
-            "event_type": event_type,
-            "saleor_order_id": order_id,
-            "payload": safe_payload,
-        },
-    )
+    from .tasks import process_webhook_event
 
-    if created:
-        from .tasks import process_webhook_event
-
-        def enqueue():
-            try:
-                process_webhook_event.delay(event.pk)
-            except Exception:
-                logger.exception("Webhook durable but queue publication failed")
-
-        transaction.on_commit(enqueue)
+    safe_payload = {"__typename": event_type, "order": {"id": order_id}}
+    # The inbox row and its task publication commit together
+    with transaction.atomic():
+        event, created = WebhookEvent.objects.get_or_create(
+            fingerprint=hashlib.sha256(raw_body).hexdigest(),
+            defaults={
+                "event_type": event_type,
+                "saleor_order_id": order_id,
+                "payload": safe_payload,
+            },
+        )
+        if created:
+            outbox.publish(process_webhook_event, event.pk)
 
     return JsonResponse({"accepted": True, "duplicate": not created}, status=202)
 
 
 @login_required
 def payment_history_view(request):
-    orders = Order.objects.filter(user=request.user).order_by("-created_at")
-    checkout_reconciliation_pending = CheckoutAttempt.objects.filter(
-        user=request.user,
-        state__in=[
-            CheckoutAttempt.State.STARTED,
-            CheckoutAttempt.State.CHECKOUT_CREATED,
-            CheckoutAttempt.State.COMPLETING,
-            CheckoutAttempt.State.UNKNOWN,
-        ],
-    ).exists()
+    uncertain = CheckoutAttempt.objects.filter(
+        user=request.user, state__in=CheckoutAttempt.UNCERTAIN_STATES
+    )
+    # History tolerates replication lag; pin_to_primary covers the user's
+    # own fresh checkout
+    with replica_reads(request.user):
+        # The reconciliation warning rides along on the orders query (an
+        # uncorrelated EXISTS runs once); only an empty page needs its own
+        orders, next_cursor = order_page(
+            Order.objects.filter(user=request.user).annotate(
+                checkout_reconciliation_pending=Exists(uncertain)
+            ),
+            request.GET.get("before", ""),
+        )
+        checkout_reconciliation_pending = (
+            orders[0].checkout_reconciliation_pending if orders else uncertain.exists()
+        )
     return render(
         request,
         "payments/payment_history.html",
         {
             "orders": orders,
+            "next_cursor": next_cursor,
+            "is_first_page": "before" not in request.GET,
             "checkout_reconciliation_pending": checkout_reconciliation_pending,
         },
     )